@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+
+
+__all__ = ['BatchScript']
+
+
+import os
+import re
+import shlex
+from utils.logger import logger
+from taskfile import dump_tasks
+
+
+_pbs_template = '''#!/bin/bash
+#PBS -S /bin/bash
+#PBS -N {name}
+#PBS -t 0-{last}
+{options}
+
+# PaPaS job array: {ntasks} tasks of '{name}', {size} tasks per job
+
+cd "$PBS_O_WORKDIR"
+{setup}
+{python} {runner} -f {tasks} -c $PBS_ARRAYID -s {size} -w {workers} \\
+    -o {outdir} -j {journal}-$PBS_ARRAYID.journal -r
+'''
+
+_slurm_template = '''#!/bin/bash
+#SBATCH --job-name={name}
+#SBATCH --array=0-{last}
+{options}
+
+# PaPaS job array: {ntasks} tasks of '{name}', {size} tasks per job
+
+cd "$SLURM_SUBMIT_DIR"
+{setup}
+{python} {runner} -f {tasks} -c $SLURM_ARRAY_TASK_ID -s {size} -w {workers} \\
+    -o {outdir} -j {journal}-$SLURM_ARRAY_TASK_ID.journal -r
+'''
+
+
+class BatchScript(object):
+    """Generate batch job array scripts that pack many tasks per job
+
+    Each PTask is written to a task file and gets a job array script where
+    every array job runs 'tasks_per_job' tasks with the node-local runner
+    (see runner.py). A submit script chains the job arrays following the
+    'after' dependencies, so a study is a few array submissions instead of
+    one job per task. Dependencies are honored per PTask, not per instance.
+
+    Args:
+        system (str): Batch system, 'pbs' (Torque) or 'slurm'
+            (default is 'pbs')
+        tasks_per_job (int): Number of tasks per array job
+            (default is 100)
+        workers (int): Concurrent tasks per job, 0 uses all CPUs of node
+            (default is 0)
+        directory (str): Directory for scripts, task files, and outputs
+            (default is 'batch')
+        options (list): Scheduler directives, e.g., ['-l walltime=01:00:00']
+        setup (list): Shell lines run before the runner, e.g.,
+            ['module load java']
+        python (str): Python interpreter on compute nodes
+            (default is 'python3')
+    """
+
+    _logger = logger
+
+    systems = {
+        'pbs': {
+            'template': _pbs_template,
+            'directive': '#PBS',
+            'extension': '.pbs',
+            'submit': 'qsub',
+            'depend': '-W depend=afterokarray:{0}'
+        },
+        'slurm': {
+            'template': _slurm_template,
+            'directive': '#SBATCH',
+            'extension': '.slurm',
+            'submit': 'sbatch --parsable',
+            'depend': '--dependency=afterok:{0}'
+        }
+    }
+
+    def __init__(self, **kwargs):
+        self.system = 'pbs'
+        self.tasks_per_job = 100
+        self.workers = 0
+        self.directory = 'batch'
+        self.options = []
+        self.setup = []
+        self.python = 'python3'
+
+        for k in ['system', 'tasks_per_job', 'workers', 'directory',
+                  'options', 'setup', 'python']:
+            if k in kwargs and kwargs[k] is not None:
+                setattr(self, k, kwargs[k])
+
+        if self.system not in type(self).systems:
+            raise ValueError('unsupported batch system, {0}'.format(
+                self.system))
+        if self.tasks_per_job < 1:
+            raise ValueError('tasks per job must be positive')
+
+    def write(self, ptasks, order, after):
+        """Write task files, job array scripts, and submit script
+
+        Args:
+            ptasks (dict): PTasks keyed by name
+            order (list): PTask names in topological order
+            after (dict): Prerequisite PTask names keyed by PTask name
+
+        Returns:
+            str: Path of submit script
+        """
+        sys_conf = type(self).systems[self.system]
+        directory = os.path.abspath(self.directory)
+        outdir = os.path.join(directory, 'output')
+        os.makedirs(outdir, exist_ok=True)
+        runner = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                              'runner.py')
+        options = '\n'.join('{0} {1}'.format(sys_conf['directive'], o)
+                            for o in self.options)
+
+        jobvar = {name: 'job{0}_{1}'.format(i, re.sub(r'\W', '_', name))
+                  for i, name in enumerate(order)}
+        submit = ['#!/bin/bash', '',
+                  '# Submit PaPaS study, job arrays are chained following '
+                  'task dependencies', '',
+                  'cd {0}'.format(shlex.quote(directory))]
+
+        for name in order:
+            tasks = os.path.join(directory, name + '.tasks')
+            ntasks = dump_tasks(ptasks[name], tasks)
+            script = os.path.join(directory, name + sys_conf['extension'])
+            with open(script, 'w') as fd:
+                fd.write(sys_conf['template'].format(
+                    name=name, last=(ntasks - 1) // self.tasks_per_job,
+                    ntasks=ntasks, size=self.tasks_per_job,
+                    options=options, setup='\n'.join(self.setup),
+                    python=self.python, runner=shlex.quote(runner),
+                    tasks=shlex.quote(tasks), workers=self.workers,
+                    outdir=shlex.quote(outdir),
+                    journal=shlex.quote(os.path.join(outdir, name))))
+
+            cmd = sys_conf['submit']
+            if after.get(name):
+                deps = ':'.join('${0}'.format(jobvar[a]) for a in after[name])
+                cmd += ' ' + sys_conf['depend'].format(deps)
+            submit.append('{0}=$({1} {2})'.format(
+                jobvar[name], cmd, shlex.quote(os.path.basename(script))))
+            njobs = (ntasks - 1) // self.tasks_per_job + 1
+            type(self)._logger.info('BatchScript: {0} tasks of {1} in {2} '
+                                    'jobs'.format(ntasks, name, njobs))
+
+        fn = os.path.join(directory, 'submit.sh')
+        with open(fn, 'w') as fd:
+            fd.write('\n'.join(submit) + '\n')
+        os.chmod(fn, 0o755)
+        return fn
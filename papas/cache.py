@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+
+
+__all__ = ['ResultCache']
+
+
+import os
+import time
+import shutil
+import sqlite3
+import hashlib
+import tempfile
+import threading
+from utils.logger import logger
+
+
+class ResultCache(object):
+    """Content-addressed cache of task results
+
+    A result is keyed by the task's command and environment (Task.key), its
+    declared output files, and the content hashes of its declared input
+    files. Only successful tasks are stored, an entry holds copies of the
+    output files and of the task's stdout/stderr files. Entries are evicted
+    least-recently-used first when the cache exceeds its size bound.
+
+    Args:
+        directory (str): Cache directory
+        max_size (int): Maximum size of stored files in bytes
+            (default is 1 GiB)
+    """
+
+    _logger = logger
+
+    def __init__(self, directory='.papas_cache', max_size=2 ** 30):
+        self.directory = directory
+        self.max_size = max_size
+        self._objects = os.path.join(directory, 'objects')
+        self._digests = {}  # (path, mtime, size) -> content hash
+        self._lock = threading.Lock()
+
+        os.makedirs(self._objects, exist_ok=True)
+        self._db = sqlite3.connect(os.path.join(directory, 'index.db'),
+                                   isolation_level=None,
+                                   check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('CREATE TABLE IF NOT EXISTS results ('
+                         'key TEXT PRIMARY KEY, '
+                         'returncode INTEGER, '
+                         'size INTEGER, '
+                         'atime REAL)')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def file_digest(self, fn):
+        """Content hash of a file, memoized by path, mtime, and size"""
+        st = os.stat(fn)
+        k = (os.path.abspath(fn), st.st_mtime_ns, st.st_size)
+        digest = self._digests.get(k)
+        if digest is None:
+            h = hashlib.sha256()
+            with open(fn, 'rb') as fd:
+                for chunk in iter(lambda: fd.read(1 << 20), b''):
+                    h.update(chunk)
+            digest = self._digests[k] = h.hexdigest()
+        return digest
+
+    def key(self, task):
+        """Cache key of a task, None if an input file is missing"""
+        h = hashlib.sha256(task.key.encode())
+        for fn in task.outfiles:
+            h.update('\0o{0}'.format(fn).encode())
+        try:
+            for fn in task.infiles:
+                h.update('\0i{0}:{1}'.format(
+                    fn, self.file_digest(fn)).encode())
+        except OSError:
+            return None
+        return h.hexdigest()
+
+    def get(self, task, logs=()):
+        """Restore a cached result
+
+        Args:
+            task (Task): Task to look up
+            logs (list): Paths where stdout/stderr files are restored
+
+        Returns:
+            int: Cached return code, None on cache miss
+        """
+        key = self.key(task)
+        if key is None:
+            return None
+        with self._lock:
+            row = self._db.execute('SELECT returncode FROM results WHERE '
+                                   'key = ?', (key,)).fetchone()
+        if row is None:
+            return None
+
+        src = os.path.join(self._objects, key)
+        try:
+            for i, fn in enumerate(task.outfiles):
+                shutil.copyfile(os.path.join(src, 'o' + str(i)), fn)
+            for i, fn in enumerate(logs):
+                shutil.copyfile(os.path.join(src, 'l' + str(i)), fn)
+        except OSError as err:
+            type(self)._logger.warning('ResultCache: failed to restore {0}, '
+                                       '{1}'.format(key, err))
+            self._remove(key)
+            return None
+
+        with self._lock:
+            self._db.execute('UPDATE results SET atime = ? WHERE key = ?',
+                             (time.time(), key))
+        return row[0]
+
+    def put(self, task, returncode, logs=()):
+        """Store the result of a finished task
+
+        Args:
+            task (Task): Finished task
+            returncode (int): Return code, only 0 is stored
+            logs (list): Paths of stdout/stderr files
+
+        Returns:
+            bool: True if result was stored, else False
+        """
+        if returncode != 0:
+            return False
+        key = self.key(task)
+        if key is None:
+            return False
+
+        dst = os.path.join(self._objects, key)
+        with self._lock:
+            row = self._db.execute('SELECT 1 FROM results WHERE key = ?',
+                                   (key,)).fetchone()
+        if os.path.isdir(dst):
+            if row is not None:
+                return True
+            # Stored files without an entry (e.g., interrupted put()),
+            # index the existing directory
+            size = sum(os.path.getsize(os.path.join(dst, fn))
+                       for fn in os.listdir(dst))
+        else:
+            size = self._store(task, logs, dst)
+            if size is None:
+                return False
+
+        with self._lock:
+            self._db.execute('INSERT OR REPLACE INTO results VALUES '
+                             '(?, ?, ?, ?)',
+                             (key, returncode, size, time.time()))
+        self.evict()
+        return True
+
+    def _store(self, task, logs, dst):
+        """Copy output and log files into 'dst', returns their total size"""
+        tmp = tempfile.mkdtemp(dir=self._objects)
+        size = 0
+        try:
+            for prefix, fns in [('o', task.outfiles), ('l', logs)]:
+                for i, fn in enumerate(fns):
+                    shutil.copyfile(fn, os.path.join(tmp, prefix + str(i)))
+                    size += os.path.getsize(fn)
+            os.rename(tmp, dst)
+        except OSError as err:
+            type(self)._logger.debug('ResultCache: not storing {0}-{1}, '
+                                     '{2}'.format(task.name, task.index, err))
+            shutil.rmtree(tmp, ignore_errors=True)
+            return None
+        return size
+
+    @property
+    def size(self):
+        """Total size of stored files in bytes"""
+        with self._lock:
+            return self._db.execute('SELECT COALESCE(SUM(size), 0) FROM '
+                                    'results').fetchone()[0]
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute('SELECT COUNT(*) FROM '
+                                    'results').fetchone()[0]
+
+    def evict(self):
+        """Remove least-recently-used entries until within size bound"""
+        excess = self.size - self.max_size
+        if excess <= 0:
+            return
+        with self._lock:
+            rows = self._db.execute('SELECT key, size FROM results ORDER BY '
+                                    'atime').fetchall()
+        for key, size in rows:
+            if excess <= 0:
+                break
+            self._remove(key)
+            excess -= size
+
+    def _remove(self, key):
+        shutil.rmtree(os.path.join(self._objects, key), ignore_errors=True)
+        with self._lock:
+            self._db.execute('DELETE FROM results WHERE key = ?', (key,))
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
@@ -224,13 +224,13 @@ if [ $(ls | wc -l) -gt 0 ]; then
     output_ordered_file="${out_file}_ordered.$out_ext"
 
     if [ $DEBUG -eq 1 ]; then
-        echo "$parser_prog -i $work_dir/$output_file -o $work_dir/$output_ordered_file"
+        echo "$parser_prog -i $work_dir/$out_file-*.$out_ext -o $work_dir/$output_ordered_file"
     else
         # Combine partial output files into a single unordered output file
         cat $work_dir/$out_file-*.$out_ext >> "$work_dir/$output_file"
 
-        # Parse unordered output file and generate combined ordered output file
-        $parser_prog -i "$work_dir/$output_file" -o "$work_dir/$output_ordered_file"
+        # Sort partial output files in parallel and merge into combined ordered output file
+        $parser_prog -i $work_dir/$out_file-*.$out_ext -o "$work_dir/$output_ordered_file"
 
         echo
         echo "Transferring data from working to output directory"
@@ -2,9 +2,22 @@
 
 import sys
 import os
+import re
+import json
+import array
+import heapq
+import mmap
+import tempfile
+import itertools
+import multiprocessing
 import argparse
 from argparse import RawTextHelpFormatter
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
 
 # NOTE: The following are requirements to enable correct processing
 #       * There is a data column named '[run number]'
@@ -38,9 +51,13 @@ def parseArgs():
     parser.add_argument(
         '-i', '--infile',
         type=str,
-        dest='infile',
-        default='',
-        help='NetLogo .csv file with combined/unordered data'
+        nargs='+',
+        dest='infiles',
+        default=[],
+        help='NetLogo .csv file with combined/unordered data\n'
+             'If multiple files are given (e.g., one per task), these are\n'
+             'sorted in parallel and merged, same as parsing their\n'
+             'concatenation'
     )
 
     parser.add_argument(
@@ -52,13 +69,99 @@ def parseArgs():
              'Default is \'netlogo_ordered.csv\''
     )
 
+    parser.add_argument(
+        '-c', '--chunksize',
+        type=int,
+        dest='chunksize',
+        default=0,
+        help='Maximum number of data records kept in memory, sorted runs\n'
+             'are spilled to temporary files and merged\n'
+             'Default is 0 (all records in memory)'
+    )
+
+    parser.add_argument(
+        '-t', '--tmpdir',
+        type=str,
+        dest='tmpdir',
+        default=None,
+        help='Directory for temporary sorted runs\n'
+             'Default is system temporary directory'
+    )
+
+    parser.add_argument(
+        '-p', '--processes',
+        type=int,
+        dest='processes',
+        default=0,
+        help='Number of processes for sorting multiple input files or\n'
+             'data sections (see --mmap)\n'
+             'Default is 0 (number of CPUs)'
+    )
+
+    parser.add_argument(
+        '-b', '--binary',
+        type=str,
+        dest='bindir',
+        default=None,
+        help='Also write ordered data as columnar NumPy .npy files,\n'
+             'one per column plus \'metadata.json\', to this directory\n'
+             '(requires NumPy)'
+    )
+
+    parser.add_argument(
+        '-m', '--mmap',
+        action='store_true',
+        dest='mmap',
+        help='Memory-map a single input file and parse its data sections\n'
+             'in parallel (see --processes)'
+    )
+
+    parser.add_argument(
+        '-u', '--update',
+        action='store_true',
+        dest='update',
+        help='Incrementally update output file with data appended to a\n'
+             'single input file since the last update'
+    )
+
+    parser.add_argument(
+        '-n', '--numpy',
+        action='store_true',
+        dest='numpy',
+        help='Use vectorized NumPy parsing, sorting, and writing\n'
+             '(all data records in memory, ignores --chunksize)'
+    )
+
     args = parser.parse_args()
 
     # Validate options
     err = 0
-    if not os.path.isfile(args.infile):
-        print('ERROR: input file does not exist, ' + args.infile)
+    if not args.infiles:
+        print('ERROR: no input file was provided')
+        err += 1
+    for infile in args.infiles:
+        if not os.path.isfile(infile):
+            print('ERROR: input file does not exist, ' + infile)
+            err += 1
+
+    if (args.numpy or args.bindir) and np is None:
+        print('ERROR: NumPy is not available')
         err += 1
+    elif args.numpy and len(args.infiles) > 1:
+        print('ERROR: NumPy parsing supports a single input file')
+        err += 1
+
+    if args.update:
+        ignored = [opt for opt, value in [
+            ('--chunksize', args.chunksize), ('--tmpdir', args.tmpdir),
+            ('--binary', args.bindir), ('--mmap', args.mmap),
+            ('--numpy', args.numpy)] if value]
+        if ignored:
+            print('ERROR: --update does not support ' + ', '.join(ignored))
+            err += 1
+        if len(args.infiles) > 1:
+            print('ERROR: --update supports a single input file')
+            err += 1
 
     if err != 0:
         print
@@ -68,19 +171,57 @@ def parseArgs():
     return args
 
 
-def processNetLogoCSV(infile='', outfile=''):
+def newNetLogoInfo():
     '''
-    Load, parse, and order data from NetLogo .csv file
-    Write parsed data to output file
+    Header lines, column information, and data sections of a parsed file
+    Each data section is a list [source file, first run, last run].
+    The remaining values are the state to resume parsing at byte 'offset'.
     '''
-    infile = os.path.abspath(infile)
+    return {
+        'header_data': [],
+        'num_data_cols': 0,
+        'run_number_col': 0,
+        'step_col': 0,
+        'run_number_max': 0,
+        'sections': [],
+        'offset': 0,
+        'header_or_data_flag': 0,
+        'run_number_lmax': 0,
+        'run_number_gmax': 0
+    }
 
-    print('NetLogo Output Parser is processing data...')
-    print('  Input file:   ' + infile)
-    print('  Output file:  ' + outfile)
 
-    header_data = []
-    raw_data = []
+def splitNetLogoLine(line):
+    '''
+    Split a line of NetLogo .csv file into values without quotes
+    '''
+    return [x.replace('"', '') for x in line.strip().split(',')]
+
+
+def findNetLogoColumns(line_split, info):
+    '''
+    Store number of columns and indices of 'run number' and 'step' columns
+    of column titles line in 'info'
+    '''
+    for i, x in enumerate(line_split):
+        if run_number_colstr in x:
+            info['run_number_col'] = i
+        elif step_colstr in x:
+            info['step_col'] = i
+    info['num_data_cols'] = len(line_split)
+
+
+def readNetLogoCSV(infile, info, resume=False):
+    '''
+    Generator of data records from NetLogo .csv file
+    Records are tuples of floats with 'run number' renumbered across data
+    sections. Header lines and column information are stored in 'info',
+    and once exhausted, the total of 'run number' values in 'run_number_max'
+    and the range of 'run number' values of each data section in 'sections'.
+    If resume is True, parsing continues from the state in 'info' and a
+    trailing incomplete line is left for the next pass.
+    '''
+    header_data = info['header_data']
 
     first_header_flag = False  # enabled if the first header was read already
 
@@ -94,14 +235,30 @@ def processNetLogoCSV(infile='', outfile=''):
     run_number_lmax = 0  # local maximum 'run number', per data section
     run_number_gmax = 0  # global maximum 'run number'
 
-    step_col = 0  # identify column with 'step' value
+    offset = 0  # byte offset of next line
+
+    if resume:
+        first_header_flag = info['num_data_cols'] > 0
+        num_data_cols = info['num_data_cols']
+        header_or_data_flag = info['header_or_data_flag']
+        run_number_col = info['run_number_col']
+        run_number_lmax = info['run_number_lmax']
+        run_number_gmax = info['run_number_gmax']
+        offset = info['offset']
+        if run_number_lmax:
+            info['sections'].pop()  # last data section is still open
 
     # Process file line-by-line
-    with open(infile) as f:
+    with open(infile, 'rb') as f:
+        f.seek(offset)
         for line in f:
+            if resume and not line.endswith(b'\n'):
+                break
+            offset += len(line)
+
             # Remove whitespace and quotes from input
-            line = line.strip()
-            line_split = [l.replace('"', '') for l in line.split(',')]
+            line = line.decode().strip()
+            line_split = splitNetLogoLine(line)
             ncols = len(line_split)
 
             # If first-time passing through header lines
@@ -113,14 +270,11 @@ def processNetLogoCSV(infile='', outfile=''):
                 if run_number_colstr in line:
                     first_header_flag = True
                     header_or_data_flag = 1
-                    num_data_cols = ncols
 
                     # Get indices for 'run number' and 'step' columns
-                    for i, x in enumerate(line_split):
-                        if run_number_colstr in x:
-                            run_number_col = i
-                        elif step_colstr in x:
-                            step_col = i
+                    findNetLogoColumns(line_split, info)
+                    num_data_cols = info['num_data_cols']
+                    run_number_col = info['run_number_col']
 
             else:
                 # If number of columns do not match, assume it is the start
@@ -131,6 +285,11 @@ def processNetLogoCSV(infile='', outfile=''):
                 # Assume .csv always have a column named 'run number'
                 # before the data records
                 elif run_number_colstr in line:
+                    if run_number_lmax:
+                        info['sections'].append([
+                            infile, run_number_gmax + 1,
+                            run_number_gmax + run_number_lmax])
+
                     # increment global maximum 'run number'
                     run_number_gmax = run_number_gmax + run_number_lmax
                     run_number_lmax = 0  # reset local maximum 'run number'
@@ -146,32 +305,744 @@ def processNetLogoCSV(infile='', outfile=''):
                     line_split[run_number_col] = str(
                         run_number + run_number_gmax
                     )
-                    raw_data.append(tuple([float(l) for l in line_split]))
+                    yield tuple([float(x) for x in line_split])
+
+    if run_number_lmax:
+        info['sections'].append([infile, run_number_gmax + 1,
+                                 run_number_gmax + run_number_lmax])
+    info['run_number_max'] = run_number_gmax + run_number_lmax
+    info['offset'] = offset
+    info['header_or_data_flag'] = header_or_data_flag
+    info['run_number_lmax'] = run_number_lmax
+    info['run_number_gmax'] = run_number_gmax
+
+
+def spillRun(records, tmpdir=None):
+    '''
+    Write sorted records to a temporary binary file
+    Returns the file name
+    '''
+    fd, fn = tempfile.mkstemp(prefix='netlogo_run_', suffix='.bin',
+                              dir=tmpdir)
+    with os.fdopen(fd, 'wb') as f:
+        buf = array.array('d')
+        for record in records:
+            buf.extend(record)
+            if len(buf) >= 65536:
+                buf.tofile(f)
+                buf = array.array('d')
+        buf.tofile(f)
+    return fn
+
+
+def readRun(fn, ncols, keyfunc, run, block=4096):
+    '''
+    Generator of (key, run, record) entries from a sorted run file
+    The run index breaks ties between runs, so merging is stable.
+    '''
+    with open(fn, 'rb') as f:
+        while True:
+            buf = array.array('d')
+            try:
+                buf.fromfile(f, block * ncols)
+            except EOFError:
+                pass  # partial block at end of file
+            if not buf:
+                break
+            for i in range(0, len(buf), ncols):
+                record = tuple(buf[i:i + ncols])
+                yield (keyfunc(record), run, record)
+
+
+def sortNetLogoRecords(records, keyfunc, ncols, chunksize=0, tmpdir=None):
+    '''
+    Generator of records in sorted order (stable)
+    If chunksize > 0, at most chunksize records are kept in memory, sorted
+    runs are spilled to temporary files and k-way merged.
+    '''
+    if chunksize <= 0:
+        for record in sorted(records, key=keyfunc):
+            yield record
+        return
+
+    runs = []
+    try:
+        while True:
+            chunk = sorted(itertools.islice(records, chunksize), key=keyfunc)
+            if not chunk:
+                break
+            if len(chunk) < chunksize and not runs:
+                # Everything fits in memory
+                for record in chunk:
+                    yield record
+                return
+            runs.append(spillRun(chunk, tmpdir))
+            del chunk
+
+        for entry in heapq.merge(*[readRun(fn, ncols, keyfunc, i)
+                                   for i, fn in enumerate(runs)]):
+            yield entry[2]
+    finally:
+        for fn in runs:
+            os.remove(fn)
+
+
+def spoolNetLogoRecords(records, f):
+    '''
+    Generator of records that also writes them to binary file 'f'
+    Records are written as rows of doubles, see loadNetLogoSpool().
+    '''
+    buf = array.array('d')
+    for record in records:
+        buf.extend(record)
+        if len(buf) >= 65536:
+            buf.tofile(f)
+            buf = array.array('d')
+        yield record
+    buf.tofile(f)
+
+
+def loadNetLogoSpool(fn, nrows, ncols):
+    '''
+    Memory-mapped array of records written by spoolNetLogoRecords()
+    '''
+    if not nrows:
+        return np.empty((0, ncols))
+    return np.memmap(fn, dtype=np.float64, mode='r', shape=(nrows, ncols))
+
+
+def writeNetLogoColumns(bindir, data, info, block=65536):
+    '''
+    Write ordered data records as columnar NumPy .npy files
+    Columns with only integral values are stored as integers. A 'task'
+    column holds the index of the data section (task) each record came
+    from, sections and column files are described in 'metadata.json'.
+    File names are column titles with non-word characters replaced, a
+    suffix is added if they collide, 'columns.json' maps column titles to
+    files. Columns can be loaded with np.load(..., mmap_mode='r').
+    Data may be memory-mapped, it is read in blocks of 'block' records
+    and columns are written incrementally.
+    '''
+    if not os.path.isdir(bindir):
+        os.makedirs(bindir)
+
+    names = list(info['header_data'][-1]) if data.size else []
+    sections = info['sections']
+    nrows = len(data)
+
+    # Columns with only integral values, checked block by block
+    integral = np.ones(len(names), dtype=bool)
+    for lo in range(0, nrows, block):
+        chunk = np.asarray(data[lo:lo + block])
+        exact = np.mod(chunk, 1) == 0
+        exact &= np.abs(chunk) < 2 ** 53
+        integral &= np.all(exact, axis=0)
+
+    def openColumn(fn, dtype):
+        path = os.path.join(bindir, fn)
+        if not nrows:
+            np.save(path, np.empty(0, dtype=dtype))
+            return None
+        return np.lib.format.open_memmap(path, mode='w+', dtype=dtype,
+                                         shape=(nrows,))
+
+    columns = []
+    outputs = []
+    used = set(['task'])
+    for i, name in enumerate(names):
+        dtype = np.dtype(np.int64 if integral[i] else np.float64)
+        base = re.sub(r'\W+', '_', name).strip('_') or 'column%d' % i
+        fn = base
+        k = 1
+        while fn.lower() in used:
+            k += 1
+            fn = '%s_%d' % (base, k)
+        used.add(fn.lower())
+        columns.append({'name': name, 'file': fn + '.npy',
+                        'dtype': dtype.str})
+        outputs.append(openColumn(fn + '.npy', dtype))
+    with open(os.path.join(bindir, 'columns.json'), 'w') as f:
+        json.dump(dict((c['name'], c['file']) for c in columns), f,
+                  indent=2)
+    columns.append({'name': 'task', 'file': 'task.npy',
+                    'dtype': np.dtype(np.int32).str})
+    task = openColumn('task.npy', np.int32)
+
+    # Map 'run number' to data section, ranges are sorted and disjoint
+    starts = np.array([first for _, first, _ in sections])
+    for lo in range(0, nrows, block):
+        chunk = np.asarray(data[lo:lo + block])
+        hi = lo + len(chunk)
+        for i, out in enumerate(outputs):
+            out[lo:hi] = chunk[:, i]
+        task[lo:hi] = np.searchsorted(
+            starts, chunk[:, info['run_number_col']], side='right') - 1
+    for out in outputs + [task]:
+        if out is not None:
+            out.flush()
+    del outputs, task
+
+    metadata = {
+        'header': [list(line) for line in info['header_data'][:-1]],
+        'columns': columns,
+        'rows': nrows,
+        'run_number_column': names[info['run_number_col']] if names else '',
+        'step_column': names[info['step_col']] if names else '',
+        'tasks': [{'task': i, 'source': source, 'first_run': first,
+                   'last_run': last}
+                  for i, (source, first, last) in enumerate(sections)]
+    }
+    with open(os.path.join(bindir, 'metadata.json'), 'w') as f:
+        json.dump(metadata, f, indent=2)
+
+
+def processNetLogoCSV(infile='', outfile='', chunksize=0, tmpdir=None,
+                      bindir=None):
+    '''
+    Load, parse, and order data from NetLogo .csv file
+    Write parsed data to output file
+    If chunksize > 0, data is sorted with bounded memory (external sort)
+    If bindir is given, ordered data is also written as columnar files
+    '''
+    infile = os.path.abspath(infile)
+
+    print('NetLogo Output Parser is processing data...')
+    print('  Input file:   ' + infile)
+    print('  Output file:  ' + outfile)
+
+    info = newNetLogoInfo()
+    records = readNetLogoCSV(infile, info)
+
+    # Peek first record, so column information is available
+    first = next(records, None)
+    if first is not None:
+        records = itertools.chain([first], records)
 
     # Sort data based on parameters between 'run number' and 'step',
     # including 'step'
-    sort_data = sorted(
-        raw_data, key=lambda x: (x[run_number_col + 1:step_col + 1])
-    )
+    lo = info['run_number_col'] + 1
+    hi = info['step_col'] + 1
 
-    # Pretty print file stats
-    print('  Header lines: ' + str(len(header_data)))
-    print('  Data columns: ' + str(num_data_cols))
-    print('  Data lines:   ' + str(len(sort_data)))
+    def keyfunc(x):
+        return x[lo:hi]
+
+    sort_data = sortNetLogoRecords(records, keyfunc, info['num_data_cols'],
+                                   chunksize, tmpdir)
+
+    # Ordered records are also spooled to a binary file for columns
+    if bindir:
+        fd, spool = tempfile.mkstemp(prefix='netlogo_rows_', suffix='.bin',
+                                     dir=tmpdir)
+        fs = os.fdopen(fd, 'wb')
+        sort_data = spoolNetLogoRecords(sort_data, fs)
 
     # Write ordered data to output file
+    num_data_lines = 0
+    try:
+        with open(outfile, 'w') as f:
+            # Write header data
+            for line in info['header_data']:
+                f.write('%s\n' % ','.join(line))
+
+            # Write data
+            for line in sort_data:
+                f.write('%s\n' % ','.join(['%g' % x for x in line]))
+                num_data_lines += 1
+
+        if bindir:
+            fs.close()
+            data = loadNetLogoSpool(spool, num_data_lines,
+                                    info['num_data_cols'])
+            writeNetLogoColumns(bindir, data, info)
+            del data
+    finally:
+        if bindir:
+            fs.close()
+            os.remove(spool)
+
+    # Pretty print file stats
+    print('  Header lines: ' + str(len(info['header_data'])))
+    print('  Data columns: ' + str(info['num_data_cols']))
+    print('  Data lines:   ' + str(num_data_lines))
+
+
+def loadNetLogoState(infile, outfile):
+    '''
+    Load state of previous update of 'outfile' from 'infile'
+    Returns None if there is no state or it is not valid, the state is
+    valid only if input file was appended to and output files have the
+    sizes recorded in the state.
+    '''
+    statefile = outfile + '.state'
+    keysfile = outfile + '.keys'
+    if not all(os.path.isfile(x) for x in (statefile, outfile, keysfile)):
+        return None
+
+    with open(statefile) as f:
+        state = json.load(f)
+    if state['infile'] != infile or \
+       os.path.getsize(infile) < state['info']['offset'] or \
+       os.path.getsize(outfile) != state.get('outfile_size') or \
+       os.path.getsize(keysfile) != state.get('keys_size'):
+        return None
+    return state
+
+
+def updateNetLogoCSV(infile='', outfile=''):
+    '''
+    Incrementally parse and order data appended to NetLogo .csv file
+    Parser state and byte offset of input file are kept in '<outfile>.state'
+    and sort keys of ordered data in '<outfile>.keys'. Only new lines are
+    parsed, new records are sorted and merged with the existing ordered
+    output, whose lines are copied without reformatting.
+    Output is the same as processNetLogoCSV() on the whole input file.
+    The state is written last and records the sizes of the output and keys
+    files, if an update was interrupted they do not match and the next
+    update parses the whole input file again.
+    '''
+    infile = os.path.abspath(infile)
+    statefile = outfile + '.state'
+    keysfile = outfile + '.keys'
+
+    print('NetLogo Output Parser is updating data...')
+    print('  Input file:   ' + infile)
+    print('  Output file:  ' + outfile)
+
+    state = loadNetLogoState(infile, outfile)
+    if state is None:
+        info = newNetLogoInfo()
+        num_header_lines = 0
+        num_old_lines = 0
+    else:
+        info = state['info']
+        info['header_data'] = [tuple(x) for x in info['header_data']]
+        num_header_lines = state['header_lines']
+        num_old_lines = state['data_lines']
+
+    records = list(readNetLogoCSV(infile, info, resume=True))
+    lo = info['run_number_col'] + 1
+    hi = info['step_col'] + 1
+    nkeys = hi - lo
+
+    def keyfunc(x):
+        return x[lo:hi]
+
+    records.sort(key=keyfunc)
+
+    def oldEntries(f):
+        # Ordered data lines of previous output paired with their keys
+        if not num_old_lines:
+            return
+        for _ in range(num_header_lines):
+            next(f)
+        for entry, line in zip(readRun(keysfile, nkeys, tuple, 0), f):
+            yield (entry[0], 0, line)
+
+    def newEntries():
+        for record in records:
+            yield (keyfunc(record), 1, record)
+
+    # Merge into new output and keys files, old records are first on ties
+    num_data_lines = 0
+    keys = array.array('d')
+    with open(outfile + '.tmp', 'w') as f, \
+            open(keysfile + '.tmp', 'wb') as fk:
+        for line in info['header_data']:
+            f.write('%s\n' % ','.join(line))
+
+        fo = open(outfile) if num_old_lines else None
+        try:
+            for key, run, line in heapq.merge(oldEntries(fo), newEntries()):
+                if run:
+                    line = '%s\n' % ','.join(['%g' % x for x in line])
+                f.write(line)
+                keys.extend(key)
+                if len(keys) >= 65536:
+                    keys.tofile(fk)
+                    keys = array.array('d')
+                num_data_lines += 1
+        finally:
+            if fo is not None:
+                fo.close()
+        keys.tofile(fk)
+
+    # os.rename() replaces existing files on POSIX (Python 2 has no
+    # os.replace()), state is replaced last so it is never newer than data
+    os.rename(outfile + '.tmp', outfile)
+    os.rename(keysfile + '.tmp', keysfile)
+    with open(statefile + '.tmp', 'w') as f:
+        json.dump({
+            'infile': infile,
+            'header_lines': len(info['header_data']),
+            'data_lines': num_data_lines,
+            'outfile_size': os.path.getsize(outfile),
+            'keys_size': os.path.getsize(keysfile),
+            'info': info
+        }, f)
+    os.rename(statefile + '.tmp', statefile)
+
+    print('  Header lines: ' + str(len(info['header_data'])))
+    print('  Data columns: ' + str(info['num_data_cols']))
+    print('  Data lines:   %d (%d new)' % (num_data_lines, len(records)))
+
+
+def sortNetLogoShard(task):
+    '''
+    Parse and sort a single NetLogo .csv file into a temporary binary file
+    Runs in a worker process, returns the file name and column information.
+    '''
+    infile, tmpdir = task
+    info = newNetLogoInfo()
+    records = list(readNetLogoCSV(infile, info))
+    lo = info['run_number_col'] + 1
+    hi = info['step_col'] + 1
+    records.sort(key=lambda x: x[lo:hi])
+    info['num_data_lines'] = len(records)
+    return spillRun(records, tmpdir), info
+
+
+def processNetLogoCSVFiles(infiles=[], outfile='', processes=0, tmpdir=None,
+                           bindir=None):
+    '''
+    Load, parse, and order data from multiple NetLogo .csv files
+    Each file is sorted into a shard by a process pool, then shards are
+    k-way merged with 'run number' offset by the totals of previous files.
+    Output is the same as processNetLogoCSV() on the concatenated files.
+    '''
+    infiles = [os.path.abspath(infile) for infile in infiles]
+
+    print('NetLogo Output Parser is processing data...')
+    print('  Input files:  ' + str(len(infiles)))
+    print('  Output file:  ' + outfile)
+
+    tasks = [(infile, tmpdir) for infile in infiles]
+    pool = multiprocessing.Pool(processes or None)
+    try:
+        shards = pool.map(sortNetLogoShard, tasks, chunksize=1)
+    finally:
+        pool.close()
+        pool.join()
+
+    # Header and column information of first file with data records
+    info = shards[0][1]
+    for _, shard_info in shards:
+        if shard_info['header_data']:
+            info = shard_info
+            break
+    num_data_lines = mergeNetLogoShards(shards, info, outfile, bindir,
+                                        tmpdir)
+
+    print('  Header lines: ' + str(len(info['header_data'])))
+    print('  Data columns: ' + str(info['num_data_cols']))
+    print('  Data lines:   ' + str(num_data_lines))
+
+
+def mergeNetLogoShards(shards, info, outfile, bindir=None, tmpdir=None):
+    '''
+    K-way merge of sorted shards into output file, removes shard files
+    Shards are (file name, shard info) in input order, 'run number' of each
+    shard is offset by the totals of previous shards.
+    Returns the number of data lines written.
+    '''
+    spool = None
+    try:
+        ncols = info['num_data_cols']
+        run_col = info['run_number_col']
+        lo = run_col + 1
+        hi = info['step_col'] + 1
+
+        def keyfunc(x):
+            return x[lo:hi]
+
+        def offsetRun(entries, offset):
+            for key, run, record in entries:
+                if offset:
+                    record = list(record)
+                    record[run_col] += offset
+                yield (key, run, record)
+
+        # 'run number' offsets are prefix sums of totals per shard
+        runs = []
+        sections = []
+        offset = 0
+        for i, (fn, shard_info) in enumerate(shards):
+            if shard_info['num_data_lines']:
+                runs.append(offsetRun(readRun(fn, ncols, keyfunc, i),
+                                      offset))
+            for source, first, last in shard_info['sections']:
+                sections.append([source, first + offset, last + offset])
+            offset += shard_info['run_number_max']
+        info['sections'] = sections
+
+        records = (entry[2] for entry in heapq.merge(*runs))
+        if bindir:
+            fd, spool = tempfile.mkstemp(prefix='netlogo_rows_',
+                                         suffix='.bin', dir=tmpdir)
+            fs = os.fdopen(fd, 'wb')
+            records = spoolNetLogoRecords(records, fs)
+
+        num_data_lines = 0
+        with open(outfile, 'w') as f:
+            for line in info['header_data']:
+                f.write('%s\n' % ','.join(line))
+
+            for record in records:
+                f.write('%s\n' % ','.join(['%g' % x for x in record]))
+                num_data_lines += 1
+
+        if bindir:
+            fs.close()
+            data = loadNetLogoSpool(spool, num_data_lines, ncols)
+            writeNetLogoColumns(bindir, data, info)
+            del data
+    finally:
+        for fn, _ in shards:
+            os.remove(fn)
+        if spool is not None:
+            fs.close()
+            os.remove(spool)
+
+    return num_data_lines
+
+
+def findNetLogoSections(infile, info):
+    '''
+    Locate data sections of NetLogo .csv file by scanning its bytes
+    The file is memory-mapped and searched for column title lines (lines
+    with 'run number' and as many columns as data records). Header lines
+    and column information are stored in 'info'.
+    Returns a list of (start, end) byte offsets of data sections.
+    '''
+    colstr = run_number_colstr.encode()
+    sections = []
+    with open(infile, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return sections
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            pos = mm.find(colstr)
+            if pos < 0:
+                return sections
+
+            # Header lines, up to and including first column titles
+            end = mm.find(b'\n', pos)
+            if end < 0:
+                end = len(mm)
+            for line in mm[:end].decode().split('\n'):
+                info['header_data'].append(tuple(splitNetLogoLine(line)))
+            findNetLogoColumns(info['header_data'][-1], info)
+            ncols = info['num_data_cols']
+
+            # Data sections, from end of column titles to next column titles
+            start = end + 1
+            pos = mm.find(colstr, start)
+            while pos >= 0:
+                begin = mm.rfind(b'\n', 0, pos) + 1
+                end = mm.find(b'\n', pos)
+                if end < 0:
+                    end = len(mm)
+                if mm[begin:end].count(b',') + 1 == ncols:
+                    sections.append((start, begin))
+                    start = end + 1
+                pos = mm.find(colstr, end)
+            sections.append((start, len(mm)))
+        finally:
+            mm.close()
+    return sections
+
+
+def sortNetLogoSection(task):
+    '''
+    Parse and sort a data section of NetLogo .csv file into a temporary
+    binary file
+    Runs in a worker process which memory-maps the input file and parses
+    only its section, returns the file name and section information.
+    '''
+    infile, start, end, ncols, run_col, step_col, tmpdir = task
+    records = []
+    run_number_lmax = 0
+    with open(infile, 'rb') as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            mm.seek(start)
+            while mm.tell() < end:
+                line = mm.readline().decode()
+                line_split = splitNetLogoLine(line)
+
+                # Data records end at first line with other column count
+                if len(line_split) != ncols:
+                    break
+
+                run_number = int(line_split[run_col])
+                if run_number > run_number_lmax:
+                    run_number_lmax = run_number
+                records.append(tuple([float(x) for x in line_split]))
+        finally:
+            mm.close()
+
+    lo = run_col + 1
+    hi = step_col + 1
+    records.sort(key=lambda x: x[lo:hi])
+    info = {
+        'num_data_lines': len(records),
+        'run_number_max': run_number_lmax,
+        'sections': [[infile, 1, run_number_lmax]] if run_number_lmax else []
+    }
+    return spillRun(records, tmpdir), info
+
+
+def processNetLogoCSVSections(infile='', outfile='', processes=0,
+                              tmpdir=None, bindir=None):
+    '''
+    Load, parse, and order data from a large NetLogo .csv file
+    Data sections are located in the memory-mapped file and parsed and
+    sorted concurrently by a process pool, then merged.
+    Output is the same as processNetLogoCSV().
+    '''
+    infile = os.path.abspath(infile)
+
+    print('NetLogo Output Parser is processing data (memory-mapped)...')
+    print('  Input file:   ' + infile)
+    print('  Output file:  ' + outfile)
+
+    info = newNetLogoInfo()
+    sections = findNetLogoSections(infile, info)
+    tasks = [(infile, start, end, info['num_data_cols'],
+              info['run_number_col'], info['step_col'], tmpdir)
+             for start, end in sections]
+    pool = multiprocessing.Pool(processes or None)
+    try:
+        shards = pool.map(sortNetLogoSection, tasks, chunksize=1)
+    finally:
+        pool.close()
+        pool.join()
+    num_data_lines = mergeNetLogoShards(shards, info, outfile, bindir,
+                                        tmpdir)
+
+    print('  Header lines: ' + str(len(info['header_data'])))
+    print('  Sections:     ' + str(len(sections)))
+    print('  Data columns: ' + str(info['num_data_cols']))
+    print('  Data lines:   ' + str(num_data_lines))
+
+
+def readNetLogoCSVBlocks(infile, info, block=65536):
+    '''
+    Generator of NumPy arrays with blocks of data records from NetLogo
+    .csv file
+    Lines are only classified in Python, numeric conversion is done per
+    block. Same behavior as readNetLogoCSV().
+    '''
+    header_data = info['header_data']
+
+    first_header_flag = False
+    num_data_cols = 0
+    header_or_data_flag = 0
+    run_number_col = 0
+    run_number_lmax = 0
+    run_number_gmax = 0
+    data_lines = []
+
+    def flush():
+        # Convert pending data lines, renumber 'run number'
+        data = np.fromstring(','.join(data_lines).replace('"', ''),
+                             sep=',').reshape(-1, num_data_cols)
+        del data_lines[:]
+        lmax = int(data[:, run_number_col].max())
+        data[:, run_number_col] += run_number_gmax
+        return data, lmax
+
+    with open(infile) as f:
+        for line in f:
+            line = line.strip()
+
+            if not first_header_flag:
+                line_split = splitNetLogoLine(line)
+                header_data.append(tuple(line_split))
+                if run_number_colstr in line:
+                    first_header_flag = True
+                    header_or_data_flag = 1
+                    findNetLogoColumns(line_split, info)
+                    num_data_cols = info['num_data_cols']
+                    run_number_col = info['run_number_col']
+                continue
+
+            if line.count(',') + 1 == num_data_cols and \
+               run_number_colstr not in line and header_or_data_flag:
+                data_lines.append(line)
+                if len(data_lines) >= block:
+                    data, lmax = flush()
+                    run_number_lmax = max(run_number_lmax, lmax)
+                    yield data
+                continue
+
+            # Header line, data section ended
+            if data_lines:
+                data, lmax = flush()
+                run_number_lmax = max(run_number_lmax, lmax)
+                yield data
+            if line.count(',') + 1 != num_data_cols:
+                header_or_data_flag = 0
+            elif run_number_colstr in line:
+                if run_number_lmax:
+                    info['sections'].append([
+                        infile, run_number_gmax + 1,
+                        run_number_gmax + run_number_lmax])
+                run_number_gmax = run_number_gmax + run_number_lmax
+                run_number_lmax = 0
+                header_or_data_flag = 1
+
+    if data_lines:
+        data, lmax = flush()
+        run_number_lmax = max(run_number_lmax, lmax)
+        yield data
+    if run_number_lmax:
+        info['sections'].append([infile, run_number_gmax + 1,
+                                 run_number_gmax + run_number_lmax])
+    info['run_number_max'] = run_number_gmax + run_number_lmax
+
+
+def processNetLogoCSVNumPy(infile='', outfile='', block=65536, bindir=None):
+    '''
+    Load, parse, and order data from NetLogo .csv file using NumPy
+    Write parsed data to output file, same output as processNetLogoCSV()
+    '''
+    infile = os.path.abspath(infile)
+
+    print('NetLogo Output Parser is processing data (NumPy)...')
+    print('  Input file:   ' + infile)
+    print('  Output file:  ' + outfile)
+
+    info = newNetLogoInfo()
+    blocks = list(readNetLogoCSVBlocks(infile, info, block))
+    ncols = info['num_data_cols']
+    if blocks:
+        data = np.concatenate(blocks)
+    else:
+        data = np.empty((0, ncols))
+    del blocks
+
+    # Sort data based on parameters between 'run number' and 'step',
+    # including 'step' (lexsort is stable, last key is primary)
+    cols = range(info['run_number_col'] + 1, info['step_col'] + 1)
+    if len(cols):
+        data = data[np.lexsort([data[:, c] for c in reversed(cols)])]
+
+    # Write ordered data to output file, formatting a block at a time
     with open(outfile, 'w') as f:
-        # Write header data
-        for line in header_data:
+        for line in info['header_data']:
             f.write('%s\n' % ','.join(line))
 
-        # Write data
-        for line in sort_data:
-            for i, x in enumerate(line):
-                if i < (num_data_cols - 1):
-                    f.write('%g,' % x)
-                else:
-                    f.write('%g\n' % x)
+        row_fmt = ','.join(['%g'] * ncols) + '\n'
+        for i in range(0, len(data), block):
+            chunk = data[i:i + block]
+            f.write((row_fmt * len(chunk)) % tuple(chunk.ravel().tolist()))
+
+    if bindir:
+        writeNetLogoColumns(bindir, data, info)
+
+    print('  Header lines: ' + str(len(info['header_data'])))
+    print('  Data columns: ' + str(ncols))
+    print('  Data lines:   ' + str(len(data)))
 
 
 '''
@@ -179,4 +1050,17 @@ Main entry point
 '''
 if __name__ == "__main__":
     args = parseArgs()
-    processNetLogoCSV(args.infile, args.outfile)
+    if len(args.infiles) > 1:
+        processNetLogoCSVFiles(args.infiles, args.outfile, args.processes,
+                               args.tmpdir, args.bindir)
+    elif args.update:
+        updateNetLogoCSV(args.infiles[0], args.outfile)
+    elif args.mmap:
+        processNetLogoCSVSections(args.infiles[0], args.outfile,
+                                  args.processes, args.tmpdir, args.bindir)
+    elif args.numpy:
+        processNetLogoCSVNumPy(args.infiles[0], args.outfile,
+                               bindir=args.bindir)
+    else:
+        processNetLogoCSV(args.infiles[0], args.outfile, args.chunksize,
+                          args.tmpdir, args.bindir)
@@ -20,12 +20,35 @@ def parseArgs():
         help='An input parameter'
     )
 
+    parser.add_argument(
+        '-i', '--infile', type=str,
+        dest='infile',
+        default='',
+        help='An input file, its text is written before the greeting'
+    )
+
+    parser.add_argument(
+        '-o', '--outfile', type=str,
+        dest='outfile',
+        default='',
+        help='An output file, default is standard output'
+    )
+
     return parser.parse_args()
 
 
 if __name__ == '__main__':
     args = parseArgs()
+    text = ''
+    if args.infile:
+        with open(args.infile) as f:
+            text = f.read()
     if args.x > 10:
-        print('Hello, world!')
+        text += 'Hello, world!\n'
+    else:
+        text += 'Goodbye, world!\n'
+    if args.outfile:
+        with open(args.outfile, 'w') as f:
+            f.write(text)
     else:
-        print('Goodbye, world!')
+        print(text, end='')
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+
+
+__all__ = ['AsyncioExecutor']
+
+
+import sys
+import time
+import asyncio
+import contextlib
+import subprocess
+from executors.executor import Executor
+
+
+class AsyncioExecutor(Executor):
+    """Run tasks as subprocesses driven by a single asyncio event loop
+
+    No thread or process is used per task, which keeps launch overhead low
+    for studies with many short-lived commands. Concurrency is bounded by
+    a semaphore of 'workers' slots, stdout/stderr go directly to per-task
+    files.
+
+    Args:
+        timeout (float): Per-task timeout in seconds, tasks exceeding it
+            are killed and finish with return code 124 (default is None)
+    """
+
+    TIMEOUT_RETURNCODE = 124
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.timeout = kwargs.get('timeout')
+        self._loop = asyncio.new_event_loop()
+        if sys.version_info < (3, 8) and sys.platform != 'win32':
+            # Before Python 3.8 the child watcher needs the loop attached
+            # for subprocesses to be waited on
+            asyncio.get_child_watcher().attach_loop(self._loop)
+        self._tasks = {}  # asyncio.Task -> Task
+        self._main = None
+
+    def _active(self):
+        return len(self._tasks)
+
+    async def _execute(self, task):
+        out, err = self.output_files(task)
+        with contextlib.ExitStack() as stack:
+            try:
+                fout = stack.enter_context(open(out, 'wb'))
+                ferr = stack.enter_context(open(err, 'wb'))
+                args, env = self.prepare(task)
+                proc = await asyncio.create_subprocess_exec(
+                    *args, stdout=fout, stderr=ferr,
+                    stdin=subprocess.DEVNULL, env=env)
+            except (OSError, ValueError) as exc:
+                return self._launch_failed(task, exc)
+            try:
+                return await asyncio.wait_for(proc.wait(), self.timeout)
+            except asyncio.TimeoutError:
+                type(self)._logger.warning('{0}: task {1}-{2} timed out after'
+                                           ' {3} s'.format(type(self).__name__,
+                                                           task.name,
+                                                           task.index,
+                                                           self.timeout))
+                proc.kill()
+                await proc.wait()
+                return type(self).TIMEOUT_RETURNCODE
+            except asyncio.CancelledError:
+                proc.kill()
+                await proc.wait()
+                raise
+
+    def _submit(self, task):
+        future = self._loop.create_task(self._execute(task))
+        self._tasks[future] = task
+
+    def _wait(self):
+        done, _ = self._loop.run_until_complete(asyncio.wait(
+            list(self._tasks), return_when=asyncio.FIRST_COMPLETED))
+        results = []
+        for future in done:
+            task = self._tasks.pop(future)
+            results.append((task, self._result(task, future)))
+        return results
+
+    def _result(self, task, future):
+        """Return code of a finished task, 127 if it raised"""
+        try:
+            return future.result()
+        except Exception as exc:
+            return self._launch_failed(task, exc)
+
+    async def _run(self, tasks, callback):
+        slots = asyncio.Semaphore(self.workers)
+
+        def finished(future):
+            slots.release()
+            task = self._tasks.pop(future, None)
+            if task is None or future.cancelled():
+                return
+            rc = self._result(task, future)
+            self._account(task, rc)
+            if callback:
+                callback(task, rc)
+
+        for task in tasks:
+            rc = self._completed(task)
+            if rc is not None:
+                if callback:
+                    callback(task, rc)
+                continue
+            await slots.acquire()
+            self._started[(task.name, task.index)] = time.perf_counter()
+            future = self._loop.create_task(self._execute(task))
+            self._tasks[future] = task
+            future.add_done_callback(finished)
+        if self._tasks:
+            await asyncio.wait(list(self._tasks))
+
+    def run(self, tasks, callback=None):
+        """Run tasks keeping at most 'workers' of them in flight
+
+        See Executor.run(), running tasks are cancelled (and their
+        processes killed) on KeyboardInterrupt.
+        """
+        self.reset_stats()
+        self._main = self._loop.create_task(self._run(tasks, callback))
+        try:
+            self._loop.run_until_complete(self._main)
+        except KeyboardInterrupt:
+            self.cancel()
+            raise
+        finally:
+            self._main = None
+        return self.report()
+
+    def cancel(self):
+        """Cancel all running tasks and kill their processes"""
+        futures = list(self._tasks)
+        if self._main is not None:
+            futures.append(self._main)
+        if not futures:
+            return
+        for future in futures:
+            future.cancel()
+        self._loop.run_until_complete(asyncio.wait(futures))
+        self._tasks.clear()
+
+    def close(self):
+        self.cancel()
+        self._loop.close()
+        super().close()
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+
+
+__all__ = ['Executor']
+
+
+import os
+import time
+import shlex
+from utils.logger import logger
+from journal import Journal
+from cache import ResultCache
+
+
+class Executor(object):
+    """Base class for task execution engines
+
+    Engines launch Tasks and report their completion through submit() and
+    wait(), so that drivers (run() or a scheduler) decide what to dispatch
+    next. Subclasses implement _submit(), _wait(), and _active().
+
+    Args:
+        workers (int): Maximum number of concurrent tasks
+            (default is CPU count)
+        outdir (str): Directory for per-task stdout/stderr files
+            (default is current directory)
+        journal (str|Journal): Record finished tasks in a journal
+        resume (bool): Skip tasks the journal reports as completed
+            (default is False)
+        cache (str|ResultCache): Satisfy repeated tasks from a result
+            cache directory
+        cache_size (int): Maximum size of result cache in bytes
+    """
+
+    _logger = logger
+
+    def __init__(self, **kwargs):
+        self.workers = os.cpu_count() or 1
+        self.outdir = '.'
+        self.stats = {}
+        self.journal = None
+        self.resume = False
+        self.cache = None
+        self._own_journal = False
+        self._own_cache = False
+        self._done = []  # finished without being launched
+        self._started = {}  # (name, index) -> launch time
+
+        if kwargs.get('workers'):
+            self.workers = int(kwargs['workers'])
+        if kwargs.get('outdir'):
+            self.outdir = kwargs['outdir']
+        if kwargs.get('journal'):
+            self.journal = kwargs['journal']
+            if isinstance(self.journal, str):
+                self.journal = Journal(self.journal)
+                self._own_journal = True
+        if kwargs.get('resume'):
+            self.resume = True
+        if kwargs.get('cache'):
+            self.cache = kwargs['cache']
+            if isinstance(self.cache, str):
+                opts = {}
+                if kwargs.get('cache_size'):
+                    opts['max_size'] = int(kwargs['cache_size'])
+                self.cache = ResultCache(self.cache, **opts)
+                self._own_cache = True
+
+        os.makedirs(self.outdir, exist_ok=True)
+        self.reset_stats()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def running(self):
+        """Number of tasks submitted and not yet reported by wait()"""
+        return self._active() + len(self._done)
+
+    def _active(self):
+        raise NotImplementedError
+
+    def _submit(self, task):
+        raise NotImplementedError
+
+    def _wait(self):
+        raise NotImplementedError
+
+    def submit(self, task):
+        """Launch a task without blocking
+
+        Tasks completed in a previous run (see 'resume') or found in the
+        result cache are not launched, they are reported by the next wait().
+        """
+        rc = self._completed(task)
+        if rc is not None:
+            self._done.append((task, rc))
+        else:
+            self._started[(task.name, task.index)] = time.perf_counter()
+            self._submit(task)
+
+    def _completed(self, task):
+        """Return code of a task that does not need to run, else None"""
+        if self.resume and self.journal is not None \
+           and self.journal.completed(task):
+            self.stats['resumed'] += 1
+            return 0
+        if self.cache is not None:
+            rc = self.cache.get(task, self.output_files(task))
+            if rc is not None:
+                self.stats['cached'] += 1
+                if self.journal is not None:
+                    self.journal.record(task, rc)
+                return rc
+        return None
+
+    def wait(self):
+        """Block until at least one running task finishes
+
+        Returns:
+            list: (Task, return code) pairs of finished tasks
+        """
+        if self._done:
+            done, self._done = self._done, []
+            return done
+        done = self._wait()
+        for task, rc in done:
+            self._account(task, rc)
+        return done
+
+    def _account(self, task, rc):
+        """Update statistics, journal, and cache with a finished task"""
+        start = self._started.pop((task.name, task.index), None)
+        if self.journal is not None:
+            self.journal.record(task, rc, None if start is None else
+                                time.perf_counter() - start)
+        if self.cache is not None:
+            self.cache.put(task, rc, self.output_files(task))
+        self.stats['tasks'] += 1
+        if rc != 0:
+            self.stats['failed'] += 1
+            type(self)._logger.warning('{0}: task {1}-{2} failed with '
+                                       'return code {3}'.format(
+                                           type(self).__name__, task.name,
+                                           task.index, rc))
+
+    def _launch_failed(self, task, exc):
+        """Log a task that could not be launched, returns its return code"""
+        type(self)._logger.error('{0}: failed to launch task {1}-{2}, '
+                                 '{3}'.format(type(self).__name__, task.name,
+                                              task.index, exc))
+        return 127
+
+    def close(self):
+        if self._own_journal:
+            self.journal.close()
+        if self._own_cache:
+            self.cache.close()
+
+    def reset_stats(self):
+        self.stats = {
+            'tasks': 0,
+            'failed': 0,
+            'resumed': 0,
+            'cached': 0,
+            'elapsed': 0.,
+            'throughput': 0.,
+            '_start': time.perf_counter()
+        }
+
+    def report(self):
+        """Update elapsed time and throughput statistics
+
+        Returns:
+            dict: Number of tasks run, failed tasks, resumed tasks, cached
+            tasks, elapsed time (s), and throughput (tasks/s)
+        """
+        stats = self.stats
+        stats['elapsed'] = time.perf_counter() - stats['_start']
+        if stats['elapsed'] > 0:
+            stats['throughput'] = stats['tasks'] / stats['elapsed']
+        type(self)._logger.info('{0}: {1} tasks ({2} failed, {3} resumed, '
+                                '{4} cached) in {5:.3f} s, {6:.1f} '
+                                'tasks/s'.format(
+                                    type(self).__name__, stats['tasks'],
+                                    stats['failed'], stats['resumed'],
+                                    stats['cached'], stats['elapsed'],
+                                    stats['throughput']))
+        return {k: v for k, v in stats.items() if not k.startswith('_')}
+
+    def run(self, tasks, callback=None):
+        """Run tasks keeping at most 'workers' of them in flight
+
+        Tasks are pulled from the iterable only when a slot is available,
+        so lazily generated studies are never materialized.
+
+        Args:
+            tasks (iterable): Tasks to run
+            callback (callable): Called with (Task, return code) as each
+                task finishes
+
+        Returns:
+            dict: Execution statistics, see report()
+        """
+        self.reset_stats()
+        it = iter(tasks)
+        more = True
+        while True:
+            while more and self.running < self.workers:
+                try:
+                    self.submit(next(it))
+                except StopIteration:
+                    more = False
+            if not self.running:
+                break
+            for task, rc in self.wait():
+                if callback:
+                    callback(task, rc)
+        return self.report()
+
+    def prepare(self, task):
+        """Command line arguments and environment of a task
+
+        Returns:
+            tuple: (list of arguments, environment dict)
+
+        Raises:
+            ValueError: If command has unbalanced quotes
+        """
+        args = shlex.split(task.command)
+        env = dict(os.environ)
+        env.update({k: str(v) for k, v in task.environ.items()})
+        return args, env
+
+    def output_files(self, task):
+        """Paths of stdout and stderr files of a task"""
+        base = os.path.join(self.outdir,
+                            '{0}-{1}'.format(task.name, task.index))
+        return base + '.out', base + '.err'
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+
+
+__all__ = ['LocalExecutor']
+
+
+import subprocess
+import concurrent.futures
+from executors.executor import Executor
+
+
+class LocalExecutor(Executor):
+    """Run tasks as local processes on a bounded number of worker slots
+
+    Each slot is a thread that spawns one process at a time and waits on
+    it, stdout/stderr go directly to per-task files (see output_files()).
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._pool = concurrent.futures.ThreadPoolExecutor(
+            max_workers=self.workers)
+        self._futures = {}
+
+    def _active(self):
+        return len(self._futures)
+
+    def _execute(self, task):
+        try:
+            args, env = self.prepare(task)
+        except ValueError as exc:
+            return self._launch_failed(task, exc)
+        return self._popen(task, args, env)
+
+    def _popen(self, task, args, env):
+        """Run a process for a task and wait on it"""
+        out, err = self.output_files(task)
+        with open(out, 'wb') as fout, open(err, 'wb') as ferr:
+            try:
+                proc = subprocess.Popen(args, stdout=fout, stderr=ferr,
+                                        stdin=subprocess.DEVNULL, env=env)
+            except (OSError, ValueError) as exc:
+                return self._launch_failed(task, exc)
+            return proc.wait()
+
+    def _submit(self, task):
+        future = self._pool.submit(self._execute, task)
+        self._futures[future] = task
+
+    def _wait(self):
+        done, _ = concurrent.futures.wait(
+            self._futures, return_when=concurrent.futures.FIRST_COMPLETED)
+        return [(self._futures.pop(f), f.result()) for f in done]
+
+    def close(self):
+        self._pool.shutdown()
+        super().close()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+
+
+__all__ = ['SSHExecutor']
+
+
+import os
+import queue
+import shlex
+import shutil
+import tempfile
+import subprocess
+from executors.local import LocalExecutor
+
+
+class SSHExecutor(LocalExecutor):
+    """Distribute tasks across hosts over SSH
+
+    A persistent multiplexed connection (OpenSSH ControlMaster) is opened
+    to each host and reused by all of its tasks. Each host has a number of
+    slots, a task runs on whichever host frees a slot first, so faster
+    hosts take more tasks. A shared filesystem is assumed, tasks run in
+    'remote_dir' and their stdout/stderr are written locally.
+
+    Args:
+        hosts (dict|list): Slots keyed by host name, or list of host names
+            (repeated names add slots)
+            (default is {'localhost': CPU count})
+        ssh (str): SSH client program (default is 'ssh')
+        remote_dir (str): Working directory in hosts
+            (default is current directory)
+        persist (int): Seconds master connections stay open when idle
+            (default is 600)
+
+    Raises:
+        ConnectionError: If no host can be reached
+    """
+
+    def __init__(self, **kwargs):
+        hosts = kwargs.get('hosts') or {'localhost': os.cpu_count() or 1}
+        if isinstance(hosts, (list, tuple)):
+            counts = {}
+            for h in hosts:
+                counts[h] = counts.get(h, 0) + 1
+            hosts = counts
+        self.hosts = {h: int(n) for h, n in hosts.items() if int(n) > 0}
+        if not self.hosts:
+            raise ValueError('no host slots available')
+
+        kwargs['workers'] = sum(self.hosts.values())
+        super().__init__(**kwargs)
+
+        self.ssh = kwargs.get('ssh') or 'ssh'
+        self.remote_dir = kwargs.get('remote_dir') or os.getcwd()
+        self.persist = kwargs.get('persist') or 600
+        self._control_dir = tempfile.mkdtemp(prefix='papas-ssh-')
+
+        self.connect()
+        if not self.hosts:
+            self.close()
+            raise ConnectionError('failed to connect to all hosts')
+        self.workers = sum(self.hosts.values())
+
+        # Interleave hosts so initial dispatch is spread evenly
+        self._slots = queue.Queue()
+        remaining = dict(self.hosts)
+        while remaining:
+            for h in list(remaining):
+                self._slots.put(h)
+                remaining[h] -= 1
+                if not remaining[h]:
+                    del remaining[h]
+
+    def ssh_args(self, host):
+        """SSH command line arguments to reach a host"""
+        return [self.ssh,
+                '-o', 'BatchMode=yes',
+                '-o', 'ControlMaster=auto',
+                '-o', 'ControlPath=' + os.path.join(self._control_dir, '%C'),
+                '-o', 'ControlPersist={0}'.format(self.persist),
+                host]
+
+    def connect(self):
+        """Open master connections to all hosts
+
+        Hosts that fail to connect are removed, their slots are not used.
+        """
+        for host in list(self.hosts):
+            rc = subprocess.call(self.ssh_args(host) + ['true'],
+                                 stdin=subprocess.DEVNULL,
+                                 stdout=subprocess.DEVNULL,
+                                 stderr=subprocess.DEVNULL)
+            if rc != 0:
+                type(self)._logger.error('{0}: failed to connect to {1}, '
+                                         'return code {2}'.format(
+                                             type(self).__name__, host, rc))
+                del self.hosts[host]
+
+    def remote_command(self, task):
+        """Shell command run in a host for a task"""
+        env = ' '.join(shlex.quote('{0}={1}'.format(k, v))
+                       for k, v in task.environ.items())
+        cmd = 'cd {0} && '.format(shlex.quote(self.remote_dir))
+        if env:
+            cmd += 'env ' + env + ' '
+        return cmd + task.command
+
+    def _execute(self, task):
+        host = self._slots.get()
+        try:
+            args = self.ssh_args(host) + [self.remote_command(task)]
+            return self._popen(task, args, None)
+        finally:
+            self._slots.put(host)
+
+    def close(self):
+        super().close()
+        for host in self.hosts:
+            subprocess.call(self.ssh_args(host)[:-1] + ['-O', 'exit', host],
+                            stdin=subprocess.DEVNULL,
+                            stdout=subprocess.DEVNULL,
+                            stderr=subprocess.DEVNULL)
+        shutil.rmtree(self._control_dir, ignore_errors=True)
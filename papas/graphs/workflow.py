@@ -4,7 +4,6 @@
 TODO:
     * make Digraph be an object, not parent
     * clear nodes and edges
-    * allow attribute updates to edges
 """
 
 __all__ = ['WorkflowGraph']
@@ -13,18 +12,35 @@ __all__ = ['WorkflowGraph']
 from utils.logger import logger
 from graphviz import Digraph
 from copy import deepcopy
+import sys
 import json
+import array
+from collections import OrderedDict
 from graphs.styles import graph_styles
 
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+_BIN_MAGIC = b'PAPASWF1'
+
 
 class WorkflowGraph(Digraph):
 
     _wid = 0
     _logger = logger
+    _status_colors = {
+        'done': '#2e8b57',
+        'failed': '#b22222',
+        'partial': '#e69500'
+    }
+    _critical_style = {'color': '#b22222', 'penwidth': '2'}
 
     @property
     def nodes(self):
-        return self._nodes
+        return list(self._nodes)
 
     @nodes.setter
     def nodes(self, nodelist):
@@ -41,22 +57,13 @@ class WorkflowGraph(Digraph):
                 if isinstance(node, tuple) and len(node) == 2:
                     if (isinstance(node[0], str) and node[0]) \
                         and isinstance(node[1], dict):
-                        """
-                        TODO: allow edge updates
-                        Probably need to clear graph, copy contents (except) and add
-                        new.
-                        """
-                        if node[0] not in self.nodes:
-                            self._nodes.append(node[0])
-                            self.node(node[0], **node[1])
+                        self._add_node(node[0], node[1])
                     else:
                         raise ValueError
 
                 # node without attributes
                 elif isinstance(node, str) and node:
-                    if node not in self.nodes:
-                        self._nodes.append(node)
-                        self.node(node)
+                    self._add_node(node)
                 else:
                     raise ValueError
 
@@ -65,7 +72,7 @@ class WorkflowGraph(Digraph):
 
     @property
     def edges(self):
-        return self._edges
+        return list(self._edges)
 
     @edges.setter
     def edges(self, edgelist):
@@ -81,37 +88,259 @@ class WorkflowGraph(Digraph):
                     raise ValueError
 
                 # accept lists because json.dump() converts tuples to lists
-                if isinstance(edge[0], list):
-                    edge[0] = tuple(edge[0])
+                if edge and isinstance(edge[0], list):
+                    edge = (tuple(edge[0]),) + edge[1:]
 
                 # edge with attributes
-                if (isinstance(edge[0], tuple) and len(edge[0]) == 2) \
-                    and isinstance(edge[1], dict):
+                if len(edge) == 2 and isinstance(edge[0], tuple) \
+                    and len(edge[0]) == 2 and isinstance(edge[1], dict):
                     if all([(isinstance(e, str) and e) for e in edge[0]]):
-                        """
-                        TODO: allow edge updates
-                        Probably need to clear graph, copy contents (except) and add
-                        new.
-                        """
-                        if edge[0] not in self.edges:
-                            self.nodes = list(edge[0])
-                            self._edges.append(edge[0])
-                            self.edge(*edge[0], **edge[1])
+                        self._add_edge(edge[0], edge[1])
                     else:
                         raise ValueError
 
                 # edge without attributes
-                elif all([(isinstance(e, str) and e) for e in edge]):
-                    if edge not in self.edges:
-                        self.nodes = list(edge)
-                        self._edges.append(edge)
-                        self.edge(*edge)
+                elif len(edge) == 2 and all([isinstance(e, str) and e
+                                             for e in edge]):
+                    self._add_edge(edge)
                 else:
                     raise ValueError
 
             except ValueError as err:
                 type(self)._logger.error('{0}: Edges must be a single/list tuple of strings, {1}'.format(self._id, err))
 
+    def _body_line(self, method, args, attrs):
+        """Graphviz body line generated by node()/edge()"""
+        method(*args, **attrs)
+        return self.body.pop()
+
+    def _add_node(self, name, attrs=None):
+        """Add a node or update the attributes of an existing node
+
+        Nodes are indexed by name (insertion ordered), the position of each
+        node's line in the body is kept so an update rewrites it in place.
+        """
+        if name in self._nodes:
+            if attrs and any(self._nodes[name].get(k) != v
+                             for k, v in attrs.items()):
+                self._nodes[name].update(attrs)
+                self.body[self._node_lines[name]] = self._body_line(
+                    self.node, (name,), self._nodes[name])
+            return
+        self._nodes[name] = dict(attrs) if attrs else {}
+        self._node_lines[name] = len(self.body)
+        self.node(name, **self._nodes[name])
+
+    def _add_edge(self, edge, attrs=None):
+        """Add an edge and its nodes, or update an existing edge's attributes"""
+        if edge in self._edges:
+            if attrs and any(self._edges[edge].get(k) != v
+                             for k, v in attrs.items()):
+                self._edges[edge].update(attrs)
+                self.body[self._edge_lines[edge]] = self._body_line(
+                    self.edge, edge, self._edges[edge])
+            return
+        for name in edge:
+            self._add_node(name)
+        self._edges[edge] = dict(attrs) if attrs else {}
+        self._edge_lines[edge] = len(self.body)
+        self.edge(*edge, **self._edges[edge])
+
+    def node_attributes(self, name):
+        """Attributes of a node, KeyError if node does not exists"""
+        return self._nodes[name]
+
+    def edge_attributes(self, tail, head):
+        """Attributes of an edge, KeyError if edge does not exists"""
+        return self._edges[(tail, head)]
+
+    def _attr_suffix(self, method, args, attrs):
+        """Attribute list and end of a body line, shared by a batch"""
+        line = self._body_line(method, args, attrs)
+        return line[line.index(args[-1]) + len(args[-1]):]
+
+    def add_nodes_from(self, nodes, **attrs):
+        """Add many nodes with the same attributes
+
+        Nodes are validated once for the whole batch and their body lines
+        are appended together. Nodes already in the graph get their
+        attributes updated in place.
+
+        Args:
+            nodes (iterable): Node names
+            attrs: Attributes of all nodes
+
+        Returns:
+            int: Number of nodes added, 0 if any node name is invalid
+        """
+        nodes = list(nodes)
+        if not all(isinstance(n, str) and n for n in nodes):
+            type(self)._logger.error(
+                '{0}: Nodes must be a list of strings'.format(self._id))
+            return 0
+        nodes = list(OrderedDict.fromkeys(nodes))
+
+        new = [n for n in nodes if n not in self._nodes]
+        if attrs and len(new) < len(nodes):
+            for n in nodes:
+                if n in self._nodes:
+                    self._add_node(n, attrs)
+
+        suffix = self._attr_suffix(self.node, ('n',), attrs)
+        quote = self._quote
+        start = len(self.body)
+        self.body.extend(['\t' + quote(n) + suffix for n in new])
+        for i, n in enumerate(new, start):
+            self._nodes[n] = dict(attrs)
+            self._node_lines[n] = i
+        return len(new)
+
+    def add_edges_from(self, edges, **attrs):
+        """Add many edges with the same attributes
+
+        Edges are validated once for the whole batch, missing nodes are
+        added first (see add_nodes_from), then the body lines of the edges
+        are appended together. Edges already in the graph get their
+        attributes updated in place.
+
+        Args:
+            edges (iterable): (tail, head) pairs of node names
+            attrs: Attributes of all edges
+
+        Returns:
+            int: Number of edges added, 0 if any edge is invalid
+        """
+        edges = list(edges)
+        valid = [isinstance(e, (tuple, list)) and len(e) == 2 for e in edges]
+        if not all(valid) or not all(isinstance(n, str) and n
+                                     for e in edges for n in e):
+            type(self)._logger.error(
+                '{0}: Edges must be a list of tuples of strings'.format(
+                    self._id))
+            return 0
+        edges = list(OrderedDict.fromkeys(map(tuple, edges)))
+
+        new = [e for e in edges if e not in self._edges]
+        if attrs and len(new) < len(edges):
+            for e in edges:
+                if e in self._edges:
+                    self._add_edge(e, attrs)
+
+        nodes = self._nodes
+        self.add_nodes_from(n for e in new for n in e if n not in nodes)
+        suffix = self._attr_suffix(self.edge, ('t', 'h'), attrs)
+        quote = self._quote_edge
+        start = len(self.body)
+        self.body.extend(['\t' + quote(t) + ' -> ' + quote(h) + suffix
+                          for t, h in new])
+        for i, e in enumerate(new, start):
+            self._edges[e] = dict(attrs)
+            self._edge_lines[e] = i
+        return len(new)
+
+    def add_tasks_from(self, scheduler):
+        """Add one node per task instance and their dependencies
+
+        Instances are named '<task name>-<index>' and are taken from the
+        expansion of a study (see Scheduler.instances() and
+        Scheduler.instance_edges()), Task objects are not created.
+
+        Args:
+            scheduler (Scheduler): Dispatcher of the study's tasks
+        """
+        self.add_nodes_from('{0}-{1}'.format(*t)
+                            for t in scheduler.instances())
+        self.add_edges_from(('{0}-{1}'.format(*p), '{0}-{1}'.format(*c))
+                            for p, c in scheduler.instance_edges())
+
+    def _status_attrs(self, status):
+        """Label suffix and fill color of an aggregated status"""
+        label = '\\n{0} tasks'.format(status['tasks'])
+        state = None
+        if status['failed'] or status['skipped']:
+            state = 'failed'
+        elif status['done'] >= status['tasks']:
+            state = 'done'
+        elif status['done']:
+            state = 'partial'
+        if state is not None:
+            label += '\\n{0} done, {1} failed, {2} skipped'.format(
+                status['done'], status['failed'], status['skipped'])
+            return label, {'style': 'filled',
+                           'fillcolor': type(self)._status_colors[state]}
+        return label, {}
+
+    def add_summary_from(self, scheduler):
+        """Add one node per PTask instead of one per task instance
+
+        Nodes are labeled with the number of instances and, once tasks
+        have finished, with the aggregated status of the PTask (see
+        Scheduler.status()), colored as done, partial, or failed. Edges are
+        labeled with the parameter axes shared by both PTasks, i.e., the
+        axes along which instances depend on each other. If the scheduler
+        has task durations, edges of the critical path are highlighted.
+        The graph size is independent of the number of instances.
+
+        Args:
+            scheduler (Scheduler): Dispatcher of the study's tasks
+        """
+        for name in scheduler.order:
+            label, attrs = self._status_attrs(scheduler.status(name))
+            self._add_node(name, dict(attrs, label=name + label))
+        critical = set()
+        cp = scheduler.critical_path()
+        if cp is not None:
+            critical.update(zip(cp[0], cp[0][1:]))
+        for name in scheduler.order:
+            for link in scheduler.links[name]:
+                edge = (name, link.child.name)
+                axes = [link.parent.axes[i][1] for i, _ in link.shared]
+                attrs = {'label': ', '.join(axes)} if axes else {}
+                if edge in critical:
+                    attrs.update(type(self)._critical_style)
+                self._add_edge(edge, attrs)
+
+    def add_task_subgraph_from(self, scheduler, name, limit=1000):
+        """Add the instances of a single PTask and its direct neighbors
+
+        Instances are labeled with their parameter values. Prerequisite
+        and dependent PTasks are shown collapsed, one node per PTask.
+
+        Args:
+            scheduler (Scheduler): Dispatcher of the study's tasks
+            name (str): PTask to drill down into
+            limit (int): Maximum number of instances shown, the rest are
+                collapsed into a single node
+
+        Raises:
+            KeyError: If PTask does not exist
+        """
+        pt = scheduler.ptasks[name]
+        n = len(pt)
+        nodes = []
+        for idx in range(min(n, limit)):
+            node = '{0}-{1}'.format(name, idx)
+            values = pt.decode(idx)
+            label = '\\n'.join('{0}={1}'.format(p, v)
+                               for (_, p, _), v in zip(pt.axes, values))
+            self._add_node(node, {'label': label} if label else {})
+            nodes.append(node)
+        if n > limit:
+            node = '{0}-more'.format(name)
+            self._add_node(node, {'label': '{0} more tasks'.format(n - limit),
+                                  'shape': 'plaintext'})
+            nodes.append(node)
+
+        for a in scheduler.after[name]:
+            label, attrs = self._status_attrs(scheduler.status(a))
+            self._add_node(a, dict(attrs, label=a + label))
+            self.add_edges_from((a, node) for node in nodes)
+        for link in scheduler.links[name]:
+            c = link.child.name
+            label, attrs = self._status_attrs(scheduler.status(c))
+            self._add_node(c, dict(attrs, label=c + label))
+            self.add_edges_from((node, c) for node in nodes)
+
     @property
     def style(self):
         return self._style
@@ -140,8 +369,11 @@ class WorkflowGraph(Digraph):
     def __init__(self, **conf):
         type(self)._wid += 1
         self._id = type(self)._wid
-        self._nodes = []
-        self._edges = []
+        # insertion order is node/edge order, also before Python 3.7
+        self._nodes = OrderedDict()  # name -> attributes
+        self._edges = OrderedDict()  # (tail, head) -> attributes
+        self._node_lines = {}  # name -> position in body
+        self._edge_lines = {}  # (tail, head) -> position in body
         self._style = {}
 
         # graphviz.Digraph contains these data members
@@ -282,11 +514,185 @@ class WorkflowGraph(Digraph):
         return nodes_str
         #return self.source
 
+    def _pack(self):
+        """Compact form of the graph
+
+        Node names and attributes are interned in a string table, nodes
+        are integer IDs (their position in 'nodes'), and edges are two
+        parallel arrays of tail and head IDs. Attributes are flat lists of
+        (ID, number of attributes, key, value, ...) integers, only for
+        nodes/edges that have them. Body lines other than nodes and edges
+        (e.g., from attr() or subgraph()) are kept verbatim in 'body'.
+        'order' is the sequence of body lines, a value is a node ID, or the
+        number of nodes plus an edge position, or the number of nodes and
+        edges plus a position in 'body', so the DOT source is unchanged.
+        """
+        strings = OrderedDict()  # string -> ID, in order of IDs
+        intern = strings.setdefault
+
+        def pack_attrs(items):
+            flat = []
+            for i, attrs in enumerate(items):
+                if attrs:
+                    flat.append(i)
+                    flat.append(len(attrs))
+                    for k, v in attrs.items():
+                        flat.append(intern(k, len(strings)))
+                        flat.append(intern(v, len(strings)))
+            return flat
+
+        nodes = [intern(n, len(strings)) for n in self._nodes]
+        ids = {n: i for i, n in enumerate(self._nodes)}
+        tails = [ids[t] for t, _ in self._edges]
+        heads = [ids[h] for _, h in self._edges]
+        order = [None] * len(self.body)
+        for i, n in enumerate(self._nodes):
+            order[self._node_lines[n]] = i
+        for i, e in enumerate(self._edges, len(nodes)):
+            order[self._edge_lines[e]] = i
+        body = []
+        for i, line in enumerate(self.body):
+            if order[i] is None:
+                order[i] = len(nodes) + len(tails) + len(body)
+                body.append(line)
+        return {
+            'version': 1,
+            'graph': {
+                'name': self.name,
+                'comment': self.comment,
+                'filename': self.filename,
+                'directory': self.directory,
+                'format': self.format,
+                'engine': self.engine,
+                'encoding': self.encoding,
+                'graph_attr': self.graph_attr,
+                'node_attr': self.node_attr,
+                'edge_attr': self.edge_attr,
+                'strict': self.strict,
+                '_style': self._style
+            },
+            'nodes': nodes,
+            'tails': tails,
+            'heads': heads,
+            'node_attrs': pack_attrs(self._nodes.values()),
+            'edge_attrs': pack_attrs(self._edges.values()),
+            'strings': list(strings),
+            'order': order,
+            'body': body
+        }
+
+    @staticmethod
+    def _unpack(data):
+        """Graph from its compact form, without per-element validation"""
+        wf = __class__(**data['graph'])
+        strings = data['strings']
+
+        def unpack_attrs(flat):
+            attrs = {}
+            i = 0
+            while i < len(flat):
+                n = flat[i + 1]
+                kv = flat[i + 2:i + 2 + 2 * n]
+                attrs[flat[i]] = {strings[k]: strings[v]
+                                  for k, v in zip(kv[::2], kv[1::2])}
+                i += 2 + 2 * n
+            return attrs
+
+        names = [strings[i] for i in data['nodes']]
+        pairs = list(zip(data['tails'], data['heads']))
+        edges = [(names[t], names[h]) for t, h in pairs]
+        node_attrs = unpack_attrs(data['node_attrs'])
+        edge_attrs = unpack_attrs(data['edge_attrs'])
+
+        # names are quoted once, edge quoting only differs for 'node:port'
+        suffix = wf._attr_suffix(wf.node, ('n',), {})
+        quoted = [wf._quote(n) for n in names]
+        lines = ['\t' + q + suffix for q in quoted]
+        for i, attrs in node_attrs.items():
+            lines[i] = wf._body_line(wf.node, (names[i],), attrs)
+        quoted = [q if ':' not in n else wf._quote_edge(n)
+                  for n, q in zip(names, quoted)]
+        lines.extend(['\t' + quoted[t] + ' -> ' + quoted[h] + suffix
+                      for t, h in pairs])
+        for i, attrs in edge_attrs.items():
+            lines[len(names) + i] = wf._body_line(wf.edge, edges[i], attrs)
+        lines.extend(data['body'])
+
+        order = data['order']
+        position = [0] * len(lines)
+        for i, j in enumerate(order):
+            position[j] = i
+        wf._nodes = OrderedDict((n, node_attrs.get(i, {}))
+                                for i, n in enumerate(names))
+        wf._edges = OrderedDict((e, edge_attrs.get(i, {}))
+                                for i, e in enumerate(edges))
+        wf._node_lines = dict(zip(names, position))
+        wf._edge_lines = dict(zip(edges, position[len(names):]))
+        wf.body[:] = [lines[j] for j in order]
+        return wf
+
+    _arrays = ['nodes', 'tails', 'heads', 'node_attrs', 'edge_attrs',
+               'order']
+
+    @staticmethod
+    def bin_load(fn):
+        """Load workflow saved with bin_save()"""
+        try:
+            with open(fn, 'rb') as fd:
+                magic = fd.read(len(_BIN_MAGIC) + 1)
+                if magic[:-1] != _BIN_MAGIC:
+                    raise ValueError('not a workflow file')
+                if magic[-1:] == b'M':
+                    if msgpack is None:
+                        raise ValueError('msgpack is not installed')
+                    data = msgpack.unpackb(fd.read(), raw=False,
+                                           strict_map_key=False)
+                    for k in __class__._arrays:
+                        data[k] = array.array('I', data[k])
+                        if data['byteorder'] != sys.byteorder:
+                            data[k].byteswap()
+                else:
+                    data = json.loads(fd.read().decode())
+            return __class__._unpack(data)
+
+        except Exception as err:
+            __class__._logger.error('Failed to load workflow from file '
+                                    '({0}), {1}'.format(fn, err))
+            return None
+
+    def bin_save(self, fn=''):
+        """Save workflow in compact binary form, see _pack()
+
+        The file is msgpack, with integer arrays stored as raw bytes, if
+        the msgpack package is available, else compact JSON.
+        """
+        if not fn:
+            fn = self.name + '.wf'
+
+        try:
+            data = self._pack()
+            with open(fn, 'wb') as fd:
+                if msgpack is not None:
+                    for k in type(self)._arrays:
+                        data[k] = array.array('I', data[k]).tobytes()
+                    data['byteorder'] = sys.byteorder
+                    fd.write(_BIN_MAGIC + b'M')
+                    fd.write(msgpack.packb(data, use_bin_type=True))
+                else:
+                    fd.write(_BIN_MAGIC + b'J')
+                    fd.write(json.dumps(data, separators=(',', ':')).encode())
+
+        except Exception as err:
+            type(self)._logger.error('{0}: Failed to dump workflow into file '
+                                     '({1}), {2}'.format(self._id, fn, err))
+
     @staticmethod
     def json_load(fn):
         try:
             with open(fn, 'r') as fd:
                 wf_dict = json.load(fd)
+            if 'strings' in wf_dict:
+                return __class__._unpack(wf_dict)
             return __class__(**wf_dict)
 
         except Exception as err:
@@ -299,7 +705,7 @@ class WorkflowGraph(Digraph):
 
         try:
             with open(fn, 'w') as fd:
-                json.dump(self.__dict__, fd)
+                json.dump(self._pack(), fd, separators=(',', ':'))
 
         except Exception as err:
             type(self)._logger.error('{0}: Failed to dump workflow into JSON file ({1}), {2}'.format(self._id, fn, err))
@@ -321,7 +727,9 @@ class WorkflowGraph(Digraph):
 
     def clear(self, keep_style=False):
         super().clear(keep_style)
-        self._nodes = []
-        self._edges = []
+        self._nodes = OrderedDict()
+        self._edges = OrderedDict()
+        self._node_lines = {}
+        self._edge_lines = {}
         if not keep_style:
             self._style = {}
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+
+
+__all__ = ['Journal']
+
+
+import time
+import sqlite3
+import threading
+from utils.logger import logger
+
+
+class Journal(object):
+    """Append-only record of finished tasks
+
+    Records are stored in a SQLite database in WAL mode and committed as
+    each task finishes, so a study interrupted at any point (e.g., node
+    preemption or walltime limit) can be resumed by skipping tasks that
+    already completed successfully. Tasks are identified by Task.key, a
+    hash of their resolved command and environment.
+
+    Args:
+        fn (str): Journal file
+    """
+
+    _logger = logger
+
+    def __init__(self, fn='papas.journal'):
+        self.fn = fn
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(fn, isolation_level=None,
+                                   check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.execute('CREATE TABLE IF NOT EXISTS tasks ('
+                         'key TEXT NOT NULL, '
+                         'name TEXT, '
+                         'idx INTEGER, '
+                         'returncode INTEGER, '
+                         'finished REAL, '
+                         'duration REAL)')
+        self._db.execute('CREATE INDEX IF NOT EXISTS tasks_key '
+                         'ON tasks (key, returncode)')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def record(self, task, returncode, duration=None):
+        """Append a finished task, with its run time in seconds if known"""
+        with self._lock:
+            self._db.execute('INSERT INTO tasks VALUES (?, ?, ?, ?, ?, ?)',
+                             (task.key, task.name, task.index, returncode,
+                              time.time(), duration))
+
+    def completed(self, task):
+        """Check if a task has completed successfully in a previous run"""
+        with self._lock:
+            row = self._db.execute('SELECT 1 FROM tasks WHERE key = ? AND '
+                                   'returncode = 0 LIMIT 1',
+                                   (task.key,)).fetchone()
+        return row is not None
+
+    def durations(self):
+        """Mean run time (s) of successful instances, keyed by task name"""
+        with self._lock:
+            rows = self._db.execute('SELECT name, AVG(duration) FROM tasks '
+                                    'WHERE returncode = 0 AND duration IS '
+                                    'NOT NULL GROUP BY name').fetchall()
+        return dict(rows)
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute('SELECT COUNT(*) FROM tasks').fetchone()[0]
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
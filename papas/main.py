@@ -18,10 +18,10 @@ python3 papas.py -a tasks_conf/YAML_conf/helloWorld.yml
 """
 
 
-# import sys
 import os
+import sys
 import argparse
-from papas import PaPaS
+from papas import PaPaS, engines
 
 
 default_conf_file = 'papas_conf/PaPaS.yml'
@@ -54,6 +54,70 @@ def parse_args():
         help='Application YAML/JSON/INI configuration file'
     )
 
+    parser.add_argument(
+        '-w', '--workers', type=int, dest='workers',
+        default=0,
+        help='Number of concurrent tasks\n'
+             'Default is number of CPUs'
+    )
+
+    parser.add_argument(
+        '-e', '--engine', type=str, dest='engine',
+        default='local', choices=sorted(engines),
+        help='Execution engine\n'
+             'Default is \'local\''
+    )
+
+    parser.add_argument(
+        '-t', '--timeout', type=float, dest='timeout',
+        default=None,
+        help='Per-task timeout in seconds (async engine only)'
+    )
+
+    parser.add_argument(
+        '--hosts', type=str, dest='hosts',
+        default='',
+        help='Comma-separated list of host[:slots] (ssh engine only)\n'
+             'Default is localhost with number of CPUs slots'
+    )
+
+    parser.add_argument(
+        '-j', '--journal', type=str, dest='journal',
+        default='',
+        help='Journal file recording finished tasks'
+    )
+
+    parser.add_argument(
+        '-r', '--resume', action='store_true', dest='resume',
+        help='Skip tasks completed according to journal'
+    )
+
+    parser.add_argument(
+        '--cache', type=str, dest='cache',
+        default='',
+        help='Result cache directory'
+    )
+
+    parser.add_argument(
+        '--conf-cache', type=str, dest='conf_cache',
+        default='', nargs='?', const=os.path.join('.papas_cache', 'conf'),
+        help='Parsed configuration cache directory\n'
+             '(default is .papas_cache/conf if no directory is given)'
+    )
+
+    parser.add_argument(
+        '--plan', action='store_true', dest='plan',
+        help='Report critical path and makespan lower bound, do not run\n'
+             'Durations are taken from the journal'
+    )
+
+    parser.add_argument(
+        '-o', '--outdir', type=str, dest='outdir',
+        default='.',
+        help='Directory for task output files\n'
+             'Default is current directory'
+    )
+
     return parser.parse_args()
 
 
@@ -133,6 +197,28 @@ def process_app_conf(conf_data, app_conf_data):
 
 if __name__ == '__main__':
     args = parse_args()
-    pp = PaPaS(**vars(args))
+    pp = PaPaS(conf=args.conf, app=args.app_conf,
+               conf_cache=args.conf_cache)
+    if pp.errors:
+        sys.exit(1)  # invalid configuration, errors were logged
     print(pp)
-    pp.print_app()
+    opts = {'workers': args.workers, 'outdir': args.outdir,
+            'journal': args.journal, 'resume': args.resume,
+            'cache': args.cache}
+    if args.engine == 'async':
+        opts['timeout'] = args.timeout
+    elif args.engine == 'ssh' and args.hosts:
+        opts['hosts'] = {}
+        for h in args.hosts.split(','):
+            host, _, slots = h.partition(':')
+            opts['hosts'][host] = int(slots) if slots else 1
+    if args.plan:
+        plan = pp.plan(workers=args.workers or os.cpu_count() or 1,
+                       journal=args.journal)
+        print('Critical path: {0}'.format(' -> '.join(plan['critical_path'])))
+        print('Critical path length: {0:.3f} s'.format(plan['length']))
+        print('Total work: {0:.3f} s'.format(plan['work']))
+        print('Makespan lower bound: {0:.3f} s'.format(
+            plan['makespan_lower_bound']))
+    else:
+        pp.run(engine=args.engine, **opts)
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+
+
+"""PaPaS MPI task farm
+
+Dynamic master/worker distribution of tasks from a task file (see taskfile)
+across all ranks of an MPI allocation. Rank 0 hands out one task at a time
+and workers request another as soon as they finish, so tasks of
+heterogeneous duration are load-balanced across nodes. The master records
+finished tasks in the journal, if given.
+
+
+Example
+=======
+
+mpirun -n 4 python3 mpi_farm.py -f hello.tasks -o output
+"""
+
+
+import sys
+import time
+import argparse
+from mpi4py import MPI
+from task import Task
+from taskfile import load_tasks
+from journal import Journal
+from executors.local import LocalExecutor
+from utils.logger import logger
+
+
+TAG_RESULT = 1
+"""int: Message tag of worker requests, carry previous return code"""
+
+TAG_TASK = 2
+"""int: Message tag of master replies with a task"""
+
+TAG_STOP = 3
+"""int: Message tag of master replies when no tasks are left"""
+
+
+def parse_args():
+    """Parse and validate command line arguments
+
+    Returns:
+        argparse.Namespace: object with command line argument name/values
+    """
+
+    parser = argparse.ArgumentParser(
+        prog=__file__,
+        description='PaPaS: MPI task farm',
+        formatter_class=argparse.RawTextHelpFormatter
+    )
+
+    parser.add_argument(
+        '-f', '--tasks', type=str, dest='tasks',
+        required=True,
+        help='Task file'
+    )
+
+    parser.add_argument(
+        '-j', '--journal', type=str, dest='journal',
+        default='',
+        help='Journal file recording finished tasks'
+    )
+
+    parser.add_argument(
+        '-r', '--resume', action='store_true', dest='resume',
+        help='Skip tasks completed according to journal'
+    )
+
+    parser.add_argument(
+        '-o', '--outdir', type=str, dest='outdir',
+        default='.',
+        help='Directory for task output files\n'
+             'Default is current directory'
+    )
+
+    return parser.parse_args()
+
+
+def master(comm, tasks, journal=None, resume=False):
+    """Hand out tasks to workers on demand
+
+    Args:
+        comm (MPI.Comm): Communicator, master is rank 0
+        tasks (iterable): Tasks to run
+        journal (Journal): Record finished tasks
+        resume (bool): Skip tasks completed according to journal
+
+    Returns:
+        dict: Execution statistics
+    """
+    stats = {'tasks': 0, 'failed': 0, 'resumed': 0}
+    tic = time.perf_counter()
+    it = iter(tasks)
+    running = {}  # rank -> (Task, launch time)
+    active = comm.Get_size() - 1
+    status = MPI.Status()
+
+    while active:
+        rc = comm.recv(source=MPI.ANY_SOURCE, tag=TAG_RESULT, status=status)
+        rank = status.Get_source()
+        task, start = running.pop(rank, (None, None))
+        if task is not None:
+            stats['tasks'] += 1
+            if rc != 0:
+                stats['failed'] += 1
+                logger.warning('MPI farm: task {0}-{1} failed on rank {2} '
+                               'with return code {3}'.format(
+                                   task.name, task.index, rank, rc))
+            if journal is not None:
+                journal.record(task, rc, time.perf_counter() - start)
+
+        task = next(it, None)
+        while task is not None and resume and journal is not None \
+                and journal.completed(task):
+            stats['resumed'] += 1
+            task = next(it, None)
+
+        if task is None:
+            comm.send(None, dest=rank, tag=TAG_STOP)
+            active -= 1
+        else:
+            running[rank] = (task, time.perf_counter())
+            comm.send(task.to_dict(), dest=rank, tag=TAG_TASK)
+
+    stats['elapsed'] = time.perf_counter() - tic
+    stats['throughput'] = stats['tasks'] / stats['elapsed'] \
+        if stats['elapsed'] > 0 else 0.
+    logger.info('MPI farm: {0} tasks ({1} failed, {2} resumed) on {3} '
+                'workers in {4:.3f} s, {5:.1f} tasks/s'.format(
+                    stats['tasks'], stats['failed'], stats['resumed'],
+                    comm.Get_size() - 1, stats['elapsed'],
+                    stats['throughput']))
+    return stats
+
+
+def worker(comm, outdir='.'):
+    """Request and run tasks until master has none left
+
+    Args:
+        comm (MPI.Comm): Communicator, master is rank 0
+        outdir (str): Directory for task output files
+    """
+    status = MPI.Status()
+    rc = None
+    with LocalExecutor(workers=1, outdir=outdir) as executor:
+        while True:
+            comm.send(rc, dest=0, tag=TAG_RESULT)
+            data = comm.recv(source=0, tag=MPI.ANY_TAG, status=status)
+            if status.Get_tag() == TAG_STOP:
+                break
+            executor.submit(Task(**data))
+            _, rc = executor.wait()[0]
+
+
+def run_farm(args, comm=MPI.COMM_WORLD):
+    """Run task farm in all ranks
+
+    A single rank runs all tasks locally.
+
+    Returns:
+        dict: Execution statistics in rank 0, None in other ranks
+    """
+    if comm.Get_rank() != 0:
+        worker(comm, args.outdir)
+        return None
+
+    tasks = load_tasks(args.tasks)
+    journal = Journal(args.journal) if args.journal else None
+    try:
+        if comm.Get_size() == 1:
+            with LocalExecutor(outdir=args.outdir, journal=journal,
+                               resume=args.resume) as executor:
+                return executor.run(tasks)
+        return master(comm, tasks, journal, args.resume)
+    finally:
+        if journal is not None:
+            journal.close()
+
+
+if __name__ == '__main__':
+    stats = run_farm(parse_args())
+    failed = MPI.COMM_WORLD.bcast(stats['failed'] if stats else 0, root=0)
+    sys.exit(1 if failed else 0)
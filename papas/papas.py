@@ -10,6 +10,27 @@ import os
 import json
 import yaml
 from utils.logger import logger
+from utils.exceptions import ParseError
+from task import PTask
+from parsers.interpolation import Interpolator, Resolver, TemplateCache
+from parsers.loader import (ConfCache, file_format, detect_format,
+                            parse_detected, load_file)
+from parsers.validator import ConfValidator
+from journal import Journal
+from scheduler import Scheduler
+from graphs.workflow import WorkflowGraph
+from batch import BatchScript
+from executors.local import LocalExecutor
+from executors.asyncio_executor import AsyncioExecutor
+from executors.ssh import SSHExecutor
+
+
+engines = {
+    'local': LocalExecutor,
+    'async': AsyncioExecutor,
+    'ssh': SSHExecutor
+}
+"""dict: Execution engines selectable in PaPaS.run()"""
 
 
 class PaPaS(object):
@@ -19,7 +40,18 @@ class PaPaS(object):
     def __init__(self, **kwargs):
         self.papas_data = {}
         self.app_data = {}
-
+        self.ptasks = {}
+        self.study = {}
+        self.templates = TemplateCache()
+        self.conf_cache = None
+        self.scheduler = None
+        self.inherited = {}
+        self.errors = []
+
+        if 'conf_cache' in kwargs and kwargs['conf_cache']:
+            self.conf_cache = kwargs['conf_cache']
+            if isinstance(self.conf_cache, str):
+                self.conf_cache = ConfCache(self.conf_cache)
         if 'conf' in kwargs:
             self.load_papas(kwargs['conf'])
         if 'app' in kwargs:
@@ -48,27 +80,22 @@ class PaPaS(object):
         elif isinstance(conf, str):
             # It is an existing file
             if os.path.isfile(conf):
-                fn, xt = os.path.splitext(conf)
-                ext = xt[1:].lower()
-                if ext in ['yaml', 'yml']:
-                    type(self)._logger.debug('Loading PaPaS configuration from '
-                                      'YAML file')
-                    with open(conf, 'r') as fd:
-                        data = yaml.load(fd)
-                elif ext in ['json']:
-                    type(self)._logger.debug('Loading PaPaS configuration from '
-                                      'JSON file')
-                    with open(conf, 'r') as fd:
-                        data = json.load(fd)
-                elif ext in ['ini']:
+                fmt = file_format(conf)
+                if fmt is None:
+                    type(self)._logger.info('Unknown configuration file '
+                                            'extension, %s' % conf)
+                else:
                     type(self)._logger.debug('Loading PaPaS configuration from '
-                                      'INI file')
-                    # with open(conf, 'r') as fd:
-                    #    data = ini.load(fd)
+                                      '%s file' % fmt.upper())
+                    if self.conf_cache is not None:
+                        data = self.conf_cache.load(conf, fmt)
+                    else:
+                        data = load_file(conf, fmt)
             # Check YAML/JSON/INI string
             else:
+                fmt = detect_format(conf)
                 try:
-                    data = yaml.load(conf)
+                    data = parse_detected(conf)
                 except yaml.YAMLError as exc:
                     if hasattr(exc, 'problem_mark'):
                         mark = exc.problem_mark
@@ -77,27 +104,19 @@ class PaPaS(object):
                               (mark.line + 1, mark.column + 1, exc))
                     else:
                         type(self)._logger.info('Error loading configuration data'
-                                         ' as YAML format: ', exc)
-                    pass
-                else:
-                    type(self)._logger.debug('Loading PaPaS configuration from '
-                                      'YAML string')
-                try:
-                    data = json.load(conf)
+                                         ' as YAML format: %s' % exc)
                 except json.JSONDecodeError as exc:
                     type(self)._logger.info('Error loading configuration data'
-                                     ' as JSON format: ', exc)
-                    pass
+                                     ' as JSON format: %s' % exc)
+                except ParseError as exc:
+                    type(self)._logger.info('Error loading configuration data'
+                                     ' as INI format: %s' % exc)
+                except ValueError as exc:
+                    type(self)._logger.info('Error loading configuration '
+                                            'data: %s' % exc)
                 else:
                     type(self)._logger.debug('Loading PaPaS configuration from '
-                                      'JSON string')
-                # try:
-                #    data = ini.load(conf)
-                # except:
-                #    pass
-                # else:
-                #    type(self)._logger.debug('Loading PaPaS configuration from '
-                #                      'INI string')
+                                      '%s string' % fmt.upper())
 
         return data
 
@@ -126,7 +145,9 @@ class PaPaS(object):
 
     def validate_papas(self, data):
         """Validate and clean configuration data"""
-        return True
+        validator = ConfValidator()
+        self.errors = validator.validate_papas(data)
+        return validator.report(self.errors, 'PaPaS configuration')
 
     def load_app(self, conf=''):
         """Load application configuration
@@ -138,14 +159,64 @@ class PaPaS(object):
         Returns:
         """
         data = self.load_conf(conf)
+
+        # Validated and resolved study of an unchanged file
+        cached = isinstance(conf, str) and self.conf_cache is not None
+        resolved = self.conf_cache.derived(conf, 'study') if cached else None
+        if resolved is not None:
+            self.app_data = data
+            self.errors = []
+            self.inherited = {}
+            for name, k, p, loc in resolved['inherited']:
+                self.inherited.setdefault(name, {})[(k, p)] = tuple(loc)
+            self.build_ptasks(resolved['study'])
+            return
+
         if self.validate_app(data):
             self.app_data = data
+            self.build_ptasks()
+            if cached:
+                # Inherited axes as lists, cache entries have no tuples
+                inherited = [[name, k, p, list(loc)]
+                             for name, axes in self.inherited.items()
+                             for (k, p), loc in axes.items()]
+                self.conf_cache.store_derived(
+                    conf, 'study', {'study': self.study,
+                                    'inherited': inherited})
+
+    def build_ptasks(self, study=None):
+        """Create parametric tasks from application configuration data
+        Tasks are not expanded, see PTask.
+
+        Args:
+            study (dict): Resolved study, see interpolate()
+                (default is resolved from 'app_data')
+        """
+        if study is None:
+            if isinstance(self.app_data, dict):
+                items = self.app_data.items()
+            else:
+                items = enumerate(self.app_data)
+            study = self.interpolate({str(k): v for k, v in items})
+        self.study = study
+        interp = Interpolator(study=study, templates=self.templates)
+        self.ptasks = {k: PTask(name=k, conf=v, interpolator=interp,
+                                inherited=self.inherited.get(k, {}))
+                       for k, v in study.items()}
+        self.scheduler = None
+
+    def tasks(self):
+        """Generator of all Tasks in the study"""
+        for pt in self.ptasks.values():
+            yield from pt
 
     def dump_app(self):
         pass
 
     def validate_app(self, data):
         """Validate application configuration data
+        All problems found are logged and kept in 'errors' (see
+        ConfValidator).
 
         Args:
             data (dict): Application configuration data
@@ -153,36 +224,165 @@ class PaPaS(object):
         Returns:
             bool: True if configurations is valid, else False
         """
-        app_keys = ['command']
-        if isinstance(data, dict):
-            for d in data.keys():
-                for k in app_keys:
-                    if k not in data[d].keys():
-                        return False
-        elif isinstance(data, list):
-            for l in data:
-                for k in app_keys:
-                    if k not in l.keys():
-                        return False
-        return True
-
-    def interpolate(self):
-        pass
+        validator = ConfValidator(templates=self.templates)
+        self.errors = validator.validate(data)
+        return validator.report(self.errors, 'application configuration')
 
-    def resolve_dependencies(self):
-        pass
+    def interpolate(self, study):
+        """Resolve references of all tasks once, see Resolver
+        Only references of tasks to their own parameter axes are left.
+        Axes inherited from other tasks are kept in 'inherited'.
 
-    def run(self):
-        pass
+        Args:
+            study (dict): Configuration of all tasks, keyed by task name
+
+        Returns:
+            dict: Study with resolved values
+
+        Raises:
+            InterpolationError: If a reference does not exist or there is
+                a reference cycle
+        """
+        resolver = Resolver(study, PTask._param_keys, self.templates)
+        study = resolver.resolve()
+        self.inherited = resolver.inherited
+        return study
+
+    def resolve_dependencies(self, durations=None):
+        """Build the task dependency graph from 'after' lists
+
+        Args:
+            durations (dict): Run time of an instance keyed by task name,
+                enables critical path priority dispatch (see Scheduler)
+
+        Returns:
+            Scheduler: Dispatcher of tasks in dependency order
+
+        Raises:
+            DependencyError: If a dependency is unknown or there is a cycle
+        """
+        return Scheduler(self.ptasks, durations)
+
+    def estimate_durations(self, journal=None):
+        """Run times of task instances recorded in a journal
+
+        Args:
+            journal (str|Journal): Journal of previous runs
+
+        Returns:
+            dict: Mean run time (s) keyed by task name, None if there is
+            no journal and no task has a 'duration' estimate
+        """
+        durations = {}
+        if isinstance(journal, Journal):
+            durations = journal.durations()
+        elif journal and os.path.isfile(journal):
+            with Journal(journal) as j:
+                durations = j.durations()
+        if not durations and not any('duration' in pt.conf
+                                     for pt in self.ptasks.values()):
+            return None
+        return durations
+
+    def plan(self, workers=1, journal=None):
+        """Critical path and lower bound of the makespan of the study
+
+        Tasks without recorded or estimated durations count as the mean
+        known duration, or 1 s if none is known.
+
+        Args:
+            workers (int): Number of concurrent tasks
+            journal (str|Journal): Journal of previous runs
+
+        Returns:
+            dict: See Scheduler.predict()
+        """
+        durations = self.estimate_durations(journal) or {}
+        return self.resolve_dependencies(durations).predict(workers)
+
+    def build_workflow(self, summary=False, task=None, **kwargs):
+        """Graph of tasks and their dependencies
+
+        The status of tasks is taken from the last run, if any.
+
+        Args:
+            summary (bool): One node per PTask instead of one per task
+                instance, for studies too large to render
+            task (str): Only the instances of this PTask and its direct
+                prerequisites and dependents
+            kwargs: Options of WorkflowGraph (e.g., name, format)
+
+        Returns:
+            WorkflowGraph: Graph ready to render
+        """
+        scheduler = self.scheduler or self.resolve_dependencies()
+        wf = WorkflowGraph(**kwargs)
+        if task is not None:
+            wf.add_task_subgraph_from(scheduler, task)
+        elif summary:
+            wf.add_summary_from(scheduler)
+        else:
+            wf.add_tasks_from(scheduler)
+        return wf
+
+    def run(self, engine='local', callback=None, **kwargs):
+        """Run all tasks of the study
+
+        Dispatch follows the critical path if durations are known from the
+        journal or from 'duration' estimates, see estimate_durations().
+
+        Args:
+            engine (str): Execution engine, see 'engines'
+            callback (callable): Called with (Task, return code) as each
+                task finishes
+            kwargs: Engine options (e.g., workers, outdir)
+
+        Returns:
+            dict: Execution statistics, and 'plan' with the report of
+            Scheduler.predict() if durations are known
+        """
+        scheduler = self.resolve_dependencies(
+            self.estimate_durations(kwargs.get('journal')))
+        self.scheduler = scheduler
+        with engines[engine](**kwargs) as executor:
+            plan = None
+            if scheduler.durations is not None:
+                plan = scheduler.predict(executor.workers)
+            stats = scheduler.run(executor, callback=callback)
+        if plan is not None:
+            stats['plan'] = plan
+        return stats
 
     def detect_system(self):
         pass
 
-    def build_batch_script(self):
-        pass
+    def build_batch_script(self, **kwargs):
+        """Generate batch job array scripts for the study
 
-    def build_ssh_script(self):
-        pass
+        Args:
+            kwargs: Options of BatchScript (e.g., system, tasks_per_job,
+                directory, options)
+
+        Returns:
+            str: Path of submit script
+        """
+        scheduler = self.resolve_dependencies()
+        return BatchScript(**kwargs).write(self.ptasks, scheduler.order,
+                                           scheduler.after)
+
+    def build_ssh_script(self, **kwargs):
+        """Build SSH execution engine over a list of hosts
+
+        Args:
+            kwargs: Options of SSHExecutor (e.g., hosts, remote_dir)
+
+        Returns:
+            SSHExecutor: Engine with master connections to all hosts open,
+            run the study with it using resolve_dependencies().run()
+        """
+        return SSHExecutor(**kwargs)
 
     def clear(self):
         self.app_data = {}
+        self.ptasks = {}
+        self.scheduler = None
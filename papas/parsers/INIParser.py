@@ -198,27 +198,163 @@ from configparser import (
 import configparser
 import collections
 import re
-
-
-__all__ = ['MyParser']
+from parsers.interpolation import TemplateCache
+from utils.exceptions import InterpolationError, ParseError
+
+
+__all__ = ['MyParser', 'parse_ini']
+
+
+_SECTCRE = re.compile(r'\[(?P<name>[^\]]+)\]\s*$')
+_OPTCRE = re.compile(r'(?P<name>[\w.-]+)\s*:(?:\s+(?P<value>.*))?$')
+_INTCRE = re.compile(r'[-+]?\d+$')
+_FLOATCRE = re.compile(r'[-+]?(\d+\.\d*|\.\d+|\d+)([eE][-+]?\d+)?$')
+
+
+def _convert(value):
+    """Integer and decimal values are converted as YAML does"""
+    if _INTCRE.match(value):
+        return int(value)
+    if _FLOATCRE.match(value):
+        return float(value)
+    return value
+
+
+def _build_value(value, lines, source):
+    """Value of a first-level name from its inline value and the
+    (line number, indentation, text) of its indented lines
+
+    An inline value followed by indented lines is a list, indented lines
+    of 'name: value' entries are a dictionary, other indented lines are a
+    list. Values of second-level names follow the same rules.
+    """
+    if not lines:
+        return None if value is None else _convert(value)
+    if value is not None:
+        return [_convert(value)] + [_convert(t) for _, _, t in lines]
+
+    lineno, base, text = lines[0]
+    if not _OPTCRE.match(text):
+        return [_convert(t) for _, _, t in lines]
+
+    entries = {}
+    name = None
+    nested = []
+    for lineno, indent, text in lines:
+        if indent > base:
+            nested.append((lineno, indent, text))
+            continue
+        if indent < base:
+            raise ParseError('inconsistent indentation', source, lineno)
+        m = _OPTCRE.match(text)
+        if m is None:
+            raise ParseError("expected 'name: value'", source, lineno)
+        if name is not None:
+            entries[name] = _build_nested(entries[name], nested)
+        name = m.group('name')
+        if name in entries:
+            raise ParseError('duplicate name %r' % name, source, lineno)
+        entries[name] = m.group('value')
+        nested = []
+    entries[name] = _build_nested(entries[name], nested)
+    return entries
+
+
+def _build_nested(value, lines):
+    """Value of a second-level name, scalar or list"""
+    if not lines:
+        return None if value is None else _convert(value)
+    values = [] if value is None else [value]
+    values.extend(t for _, _, t in lines)
+    return [_convert(v) for v in values]
+
+
+def parse_ini(text, source='<string>'):
+    """Parse PaPaS INI configuration in a single pass
+
+    Produces the same structure as the YAML and JSON formats: tasks keyed
+    by section name, with values being scalars, lists, or dictionaries of
+    scalars and lists (see PaPaSParser specification). Names keep their
+    case, integer and decimal values are converted to numbers. Names and
+    values are separated by ':' only, lines starting with '#' or ';' are
+    comments.
+
+    Args:
+        text (str): Configuration data
+        source (str): Name of data source, used in error messages
+
+    Returns:
+        dict: Configuration data
+
+    Raises:
+        ParseError: If data is malformed, with line number
+    """
+    data = {}
+    section = None
+    name = None
+    value = None
+    lines = []
+
+    for lineno, line in enumerate(text.splitlines(), 1):
+        line = line.rstrip()
+        stripped = line.lstrip()
+        if not stripped or stripped[0] in '#;':
+            continue
+        indent = len(line) - len(stripped)
+
+        if indent:
+            if name is None:
+                raise ParseError('indented value without a name', source,
+                                 lineno)
+            lines.append((lineno, indent, stripped))
+            continue
+
+        if name is not None:
+            section[name] = _build_value(value, lines, source)
+            name = None
+
+        m = _SECTCRE.match(line)
+        if m:
+            if m.group('name') in data:
+                raise ParseError('duplicate task %r' % m.group('name'),
+                                 source, lineno)
+            section = data[m.group('name')] = {}
+            continue
+
+        m = _OPTCRE.match(line)
+        if m is None:
+            raise ParseError("expected '[task]' or 'name: value'", source,
+                             lineno)
+        if section is None:
+            raise ParseError('name outside of a task', source, lineno)
+        name = m.group('name')
+        if name in section:
+            raise ParseError('duplicate name %r' % name, source, lineno)
+        value = m.group('value')
+        lines = []
+
+    if name is not None:
+        section[name] = _build_value(value, lines, source)
+    return data
 
 
 class MyInterpolation(configparser.ExtendedInterpolation):
+    """Interpolation of '${...}' references using compiled templates
+
+    Values are compiled once (see parsers.interpolation.Template) and
+    cached per interpolation instance.
+    """
 
     MAX_INTERPOLATION_DEPTH = 10
     _KEYCRE = re.compile(r"\$\{([^}]+)\}")
 
+    def __init__(self):
+        self._templates = TemplateCache()
+
     def before_get(self, parser, section, option, value, defaults):
         L = []
-        LL = []
         self._interpolate_some(parser, option, L, value, section, defaults, 1)
-        for v in L:
-            if isinstance(v, list):
-                for s in v:
-                    LL.append(s + '\n')
-            else:
-                LL.append(v)
-        return ''.join(LL)
+        return ''.join(L)
 
     def before_set(self, parser, section, option, value):
         tmp_value = value.replace('$$', '')  # escaped dollar signs
@@ -230,62 +366,57 @@ class MyInterpolation(configparser.ExtendedInterpolation):
 
     def _interpolate_some(self, parser, option, accum, rest, section, map,
                           depth):
-        rawval = parser.get(section, option, raw=True, fallback=rest)
+        """Interpolate a value
+
+        'map' is only used for single-name references at the first level,
+        nested values are looked up in their section without building
+        intermediate dictionaries.
+        """
         if depth > self.MAX_INTERPOLATION_DEPTH:
-            raise InterpolationDepthError(option, section, rawval)
-
-        print('rawval {}'.format(rawval))
-        print('rest {}'.format(rest))
-        while rest:
-            p = rest.find("$")
-            if p < 0:
-                accum.append(rest)
-                return
-            if p > 0:
-                accum.append(rest[:p])
-                rest = rest[p:]
-            # p is no longer used
-            c = rest[1:2]
-            if c == "$":
-                accum.append("$")
-                rest = rest[2:]
-            elif c == "{":
-                m = self._KEYCRE.match(rest)
-                if m is None:
-                    raise InterpolationSyntaxError(
-                        option, section,
-                        "bad interpolation variable reference %r" % rest
-                    )
-                path = m.group(1).split(':')
-                rest = rest[m.end():]
-                sect = section
-                opt = option
-                try:
-                    if len(path) == 1:
-                        opt = parser.optionxform(path[0])
+            raise InterpolationDepthError(option, section, rest)
+
+        try:
+            tpl = self._templates[rest]
+        except InterpolationError as err:
+            raise InterpolationSyntaxError(option, section,
+                                           err.message) from None
+
+        for literal, path in zip(tpl.literals, tpl.refs):
+            if literal:
+                accum.append(literal)
+            sect = section
+            opt = option
+            try:
+                if len(path) == 1:
+                    opt = parser.optionxform(path[0])
+                    if map is not None:
                         v = map[opt]
-                    elif len(path) == 2:
-                        sect = path[0]
-                        opt = parser.optionxform(path[1])
-                        v = parser.get(sect, opt, raw=True)
                     else:
-                        raise InterpolationSyntaxError(
-                            option, section,
-                            "More than one ':' found: %r" % (rest,))
-                except (KeyError, NoSectionError, NoOptionError):
-                    raise InterpolationMissingOptionError(
-                        option, section, rawval, ":".join(path)) from None
-                if "$" in v:
-                    self._interpolate_some(parser, opt, accum, v, sect,
-                                           dict(parser.items(sect, raw=True)),
-                                           depth + 1)
+                        v = _raw_get(parser, sect, opt)
+                elif len(path) == 2:
+                    sect = path[0]
+                    opt = parser.optionxform(path[1])
+                    v = _raw_get(parser, sect, opt)
                 else:
-                    accum.append(v)
+                    raise InterpolationSyntaxError(
+                        option, section,
+                        "More than one ':' found: %r" % (rest,))
+            except (KeyError, NoSectionError, NoOptionError):
+                raise InterpolationMissingOptionError(
+                    option, section, rest, ":".join(path)) from None
+            if "$" in v:
+                self._interpolate_some(parser, opt, accum, v, sect, None,
+                                       depth + 1)
             else:
-                raise InterpolationSyntaxError(
-                    option, section,
-                    "'$' must be followed by '$' or '{', "
-                    "found: %r" % (rest,))
+                accum.append(v)
+        if tpl.literals[-1]:
+            accum.append(tpl.literals[-1])
+
+
+def _raw_get(parser, section, option):
+    """Get raw option value, bypassing MyParser.get() conversions"""
+    return configparser.RawConfigParser.get(parser, section, option,
+                                            raw=True)
 
 
 class MyParser(configparser.ConfigParser):
@@ -345,14 +476,17 @@ class MyParser(configparser.ConfigParser):
         configuration files in the list will be read.  A single
         filename may also be given.
 
-        Return list of successfully read files.
+        Returns configuration data of all files read, with the same
+        structure as YAML and JSON configurations (see parse_ini()).
         """
-        if isinstance(fn, list):
-            for f in fn:
-                self.read(f)
-        else:
-            self.read(fn)
-        return self.to_dict()
+        data = {}
+        for f in fn if isinstance(fn, list) else [fn]:
+            try:
+                with open(f, 'r') as fd:
+                    data.update(parse_ini(fd.read(), f))
+            except OSError:
+                continue
+        return data
 
     def to_dict(self):
         task_dicts = {}
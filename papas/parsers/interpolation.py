@@ -0,0 +1,442 @@
+#!/usr/bin/env python3
+
+
+"""Compiled '${...}' interpolation
+
+A value is parsed only once into a Template, a sequence of literal chunks
+and reference slots. Substituting parameters into a compiled template is a
+lookup per slot followed by a single join.
+
+Supported references (see SPECIFICATION):
+    * '${name}' and '${name:value}' - refer to the current task
+    * '${task:name}' and '${task:name:value}' - refer to another task
+    * '$$' - escaped dollar sign
+"""
+
+
+__all__ = ['Template', 'TemplateCache', 'Interpolator', 'Resolver',
+           'lookup_reference', 'reference_location']
+
+
+import re
+from utils.exceptions import InterpolationError
+
+
+class Template(object):
+    """Compiled string with '${...}' references
+
+    'literals' always has one more element than 'refs', the rendered string
+    is literals[0] + refs[0] + literals[1] + ... + literals[-1].
+    """
+
+    __slots__ = ['text', 'literals', 'refs']
+    _TOKENCRE = re.compile(r"\$(\$|\{([^}]*)\}|)")
+
+    def __init__(self, text=''):
+        self.text = text
+        self.literals = []
+        self.refs = []
+
+        chunk = []
+        pos = 0
+        for m in type(self)._TOKENCRE.finditer(text):
+            chunk.append(text[pos:m.start()])
+            pos = m.end()
+            tok = m.group(1)
+            if tok == '$':
+                chunk.append('$')
+            elif tok:
+                path = tuple(m.group(2).split(':'))
+                if not all(path) or len(path) > 3:
+                    raise InterpolationError(
+                        '', text, 'bad interpolation variable reference '
+                        '%r' % m.group(0))
+                self.literals.append(''.join(chunk))
+                self.refs.append(path)
+                chunk = []
+            else:
+                raise InterpolationError(
+                    '', text, "'$' must be followed by '$' or '{', "
+                    "found: %r" % text[m.start():])
+        chunk.append(text[pos:])
+        self.literals.append(''.join(chunk))
+
+    def is_literal(self):
+        return not self.refs
+
+    def substitute(self, lookup):
+        """Render template
+
+        Args:
+            lookup (callable|dict): Maps a reference path (tuple) to a value
+
+        Returns:
+            str: Rendered string
+        """
+        if not self.refs:
+            return self.literals[0]
+        if isinstance(lookup, dict):
+            lookup = lookup.__getitem__
+        out = [None] * (2 * len(self.refs) + 1)
+        out[0::2] = self.literals
+        out[1::2] = [str(lookup(r)) for r in self.refs]
+        return ''.join(out)
+
+    def __repr__(self):
+        return self.text
+
+
+class TemplateCache(dict):
+    """Mapping of raw strings to compiled Templates, compiles on miss"""
+
+    def __missing__(self, text):
+        tpl = self[text] = Template(text)
+        return tpl
+
+
+def reference_location(path, conf, name=''):
+    """Task owning a reference path and names of the value in that task
+
+    A two-level path refers to the current task if its first element is
+    a dictionary name of the task, else it refers to another task.
+
+    Args:
+        path (tuple): Reference path, e.g., ('cmdargs', 'xparam')
+        conf (dict): Configuration of current task
+        name (str): Name of current task
+
+    Returns:
+        tuple: Name of owner task and tuple of names, e.g.,
+        ('hello', ('cmdargs', 'xparam'))
+    """
+    head = path[0]
+    nested = len(path) == 2 and isinstance(conf.get(head), dict)
+    if len(path) == 1 or nested:
+        return name, path
+    return head, path[1:]
+
+
+def lookup_reference(path, conf, name='', study=None):
+    """Get the raw value of a reference path
+
+    Args:
+        path (tuple): Reference path, e.g., ('cmdargs', 'xparam')
+        conf (dict): Configuration of current task
+        name (str): Name of current task
+        study (dict): Configuration of all tasks, keyed by task name
+
+    Returns:
+        tuple: Name of task owning the value and raw value
+
+    Raises:
+        KeyError, TypeError: If path does not exist
+    """
+    owner, names = reference_location(path, conf, name)
+    if owner == name:
+        value = conf
+    elif study is not None:
+        value = study[owner]
+    else:
+        raise KeyError(owner)
+    for p in names:
+        value = value[p]
+    return owner, value
+
+
+class Interpolator(object):
+    """Resolve references of task values using compiled templates
+
+    Args:
+        study (dict): Configuration of all tasks, keyed by task name
+        templates (TemplateCache): Cache of compiled templates, can be
+            shared across a study
+    """
+
+    MAX_INTERPOLATION_DEPTH = 10
+
+    def __init__(self, study=None, templates=None):
+        self.study = study if study is not None else {}
+        self.templates = templates if templates is not None \
+            else TemplateCache()
+
+    def interpolate(self, text, conf, name='', depth=1):
+        """Interpolate a string in the context of a task
+
+        Args:
+            text (str): Raw string
+            conf (dict): Configuration of task owning the string
+            name (str): Name of task owning the string
+            depth (int): Current interpolation depth
+
+        Returns:
+            str: Interpolated string
+        """
+        if depth > type(self).MAX_INTERPOLATION_DEPTH:
+            raise InterpolationError(name, text, 'maximum interpolation '
+                                     'depth exceeded')
+        if '$' not in text:  # e.g., axis values, keep them out of the cache
+            return text
+        tpl = self.templates[text]
+        if not tpl.refs:
+            return tpl.literals[0]
+
+        def lookup(path):
+            try:
+                owner, value = lookup_reference(path, conf, name, self.study)
+            except (KeyError, TypeError, IndexError):
+                raise InterpolationError(
+                    name, text, 'missing option for reference '
+                    '${%s}' % ':'.join(path)) from None
+            if isinstance(value, str) and '$' in value:
+                owner_conf = conf if owner == name else self.study[owner]
+                value = self.interpolate(value, owner_conf, owner, depth + 1)
+            return value
+
+        return tpl.substitute(lookup)
+
+
+class Resolver(object):
+    """Static pre-resolution of references across a study
+
+    Every string value with '$' is a node of a reference graph, with edges
+    to the values it refers to. Nodes are resolved once, in dependency
+    order, into templates where the only remaining references are
+    parametric slots, i.e., references of a task to its own parameter
+    axes. Rendering a Task is then a single substitution of axis values.
+
+    A parametric value that is only a reference to a list of another task,
+    e.g., 'xparam: ${hello:cmdargs:xparam}', inherits that list as a
+    parameter axis, so the task is expanded along it like the task it
+    refers to. Inherited axes are kept in 'inherited' (see PTask). Other
+    references to other tasks see their raw values (axes as whole lists),
+    as with Interpolator.
+
+    Args:
+        study (dict): Configuration of all tasks, keyed by task name
+        param_keys (list): Names whose list values are parameter axes
+            (default is ['cmdargs', 'environ'])
+        templates (TemplateCache): Cache of compiled templates, can be
+            shared across a study
+    """
+
+    def __init__(self, study, param_keys=None, templates=None):
+        self.study = study
+        self.param_keys = param_keys if param_keys is not None \
+            else ['cmdargs', 'environ']
+        self.templates = templates if templates is not None \
+            else TemplateCache()
+        self.graph = {}  # (task, *names) -> referenced (task, *names)
+        self._local = {}  # (task, *names) -> template with parametric slots
+        self._full = {}  # (task, *names) -> template without slots
+        self._escaped = {}  # text -> escaped literal chunks
+        self.inherited = {}  # task -> {(name, value name): location}
+
+    def _list_reference(self, name, text, visiting):
+        """Location and value of a list a string only refers to, else None
+
+        References to strings that are themselves a single reference are
+        followed, e.g., a task inheriting an axis inherited by another.
+        """
+        if not isinstance(text, str) or '$' not in text:
+            return None
+        try:
+            tpl = self.templates[text]
+        except InterpolationError:
+            return None
+        if len(tpl.refs) != 1 or any(tpl.literals):
+            return None
+        conf = self.study[name]
+        path = tpl.refs[0]
+        try:
+            owner, value = lookup_reference(path, conf, name, self.study)
+        except (KeyError, TypeError, IndexError):
+            return None  # reported when resolving references
+        loc = (owner,) + tuple(reference_location(path, conf, name)[1])
+        if isinstance(value, list):
+            return (loc, value) if value else None
+        if loc in visiting:
+            return None  # cycle, reported when resolving references
+        visiting.add(loc)
+        found = self._list_reference(owner, value, visiting)
+        return (loc, found[1]) if found else None
+
+    def _inherit(self):
+        """Copy of study where inherited lists replace their references"""
+        study = self.study
+        found = {}
+        for name, conf in study.items():
+            if not isinstance(conf, dict):
+                continue
+            for k in self.param_keys:
+                params = conf.get(k)
+                if not isinstance(params, dict):
+                    continue
+                for p, v in params.items():
+                    ref = self._list_reference(name, v, {(name, k, p)})
+                    if ref is not None and ref[0][0] != name:
+                        found[(name, k, p)] = ref
+
+        if not found:
+            return study
+        study = dict(study)
+        copied = set()
+        for (name, k, p), (loc, values) in found.items():
+            if (name, k) not in copied:
+                if name not in copied:
+                    study[name] = dict(study[name])
+                    copied.add(name)
+                study[name][k] = dict(study[name][k])
+                copied.add((name, k))
+            study[name][k][p] = list(values)
+            self.inherited.setdefault(name, {})[(k, p)] = loc
+        return study
+
+    def _nodes(self):
+        """Locations and values of all strings with '$'"""
+        for name, conf in self.study.items():
+            if not isinstance(conf, dict):
+                continue
+            for k, v in conf.items():
+                if isinstance(v, dict):
+                    for p, pv in v.items():
+                        if isinstance(pv, list):
+                            for i, x in enumerate(pv):
+                                if isinstance(x, str) and '$' in x:
+                                    yield (name, k, p, i), x
+                        elif isinstance(pv, str) and '$' in pv:
+                            yield (name, k, p), pv
+                elif isinstance(v, list):
+                    for i, x in enumerate(v):
+                        if isinstance(x, str) and '$' in x:
+                            yield (name, k, i), x
+                elif isinstance(v, str) and '$' in v:
+                    yield (name, k), v
+
+    def _literals(self, text):
+        """Escaped literal chunks of a template, cached by text"""
+        literals = self._escaped.get(text)
+        if literals is None:
+            literals = self._escaped[text] = [
+                x.replace('$', '$$') for x in self.templates[text].literals]
+        return literals
+
+    def _references(self, node, text):
+        """Resolution of each reference of a node
+
+        Returns:
+            list: (location, local, full) per reference, 'local' and 'full'
+            are None if the location is a node not yet resolved
+        """
+        name = node[0]
+        conf = self.study[name]
+        refs = []
+        for path in self.templates[text].refs:
+            owner, names = reference_location(path, conf, name)
+            try:
+                value = conf if owner == name else self.study[owner]
+                for p in names:
+                    value = value[p]
+            except (KeyError, TypeError, IndexError):
+                raise InterpolationError(
+                    name, text, 'missing option for reference '
+                    '${%s} in %s' % (':'.join(path), _location(node))) \
+                    from None
+            loc = (owner,) + tuple(names)
+            if isinstance(value, str) and '$' in value:
+                refs.append((loc, None, None))
+                continue
+            full = str(value).replace('$', '$$')
+            if owner == name and len(names) == 2 and \
+               names[0] in self.param_keys and \
+               isinstance(value, list) and value:
+                refs.append((loc, '${%s}' % ':'.join(path), full))
+            else:
+                refs.append((loc, full, full))
+        return refs
+
+    def _render(self, node, text, refs):
+        """Local and full templates of a node from its resolved refs"""
+        literals = self._literals(text)
+        local = [literals[0]]
+        full = [literals[0]]
+        for (loc, lvalue, fvalue), literal in zip(refs, literals[1:]):
+            if fvalue is None:
+                fvalue = self._full[loc]
+                lvalue = self._local[loc] if loc[0] == node[0] else fvalue
+            local.append(lvalue)
+            local.append(literal)
+            full.append(fvalue)
+            full.append(literal)
+        self._local[node] = ''.join(local)
+        self._full[node] = ''.join(full)
+
+    def resolve(self):
+        """Resolve all references, except parametric slots
+
+        Returns:
+            dict: Copy of study with values replaced by their templates
+
+        Raises:
+            InterpolationError: If a reference does not exist, or if there
+                is a cycle ('path' holds the cycle)
+        """
+        self.study = self._inherit()
+        texts = dict(self._nodes())
+        refs = {node: self._references(node, text)
+                for node, text in texts.items()}
+        for node, node_refs in refs.items():
+            self.graph[node] = [loc for loc, _, full in node_refs
+                                if full is None]
+
+        state = {}  # 1 = visiting, 2 = done
+        for root in refs:
+            if root in state:
+                continue
+            if not self.graph[root]:
+                state[root] = 2
+                self._render(root, texts[root], refs[root])
+                continue
+            stack = [(root, iter(self.graph[root]))]
+            state[root] = 1
+            while stack:
+                node, it = stack[-1]
+                for loc in it:
+                    if state.get(loc) == 1:
+                        path = [n for n, _ in stack]
+                        path = [_location(n) for n in
+                                path[path.index(loc):] + [loc]]
+                        raise InterpolationError(
+                            loc[0], texts[loc],
+                            'reference cycle, ' + ' -> '.join(path), path)
+                    if loc not in state:
+                        state[loc] = 1
+                        stack.append((loc, iter(self.graph[loc])))
+                        break
+                else:
+                    stack.pop()
+                    state[node] = 2
+                    self._render(node, texts[node], refs[node])
+
+        # Copy containers holding resolved values, others are shared
+        study = dict(self.study)
+        copied = set()
+        for node, text in self._local.items():
+            name = node[0]
+            names = node[1:]
+            if name not in copied:
+                study[name] = dict(study[name])
+                copied.add(name)
+            value = study[name]
+            for i in range(len(names) - 1):
+                key = (name,) + names[:i + 1]
+                if key not in copied:
+                    value[names[i]] = type(value[names[i]])(value[names[i]])
+                    copied.add(key)
+                value = value[names[i]]
+            value[names[-1]] = text
+        return study
+
+
+def _location(node):
+    """Reference-like string of a value location, e.g., 'hello:cmdargs:x'"""
+    return ':'.join([str(p) for p in node])
@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+
+
+"""Configuration loading
+
+The format of a configuration is detected once, from the file extension or
+from the first significant character of a string, and it is parsed with the
+fastest parser available (libyaml's C loader if PyYAML was built with it).
+Parsed files can be kept in a ConfCache, so repeated runs over the same
+configuration skip parsing.
+"""
+
+
+__all__ = ['YAMLLoader', 'ConfCache', 'file_format', 'detect_format',
+           'parse_conf', 'parse_detected', 'load_file']
+
+
+import os
+import re
+import json
+import time
+import hashlib
+import tempfile
+import yaml
+from utils.logger import logger
+from parsers.INIParser import parse_ini
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+YAMLLoader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+"""yaml.Loader: C-accelerated safe loader if available"""
+
+extensions = {
+    'yaml': 'yaml',
+    'yml': 'yaml',
+    'json': 'json',
+    'ini': 'ini'
+}
+"""dict: Configuration format by file extension"""
+
+_INISECTCRE = re.compile(r'\[[A-Za-z_][\w.-]*\]\s*$')
+
+_CACHE_MAGIC = b'PAPASCC1'
+
+
+def file_format(fn):
+    """Configuration format of a file from its extension, None if unknown"""
+    return extensions.get(os.path.splitext(fn)[1][1:].lower())
+
+
+def detect_format(text):
+    """Configuration format of a string
+
+    JSON documents start with '{' or '[', INI documents start with a
+    '[section]' header line, anything else is YAML. Comments and empty
+    lines are skipped.
+    """
+    for line in text.splitlines():
+        line = line.strip()
+        if not line or line[0] in '#;':
+            continue
+        if _INISECTCRE.match(line):
+            return 'ini'
+        if line[0] in '{[':
+            return 'json'
+        break
+    return 'yaml'
+
+
+def parse_conf(text, fmt, source='<string>'):
+    """Parse configuration string of a given format
+
+    Args:
+        text (str): Configuration data
+        fmt (str): 'yaml', 'json', or 'ini'
+        source (str): Name of data source, used in INI error messages
+
+    Returns:
+        dict|list: Configuration data
+
+    Raises:
+        yaml.YAMLError, json.JSONDecodeError, ParseError: If data is
+            malformed
+        ValueError: If format is not supported
+    """
+    if fmt == 'yaml':
+        return yaml.load(text, Loader=YAMLLoader)
+    if fmt == 'json':
+        return json.loads(text)
+    if fmt == 'ini':
+        return parse_ini(text, source)
+    raise ValueError('unsupported configuration format, {0}'.format(fmt))
+
+
+def parse_detected(text, source='<string>'):
+    """Parse configuration string of detected format, see detect_format()
+
+    A string detected as JSON that is not valid JSON is parsed as YAML,
+    e.g., YAML flow style '{hello: {command: echo}}'.
+    """
+    fmt = detect_format(text)
+    if fmt == 'json':
+        try:
+            return json.loads(text)
+        except json.JSONDecodeError:
+            fmt = 'yaml'
+    return parse_conf(text, fmt, source)
+
+
+def load_file(fn, fmt=None):
+    """Parse configuration file, format is detected if not given"""
+    with open(fn, 'r') as fd:
+        text = fd.read()
+    fmt = fmt or file_format(fn)
+    if fmt is None:
+        return parse_detected(text, fn)
+    return parse_conf(text, fmt, fn)
+
+
+def _plain(value):
+    """True if value is only dicts with string keys, lists, and scalars"""
+    if isinstance(value, dict):
+        return all(isinstance(k, str) and _plain(v)
+                   for k, v in value.items())
+    if isinstance(value, list):
+        return all(_plain(x) for x in value)
+    return value is None or isinstance(value, (str, int, float, bool))
+
+
+class ConfCache(object):
+    """On-disk cache of parsed configuration files
+
+    An entry holds the parsed data keyed by the file's absolute path, and
+    tagged with the file's mtime, size, and content hash. The
+    content is not re-read if mtime and size match and the file was not
+    modified shortly before the entry was written (mtime granularity),
+    otherwise the content hash decides if the entry is still valid.
+    Data derived from a loaded file (e.g., the validated and resolved
+    study) can be kept in its entry, it is dropped when the content
+    changes. Entries are msgpack if the msgpack package is available, else
+    JSON, so only dicts with string keys, lists, and scalars are cached.
+    Entries are never unpickled, a cache directory shared with others
+    cannot run code.
+
+    Args:
+        directory (str): Cache directory
+            (default is '.papas_cache/conf')
+    """
+
+    _logger = logger
+    _RACY_WINDOW = 2.0  # seconds
+    _fields = frozenset(['mtime', 'size', 'digest', 'written', 'data'])
+
+    def __init__(self, directory=os.path.join('.papas_cache', 'conf')):
+        self.directory = directory
+        self.hits = 0
+        self.misses = 0
+        self._entries = {}
+        os.makedirs(directory, exist_ok=True)
+
+    def _entry_file(self, fn):
+        key = hashlib.sha1(os.path.abspath(fn).encode()).hexdigest()
+        return os.path.join(self.directory, key + '.entry')
+
+    def _read(self, efn):
+        try:
+            with open(efn, 'rb') as fd:
+                magic = fd.read(len(_CACHE_MAGIC) + 1)
+                content = fd.read()
+        except FileNotFoundError:
+            return None
+        except OSError:
+            content = None
+            magic = b''
+
+        entry = None
+        try:
+            if magic == _CACHE_MAGIC + b'M' and msgpack is not None:
+                entry = msgpack.unpackb(content, raw=False)
+            elif magic == _CACHE_MAGIC + b'J':
+                entry = json.loads(content.decode())
+        except Exception:
+            entry = None
+        if not isinstance(entry, dict) or \
+           not type(self)._fields.issubset(entry):
+            type(self)._logger.warning('ConfCache: ignoring corrupt entry '
+                                       '{0}'.format(efn))
+            return None
+        return entry
+
+    def _write(self, efn, entry):
+        if not _plain(entry):
+            type(self)._logger.debug('ConfCache: not caching {0}, data is '
+                                     'not plain dicts, lists, and '
+                                     'scalars'.format(efn))
+            return
+        if msgpack is not None:
+            content = _CACHE_MAGIC + b'M' + msgpack.packb(entry,
+                                                          use_bin_type=True)
+        else:
+            content = _CACHE_MAGIC + b'J' + json.dumps(
+                entry, separators=(',', ':')).encode()
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(content)
+            os.replace(tmp, efn)
+        except BaseException:
+            os.remove(tmp)
+            raise
+
+    def load(self, fn, fmt=None):
+        """Parsed configuration file, from cache if valid
+
+        Args:
+            fn (str): Configuration file
+            fmt (str): Format, detected if not given
+
+        Returns:
+            dict|list: Configuration data
+        """
+        st = os.stat(fn)
+        efn = self._entry_file(fn)
+        entry = self._read(efn)
+        if entry is not None and entry['mtime'] == st.st_mtime_ns and \
+           entry['size'] == st.st_size and \
+           entry['written'] - st.st_mtime_ns / 1e9 > type(self)._RACY_WINDOW:
+            self.hits += 1
+            self._entries[os.path.abspath(fn)] = entry
+            return entry['data']
+
+        with open(fn, 'rb') as fd:
+            content = fd.read()
+        digest = hashlib.sha1(content).hexdigest()
+        derived = {}
+        if entry is not None and entry['digest'] == digest:
+            self.hits += 1
+            data = entry['data']
+            derived = entry.get('derived', {})
+        else:
+            self.misses += 1
+            text = content.decode()
+            fmt = fmt or file_format(fn)
+            if fmt is None:
+                data = parse_detected(text, fn)
+            else:
+                data = parse_conf(text, fmt, fn)
+        entry = {'mtime': st.st_mtime_ns, 'size': st.st_size,
+                 'digest': digest, 'written': time.time(), 'data': data,
+                 'derived': derived}
+        self._write(efn, entry)
+        self._entries[os.path.abspath(fn)] = entry
+        return data
+
+    def derived(self, fn, name):
+        """Data derived from a file as last loaded by this cache
+
+        Args:
+            fn (str): Configuration file
+            name (str): Name of derived data
+
+        Returns:
+            object: Derived data, None if not stored or file was not loaded
+        """
+        entry = self._entries.get(os.path.abspath(fn))
+        if entry is None:
+            return None
+        return entry.get('derived', {}).get(name)
+
+    def store_derived(self, fn, name, value):
+        """Keep data derived from a file as last loaded by this cache
+
+        Args:
+            fn (str): Configuration file
+            name (str): Name of derived data
+            value (object): Dicts with string keys, lists, and scalars
+        """
+        entry = self._entries.get(os.path.abspath(fn))
+        if entry is None:
+            return
+        entry.setdefault('derived', {})[name] = value
+        self._write(self._entry_file(fn), entry)
+
+    def clear(self):
+        """Remove all entries"""
+        for efn in os.listdir(self.directory):
+            if efn.endswith('.entry'):
+                os.remove(os.path.join(self.directory, efn))
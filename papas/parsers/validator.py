@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+
+
+__all__ = ['ConfValidator']
+
+
+from utils.logger import logger
+from utils.exceptions import InterpolationError
+from parsers.parsers import PaPaSParser
+from parsers.interpolation import TemplateCache, lookup_reference
+
+
+class ConfValidator(object):
+    """Single-pass validation of PaPaS and application configurations
+
+    All problems are collected, each one as a (location, message) pair
+    where the location is a reference-like path, e.g., 'hello:cmdargs:x'
+    or 'hello:after[1]'. Application configurations are checked for
+    required names, value types, '${...}' references that do not resolve,
+    empty lists of values, and unknown tasks in 'after'.
+
+    Args:
+        language (dict): Types of known names, a name with a trailing '_'
+            is the type of values nested in that name
+            (default is PaPaSParser.papas_language)
+        required (list): Names every task must have
+            (default is ['command'])
+        templates (TemplateCache): Cache of compiled templates, can be
+            shared across a study
+    """
+
+    _logger = logger
+    _scalars = (str, int, float, bool)
+
+    def __init__(self, **kwargs):
+        self.language = PaPaSParser.papas_language
+        self.required = ['command']
+        self.templates = TemplateCache()
+
+        if 'language' in kwargs:
+            self.language = kwargs['language']
+        if 'required' in kwargs:
+            self.required = kwargs['required']
+        if 'templates' in kwargs:
+            self.templates = kwargs['templates']
+
+    def _check_type(self, value, vtype):
+        """Lists accept a single scalar value, strings accept any scalar"""
+        if vtype is dict:
+            return isinstance(value, dict)
+        if vtype is list:
+            return isinstance(value, list) or \
+                isinstance(value, type(self)._scalars)
+        if vtype is str:
+            return isinstance(value, type(self)._scalars)
+        return isinstance(value, vtype)
+
+    def _check_refs(self, value, loc, name, conf, study, errors):
+        if not isinstance(value, str) or '$' not in value:
+            return
+        try:
+            tpl = self.templates[value]
+        except InterpolationError as err:
+            errors.append((loc, err.message))
+            return
+        for path in tpl.refs:
+            try:
+                lookup_reference(path, conf, name, study)
+            except (KeyError, TypeError, IndexError):
+                errors.append((loc, 'unresolved reference ${%s}' %
+                               ':'.join(path)))
+
+    def _check_nested(self, value, loc, ntype, name, conf, study, errors):
+        """Values nested in a dict, of type 'ntype' if it is known"""
+        for p, pv in value.items():
+            ploc = '%s:%s' % (loc, p)
+            if isinstance(pv, list):
+                if not pv:
+                    errors.append((ploc, 'empty list of values'))
+                if ntype is not None and ntype is not list:
+                    errors.append((ploc, 'expected %s, found list' %
+                                   ntype.__name__))
+                for i, x in enumerate(pv):
+                    self._check_refs(x, '%s[%d]' % (ploc, i), name, conf,
+                                     study, errors)
+            elif isinstance(pv, dict):
+                errors.append((ploc, 'values nest at most two levels'))
+            else:
+                self._check_refs(pv, ploc, name, conf, study, errors)
+
+    def _check_task(self, name, conf, study, errors):
+        language = self.language
+        for k in self.required:
+            if k not in conf:
+                errors.append((name, "missing required name '%s'" % k))
+
+        for k, v in conf.items():
+            loc = '%s:%s' % (name, k)
+            vtype = language.get(k)
+            if vtype is not None and not self._check_type(v, vtype):
+                errors.append((loc, 'expected %s, found %s' %
+                               (vtype.__name__, type(v).__name__)))
+
+            if isinstance(v, dict):
+                self._check_nested(v, loc, language.get(k + '_'), name,
+                                   conf, study, errors)
+            elif isinstance(v, list):
+                for i, x in enumerate(v):
+                    self._check_refs(x, '%s[%d]' % (loc, i), name, conf,
+                                     study, errors)
+            else:
+                self._check_refs(v, loc, name, conf, study, errors)
+
+        after = conf.get('after', [])
+        if not isinstance(after, list):
+            after = [after]
+        for i, a in enumerate(after):
+            if str(a) not in study:
+                errors.append(('%s:after[%d]' % (name, i),
+                               'unknown task %s' % a))
+
+    def validate(self, data):
+        """Validate application configuration data
+
+        Args:
+            data (dict|list): Tasks keyed by name, or list of tasks
+
+        Returns:
+            list: (location, message) pairs, empty if data is valid
+        """
+        if isinstance(data, dict):
+            items = data.items()
+        elif isinstance(data, list):
+            items = enumerate(data)
+        else:
+            return [('', 'expected tasks as dict or list, found %s' %
+                     type(data).__name__)]
+
+        errors = []
+        study = {str(k): v for k, v in items}
+        for name, conf in study.items():
+            if isinstance(conf, dict):
+                self._check_task(name, conf, study, errors)
+            else:
+                errors.append((name, 'expected dict, found %s' %
+                               type(conf).__name__))
+        return errors
+
+    def validate_papas(self, data):
+        """Validate PaPaS configuration data
+
+        Args:
+            data (dict): PaPaS configuration data
+
+        Returns:
+            list: (location, message) pairs, empty if data is valid
+        """
+        if not isinstance(data, dict):
+            return [('', 'expected dict, found %s' % type(data).__name__)]
+
+        errors = []
+        exts = data.get('file_extensions', {})
+        if not isinstance(exts, dict):
+            errors.append(('file_extensions', 'expected dict, found %s' %
+                           type(exts).__name__))
+        else:
+            for k, v in exts.items():
+                if v is not None and \
+                   not isinstance(v, type(self)._scalars):
+                    errors.append(('file_extensions:%s' % k,
+                                   'expected str, found %s' %
+                                   type(v).__name__))
+        execs = data.get('program_executable', [])
+        if not isinstance(execs, list):
+            errors.append(('program_executable', 'expected list, found %s' %
+                           type(execs).__name__))
+        return errors
+
+    def report(self, errors, what='configuration'):
+        """Log all problems, returns True if there are none"""
+        for loc, msg in errors:
+            type(self)._logger.error('Invalid %s, %s: %s' % (what, loc, msg))
+        if errors:
+            type(self)._logger.error('Invalid %s, %d problems found' %
+                                     (what, len(errors)))
+        return not errors
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+
+
+"""PaPaS node-local task runner
+
+Runs a chunk of tasks from a task file (see taskfile) with a local
+execution engine. Used by generated batch scripts so that each job of an
+allocation processes many tasks.
+
+
+Example
+=======
+
+python3 runner.py -f hello.tasks -c 2 -s 100 -w 16
+"""
+
+
+import sys
+import argparse
+from taskfile import load_tasks
+from papas import engines
+
+
+def parse_args():
+    """Parse and validate command line arguments
+
+    Returns:
+        argparse.Namespace: object with command line argument name/values
+    """
+
+    parser = argparse.ArgumentParser(
+        prog=__file__,
+        description='PaPaS: node-local task runner',
+        formatter_class=argparse.RawTextHelpFormatter
+    )
+
+    parser.add_argument(
+        '-f', '--tasks', type=str, dest='tasks',
+        required=True,
+        help='Task file'
+    )
+
+    parser.add_argument(
+        '-c', '--chunk', type=int, dest='chunk',
+        default=0,
+        help='Chunk of task file to run\n'
+             'Default is 0'
+    )
+
+    parser.add_argument(
+        '-s', '--chunksize', type=int, dest='chunksize',
+        default=0,
+        help='Number of tasks per chunk\n'
+             'Default is all tasks'
+    )
+
+    parser.add_argument(
+        '-w', '--workers', type=int, dest='workers',
+        default=0,
+        help='Number of concurrent tasks\n'
+             'Default is number of CPUs'
+    )
+
+    parser.add_argument(
+        '-e', '--engine', type=str, dest='engine',
+        default='local', choices=sorted(engines),
+        help='Execution engine\n'
+             'Default is \'local\''
+    )
+
+    parser.add_argument(
+        '-j', '--journal', type=str, dest='journal',
+        default='',
+        help='Journal file recording finished tasks'
+    )
+
+    parser.add_argument(
+        '-r', '--resume', action='store_true', dest='resume',
+        help='Skip tasks completed according to journal'
+    )
+
+    parser.add_argument(
+        '-o', '--outdir', type=str, dest='outdir',
+        default='.',
+        help='Directory for task output files\n'
+             'Default is current directory'
+    )
+
+    return parser.parse_args()
+
+
+def run_chunk(args):
+    """Run a chunk of tasks
+
+    Returns:
+        dict: Execution statistics
+    """
+    start = 0
+    stop = None
+    if args.chunksize > 0:
+        start = args.chunk * args.chunksize
+        stop = start + args.chunksize
+    opts = {'workers': args.workers, 'outdir': args.outdir,
+            'journal': args.journal, 'resume': args.resume}
+    with engines[args.engine](**opts) as executor:
+        return executor.run(load_tasks(args.tasks, start, stop))
+
+
+if __name__ == '__main__':
+    stats = run_chunk(parse_args())
+    sys.exit(1 if stats['failed'] else 0)
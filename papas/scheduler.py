@@ -0,0 +1,395 @@
+#!/usr/bin/env python3
+
+
+__all__ = ['Scheduler']
+
+
+import heapq
+import itertools
+import collections
+from utils.logger import logger
+from utils.exceptions import DependencyError
+
+
+class _Link(object):
+    """Dependency between a prerequisite PTask and a dependent PTask
+
+    Parameter axes present in both PTasks (same name or inherited by the
+    dependent from the prerequisite, and the dependent's values are a
+    subset of the prerequisite's) are shared. An instance of
+    the dependent only waits on instances of the prerequisite with the
+    same values along shared axes, all other instances are independent.
+    """
+
+    def __init__(self, parent, child):
+        self.parent = parent
+        self.child = child
+        self.shared = []  # (parent axis position, child axis position)
+
+        paxes = {(k, p): i for i, (k, p, _) in enumerate(parent.axes)}
+        for j, (k, p, vals) in enumerate(child.axes):
+            i = paxes.get((k, p))
+            loc = child.inherited.get((k, p))
+            if loc is not None and loc[0] == parent.name and \
+               loc[1:] in paxes:
+                i = paxes[loc[1:]]
+            if i is None:
+                continue
+            try:
+                if set(vals) <= set(parent.axes[i][2]):
+                    self.shared.append((i, j))
+            except TypeError:  # unhashable values are never shared
+                pass
+
+        # Number of parent instances per shared value
+        self._counts = [collections.Counter(parent.axes[i][2])
+                        for i, _ in self.shared]
+        shared_parent = {i for i, _ in self.shared}
+        self._group = 1
+        for i, (_, _, vals) in enumerate(parent.axes):
+            if i not in shared_parent:
+                self._group *= len(vals)
+
+        # Child axes not shared, used to enumerate dependent instances
+        shared_child = {j for _, j in self.shared}
+        self._free = [j for j in range(len(child.axes))
+                      if j not in shared_child]
+        self._strides = []
+        stride = 1
+        for _, _, vals in reversed(child.axes):
+            self._strides.append(stride)
+            stride *= len(vals)
+        self._strides.reverse()
+
+    def key(self, task):
+        """Values of shared axes of a parent instance"""
+        return tuple(task.conf[self.parent.axes[i][0]][self.parent.axes[i][1]]
+                     for i, _ in self.shared)
+
+    def key_values(self, values):
+        """Values of shared axes from a parent instance's axis values"""
+        return tuple(values[i] for i, _ in self.shared)
+
+    def required(self, values):
+        """Number of parent instances a child instance waits on"""
+        n = self._group
+        for c, (_, j) in zip(self._counts, self.shared):
+            n *= c[values[j]]
+        return n
+
+    def children(self, key):
+        """Indices of child instances that depend on a given shared key"""
+        axes = self.child.axes
+        idx = [0]
+        for v, (_, j) in zip(key, self.shared):
+            digits = [d for d, x in enumerate(axes[j][2]) if x == v]
+            idx = [b + d * self._strides[j] for b in idx for d in digits]
+        for j in self._free:
+            idx = [b + d * self._strides[j] for b in idx
+                   for d in range(len(axes[j][2]))]
+        yield from idx
+
+
+class Scheduler(object):
+    """Dependency-aware dispatch of expanded tasks
+
+    The DAG of PTasks is given by their 'after' lists. Instances of root
+    PTasks are dispatched lazily, and an instance of a dependent PTask is
+    released as soon as the instances it depends on finish (see _Link),
+    without waiting for whole PTasks to complete. If a task fails, its
+    dependent instances are skipped.
+
+    If task durations are given, ready tasks are dispatched longest
+    remaining path first: the priority of a PTask is its duration plus the
+    longest chain of durations of the PTasks depending on it, so tasks on
+    the critical path start as early as possible. Otherwise tasks are
+    dispatched in the order they become ready.
+
+    Args:
+        ptasks (dict): PTasks keyed by name
+        durations (dict): Run time (s) of an instance keyed by PTask name,
+            e.g., from Journal.durations(). PTasks not listed use their
+            'duration' value as estimate, else the mean of known durations,
+            else 1.
+
+    Raises:
+        DependencyError: If a dependency is unknown or there is a cycle
+    """
+
+    _logger = logger
+
+    def __init__(self, ptasks, durations=None):
+        self.ptasks = ptasks
+        self.after = {}
+        for name, pt in ptasks.items():
+            after = pt.conf.get('after', [])
+            if isinstance(after, str):
+                after = [after]
+            self.after[name] = [str(a) for a in after]
+
+        for name, after in self.after.items():
+            for a in after:
+                if a not in ptasks:
+                    raise DependencyError('{0}: unknown task in after, '
+                                          '{1}'.format(name, a), [name, a])
+
+        self.order = self.toposort()
+        self.links = {name: [] for name in ptasks}  # parent -> links
+        self._inlinks = {name: [] for name in ptasks}  # child -> links
+        for name, after in self.after.items():
+            for a in after:
+                link = _Link(ptasks[a], ptasks[name])
+                self.links[a].append(link)
+                self._inlinks[name].append(link)
+
+        self.skipped = 0
+        self.counts = {name: collections.Counter() for name in ptasks}
+        self.durations = None
+        self.rank = None
+        roots = [name for name in self.order if not self.after[name]]
+        if durations is not None:
+            self.durations = self._estimate(durations)
+            self.rank = self._ranks()
+            roots.sort(key=lambda name: -self.rank[name])
+        self._ready = []  # heap of (-rank, sequence, Task)
+        self._seq = itertools.count()
+        self._pending = {}  # (name, index) -> unfinished prerequisites
+        self._roots = collections.deque(roots)
+        self._root_tasks = None
+
+    def _estimate(self, durations):
+        """Duration of an instance of each PTask"""
+        known = {}
+        for name, pt in self.ptasks.items():
+            d = durations.get(name)
+            if d is None:
+                d = pt.conf.get('duration')
+            if isinstance(d, bool) or not isinstance(d, (int, float)):
+                if d is not None:
+                    type(self)._logger.warning('Scheduler: {0}: invalid '
+                                               'duration, {1}'.format(name, d))
+                continue
+            known[name] = float(d)
+        default = sum(known.values()) / len(known) if known else 1.
+        return {name: known.get(name, default) for name in self.ptasks}
+
+    def _ranks(self):
+        """Longest remaining path (s) from the start of each PTask"""
+        rank = {}
+        for name in reversed(self.order):
+            rank[name] = self.durations[name] + max(
+                (rank[link.child.name] for link in self.links[name]),
+                default=0.)
+        return rank
+
+    def toposort(self):
+        """Topological order of PTask names
+
+        Raises:
+            DependencyError: If there is a cycle, 'path' holds the cycle
+        """
+        order = []
+        state = {}  # 1 = visiting, 2 = done
+        for root in self.after:
+            if root in state:
+                continue
+            stack = [(root, iter(self.after[root]))]
+            state[root] = 1
+            while stack:
+                name, it = stack[-1]
+                for a in it:
+                    if state.get(a) == 1:
+                        path = [n for n, _ in stack]
+                        path = path[path.index(a):] + [a]
+                        path.reverse()
+                        raise DependencyError('dependency cycle, {0}'.format(
+                            ' -> '.join(path)), path)
+                    if a not in state:
+                        state[a] = 1
+                        stack.append((a, iter(self.after[a])))
+                        break
+                else:
+                    stack.pop()
+                    state[name] = 2
+                    order.append(name)
+        return order
+
+    def status(self, name):
+        """Aggregated status of the instances of a PTask
+
+        Returns:
+            dict: Number of 'tasks', and of 'done', 'failed', and
+            'skipped' instances
+        """
+        counts = self.counts[name]
+        return {'tasks': len(self.ptasks[name]), 'done': counts['done'],
+                'failed': counts['failed'], 'skipped': counts['skipped']}
+
+    def instances(self):
+        """(name, index) of all task instances, in topological order"""
+        for name in self.order:
+            for idx in range(len(self.ptasks[name])):
+                yield name, idx
+
+    def instance_edges(self):
+        """Dependencies between task instances
+
+        Computed from parameter values alone, no Task is created.
+
+        Yields:
+            tuple: ((parent name, index), (child name, index))
+        """
+        for name in self.order:
+            pt = self.ptasks[name]
+            for link in self.links[name]:
+                cname = link.child.name
+                children = {}
+                for idx in range(len(pt)):
+                    key = link.key_values(pt.decode(idx))
+                    if key not in children:
+                        children[key] = list(link.children(key))
+                    for c in children[key]:
+                        yield (name, idx), (cname, c)
+
+    def critical_path(self):
+        """Chain of PTasks with the longest total duration
+
+        Instances of a PTask depend on instances of its prerequisites, so
+        this is also the longest chain of task instances.
+
+        Returns:
+            tuple: (list of PTask names, length in seconds), None if there
+            are no durations
+        """
+        if self.rank is None:
+            return None
+        path = []
+        candidates = [name for name in self.order if not self.after[name]]
+        while candidates:
+            name = max(candidates, key=lambda n: self.rank[n])
+            path.append(name)
+            candidates = [link.child.name for link in self.links[name]]
+        return path, self.rank[path[0]] if path else 0.
+
+    def predict(self, workers=1):
+        """Critical path and lower bound of the makespan of the study
+
+        The makespan is bounded below by the critical path and by the
+        total work spread over all workers, the larger bound is reported.
+        The actual makespan may be longer, e.g., when tasks of the critical
+        path wait for free workers.
+
+        Args:
+            workers (int): Number of concurrent tasks
+
+        Returns:
+            dict: 'critical_path' (PTask names), 'length' of critical path,
+            total 'work', and 'makespan_lower_bound', in seconds; None if
+            there are no durations
+        """
+        cp = self.critical_path()
+        if cp is None:
+            return None
+        path, length = cp
+        work = sum(self.durations[name] * len(pt)
+                   for name, pt in self.ptasks.items())
+        bound = max(length, work / max(workers, 1))
+        report = {'critical_path': path, 'length': length, 'work': work,
+                  'makespan_lower_bound': bound}
+        type(self)._logger.info('Scheduler: critical path {0} ({1:.3f} s), '
+                                'makespan at least {2:.3f} s with {3} '
+                                'workers'.format(' -> '.join(path), length,
+                                                 bound, workers))
+        return report
+
+    def _release(self, task):
+        rank = self.rank[task.name] if self.rank is not None else 0.
+        heapq.heappush(self._ready, (-rank, next(self._seq), task))
+
+    def next_ready(self):
+        """Next task ready to run, None if none is ready now
+
+        Released tasks and instances of root PTasks are interleaved by
+        priority, root instances are generated lazily.
+        """
+        while True:
+            root_rank = None
+            if self._roots:
+                root_rank = self.rank[self._roots[0]] \
+                    if self.rank is not None else 0.
+            if self._ready and (root_rank is None or
+                                -self._ready[0][0] >= root_rank):
+                return heapq.heappop(self._ready)[2]
+            if root_rank is None:
+                return None
+            if self._root_tasks is None:
+                self._root_tasks = iter(self.ptasks[self._roots[0]])
+            task = next(self._root_tasks, None)
+            if task is not None:
+                return task
+            self._roots.popleft()
+            self._root_tasks = None
+
+    def complete(self, task, returncode):
+        """Release instances depending on a finished task"""
+        self.counts[task.name]['done' if returncode == 0 else 'failed'] += 1
+        done = [(task, returncode == 0)]
+        while done:
+            task, ok = done.pop()
+            for link in self.links[task.name]:
+                child = link.child
+                key = link.key(task)
+                for idx in link.children(key):
+                    k = (child.name, idx)
+                    if k not in self._pending:
+                        values = child.decode(idx)
+                        self._pending[k] = [
+                            sum(lk.required(values)
+                                for lk in self._inlinks[child.name]), True]
+                    state = self._pending[k]
+                    state[0] -= 1
+                    state[1] = state[1] and ok
+                    if state[0] > 0:
+                        continue
+                    del self._pending[k]
+                    if state[1]:
+                        self._release(child[idx])
+                    else:
+                        self.skipped += 1
+                        self.counts[child.name]['skipped'] += 1
+                        type(self)._logger.warning(
+                            'Scheduler: skipping task {0}-{1}, a '
+                            'prerequisite failed'.format(child.name, idx))
+                        done.append((child[idx], False))
+
+    def run(self, executor, callback=None):
+        """Run all tasks with an executor, honoring dependencies
+
+        Args:
+            executor (Executor): Execution engine
+            callback (callable): Called with (Task, return code) as each
+                task finishes
+
+        Returns:
+            dict: Execution statistics, including skipped tasks
+        """
+        executor.reset_stats()
+        while True:
+            while executor.running < executor.workers:
+                task = self.next_ready()
+                if task is None:
+                    break
+                executor.submit(task)
+            if not executor.running:
+                break
+            for task, rc in executor.wait():
+                self.complete(task, rc)
+                if callback:
+                    callback(task, rc)
+
+        if self._pending:
+            type(self)._logger.warning('Scheduler: {0} tasks never became '
+                                       'ready'.format(len(self._pending)))
+        stats = executor.report()
+        stats['skipped'] = self.skipped
+        return stats
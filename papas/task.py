@@ -4,7 +4,11 @@
 __all__ = ['Task', 'PTask']
 
 
+import hashlib
+import operator
+import itertools
 from utils.logger import logger
+from parsers.interpolation import Interpolator
 
 
 class Task(object):
@@ -15,26 +19,185 @@ class Task(object):
 
     def __init__(self, **kwargs):
         self.conf = {}
+        self.name = ''
+        self.index = 0
+        self.command = ''
+        self.environ = {}
+        self.infiles = []
+        self.outfiles = []
 
         if 'conf' in kwargs:
             self.conf = kwargs['conf']
+        if 'name' in kwargs:
+            self.name = kwargs['name']
+        if 'index' in kwargs:
+            self.index = kwargs['index']
+        if 'command' in kwargs:
+            self.command = kwargs['command']
+        if 'environ' in kwargs:
+            self.environ = kwargs['environ']
+        if 'infiles' in kwargs:
+            self.infiles = kwargs['infiles']
+        if 'outfiles' in kwargs:
+            self.outfiles = kwargs['outfiles']
+
+    def to_dict(self):
+        """Resolved values of task, without its configuration"""
+        return {
+            'name': self.name,
+            'index': self.index,
+            'command': self.command,
+            'environ': self.environ,
+            'infiles': self.infiles,
+            'outfiles': self.outfiles
+        }
+
+    @property
+    def key(self):
+        """Stable hash of resolved command and environment"""
+        h = hashlib.sha1(self.command.encode())
+        for k in sorted(self.environ):
+            h.update('\0{0}={1}'.format(k, self.environ[k]).encode())
+        return h.hexdigest()
 
     def __repr__(self):
+        if self.command:
+            return self.command
         return str(self.conf)
 
 
 class PTask(object):
-    """Task instance with unresolved parameters representing a list of Tasks"""
+    """Task instance with unresolved parameters representing a list of Tasks
+
+    Values given as lists in the parametric names (e.g., 'cmdargs' and
+    'environ') are the axes of the parameter space. The Cartesian product
+    of all axes is never materialized, Tasks are generated on demand either
+    by iteration or by index (mixed-radix decoding, last axis varies
+    fastest). The 'command' and 'environ' values of each Task are rendered
+    from templates compiled once per study (see Interpolator).
+
+    Axes inherited from other tasks (see Resolver) are given in
+    'inherited', a mapping of (name, value name) to the location of the
+    list in the other task, e.g., {('cmdargs', 'x'): ('hello', 'cmdargs',
+    'x')}, so dependencies can follow them (see Scheduler).
+
+    Example:
+        >>> pt = PTask(name='hello', conf={'cmdargs': {'x': [1, 2, 3]}})
+        >>> len(pt)
+        3
+        >>> pt[-1].conf
+        {'cmdargs': {'x': 3}}
+    """
 
     _tid = 0
     _logger = logger
+    _param_keys = ['cmdargs', 'environ']
 
     def __init__(self, **kwargs):
         self.conf = {}
-        self.tasks = []
+        self.name = ''
+        self.interpolator = None
+        self.inherited = {}
 
         if 'conf' in kwargs:
             self.conf = kwargs['conf']
+        if 'name' in kwargs:
+            self.name = kwargs['name']
+        if 'interpolator' in kwargs:
+            self.interpolator = kwargs['interpolator']
+        else:
+            self.interpolator = Interpolator(study={self.name: self.conf})
+        if 'inherited' in kwargs:
+            self.inherited = kwargs['inherited']
+
+        self._axes = self._build_axes()
+
+    def _build_axes(self):
+        """Identify parameter axes, (name, value name, list of values)
+
+        Empty lists are not axes, ConfValidator reports them as errors.
+        """
+        axes = []
+        for k in type(self)._param_keys:
+            params = self.conf.get(k)
+            if not isinstance(params, dict):
+                continue
+            for p, vals in params.items():
+                if isinstance(vals, list) and vals:
+                    axes.append((k, p, vals))
+        return axes
+
+    @property
+    def axes(self):
+        return self._axes
+
+    @property
+    def tasks(self):
+        """Iterator over all Tasks, generated lazily"""
+        return iter(self)
+
+    def _make_task(self, index, values):
+        conf = dict(self.conf)
+        for k in {a[0] for a in self._axes}:
+            conf[k] = dict(self.conf[k])
+        for (k, p, _), v in zip(self._axes, values):
+            conf[k][p] = v
+
+        interp = self.interpolator.interpolate
+        command = ''
+        if 'command' in conf:
+            command = interp(str(conf['command']), conf, self.name)
+        environ = {}
+        if isinstance(conf.get('environ'), dict):
+            environ = {k: interp(str(v), conf, self.name)
+                       for k, v in conf['environ'].items()}
+        files = {}
+        for k in ['infiles', 'outfiles']:
+            fns = conf.get(k, [])
+            if isinstance(fns, dict):
+                fns = list(fns.values())
+            elif not isinstance(fns, list):
+                fns = [fns]
+            files[k] = [interp(str(f), conf, self.name) for f in fns]
+        return Task(name=self.name, index=index, conf=conf, command=command,
+                    environ=environ, **files)
+
+    def decode(self, index):
+        """Mixed-radix decoding of a linear index into axis values"""
+        values = []
+        for _, _, vals in reversed(self._axes):
+            index, r = divmod(index, len(vals))
+            values.append(vals[r])
+        values.reverse()
+        return values
+
+    def __len__(self):
+        n = 1
+        for _, _, vals in self._axes:
+            n *= len(vals)
+        return n
+
+    def __iter__(self):
+        values = itertools.product(*[vals for _, _, vals in self._axes])
+        for i, v in enumerate(values):
+            yield self._make_task(i, v)
+
+    def __getitem__(self, key):
+        """Get a Task by index or a generator of Tasks by slice"""
+        n = len(self)
+        if isinstance(key, slice):
+            return (self._make_task(i, self.decode(i))
+                    for i in range(*key.indices(n)))
+        try:
+            key = operator.index(key)
+        except TypeError:
+            raise TypeError('PTask indices must be integers or '
+                            'slices') from None
+        if key < 0:
+            key += n
+        if key < 0 or key >= n:
+            raise IndexError('PTask index out of range')
+        return self._make_task(key, self.decode(key))
 
     def print_tasks(self):
         for t in self.tasks:
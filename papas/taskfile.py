@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+
+
+"""Task files
+
+A task file stores resolved Tasks, one JSON object per line, so that
+tasks can be handed to runners on other nodes (batch jobs, MPI ranks)
+without shipping or re-expanding the study configuration.
+"""
+
+
+__all__ = ['dump_tasks', 'load_tasks']
+
+
+import json
+import itertools
+from task import Task
+
+
+def dump_tasks(tasks, fn):
+    """Write tasks to a task file
+
+    Args:
+        tasks (iterable): Tasks
+        fn (str): Task file
+
+    Returns:
+        int: Number of tasks written
+    """
+    n = 0
+    with open(fn, 'w') as fd:
+        for task in tasks:
+            fd.write(json.dumps(task.to_dict()))
+            fd.write('\n')
+            n += 1
+    return n
+
+
+def load_tasks(fn, start=0, stop=None):
+    """Generator of tasks from a task file
+
+    Args:
+        fn (str): Task file
+        start (int): Line of first task
+        stop (int): Line after last task, None reads until end of file
+
+    Yields:
+        Task: Resolved task
+    """
+    with open(fn, 'r') as fd:
+        for line in itertools.islice(fd, start, stop):
+            if line.strip():
+                yield Task(**json.loads(line))
@@ -15,7 +15,25 @@ class Error(Exception):
 class InterpolationError(Error):
     '''Base class for interpolation-related exceptions'''
 
-    def __init__(self, name, value, msg):
+    def __init__(self, name, value, msg, path=None):
         Error.__init__(self, msg)
         self.value = value
         self.name = name
+        self.path = path if path is not None else []
+
+
+class DependencyError(Error):
+    '''Base class for task dependency exceptions'''
+
+    def __init__(self, msg, path=None):
+        Error.__init__(self, msg)
+        self.path = path if path is not None else []
+
+
+class ParseError(Error):
+    '''Base class for configuration parsing exceptions'''
+
+    def __init__(self, msg, source='<string>', lineno=0):
+        Error.__init__(self, '%s:%d: %s' % (source, lineno, msg))
+        self.source = source
+        self.lineno = lineno
@@ -38,7 +38,8 @@ with open('tests_requirements.txt', 'r') as tests_req:
 # automatically installed unless another package depends on them.
 extras_requirements = {
     'lint': ['flake8>=3.5'],
-    'reST': ['Sphinx>=1.6']
+    'reST': ['Sphinx>=1.6'],
+    'msgpack': ['msgpack>=0.6']
 }
 
 
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+
+
+import os
+import sys
+import shutil
+import tempfile
+import subprocess
+import unittest
+from papas.task import PTask
+from papas.batch import BatchScript
+from papas.scheduler import Scheduler
+from papas.taskfile import dump_tasks, load_tasks
+
+
+class TestBatchScript(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        cmd = sys.executable + ' -c "print(${cmdargs:x})"'
+        self.ptasks = {
+            'a': PTask(name='a', conf={'cmdargs': {'x': list(range(250))},
+                                       'command': cmd}),
+            'b': PTask(name='b', conf={'command': cmd.replace(
+                '${cmdargs:x}', '0'), 'after': ['a']})
+        }
+        self.sched = Scheduler(self.ptasks)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_taskFile(self):
+        fn = os.path.join(self.tmpdir, 'a.tasks')
+        self.assertEqual(dump_tasks(self.ptasks['a'], fn), 250)
+        tasks = list(load_tasks(fn, 100, 200))
+        self.assertEqual(len(tasks), 100)
+        self.assertEqual(tasks[0].index, 100)
+        self.assertEqual(tasks[0].command, self.ptasks['a'][100].command)
+
+    def test_write(self):
+        for system, ext, array in [('pbs', '.pbs', '#PBS -t 0-2'),
+                                   ('slurm', '.slurm', '#SBATCH --array=0-2')]:
+            directory = os.path.join(self.tmpdir, system)
+            bs = BatchScript(system=system, tasks_per_job=100,
+                             directory=directory,
+                             options=['-l walltime=01:00:00'])
+            submit = bs.write(self.ptasks, self.sched.order, self.sched.after)
+            with open(os.path.join(directory, 'a' + ext)) as fd:
+                script = fd.read()
+            self.assertIn(array, script)
+            self.assertIn('walltime=01:00:00', script)
+            with open(submit) as fd:
+                lines = fd.read().splitlines()
+            self.assertIn('job0_a', lines[-1])
+            self.assertIn('b' + ext, lines[-1])
+
+    def test_runnerChunk(self):
+        fn = os.path.join(self.tmpdir, 'a.tasks')
+        dump_tasks(self.ptasks['a'], fn)
+        runner = os.path.join(os.path.dirname(__file__), '..', 'papas',
+                              'runner.py')
+        subprocess.check_call([sys.executable, runner, '-f', fn, '-c', '2',
+                               '-s', '100', '-w', '4', '-o', self.tmpdir],
+                              cwd=self.tmpdir, stderr=subprocess.DEVNULL)
+        outs = [f for f in os.listdir(self.tmpdir) if f.endswith('.out')]
+        self.assertEqual(len(outs), 50)
+        with open(os.path.join(self.tmpdir, 'a-249.out')) as fd:
+            self.assertEqual(fd.read().strip(), '249')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+from papas.task import PTask
+from papas.cache import ResultCache
+from papas.executors.local import LocalExecutor
+
+
+class TestResultCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.cachedir = os.path.join(self.tmpdir, 'cache')
+        self.infile = os.path.join(self.tmpdir, 'in.txt')
+        with open(self.infile, 'w') as fd:
+            fd.write('abc')
+        cmd = (sys.executable + ' -c "import shutil; '
+               'shutil.copyfile(\'${infiles:i}\', \'${outfiles:o}\'); '
+               'print(${cmdargs:x})"')
+        self.pt = PTask(name='copy', conf={
+            'cmdargs': {'x': [1, 2]},
+            'infiles': {'i': self.infile},
+            'outfiles': {'o': os.path.join(self.tmpdir,
+                                           'out${cmdargs:x}.txt')},
+            'command': cmd
+        })
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def run_study(self):
+        with LocalExecutor(workers=2, outdir=self.tmpdir,
+                           cache=self.cachedir) as ex:
+            return ex.run(self.pt)
+
+    def test_repeatedTasksFromCache(self):
+        stats = self.run_study()
+        self.assertEqual((stats['tasks'], stats['cached']), (2, 0))
+        os.remove(os.path.join(self.tmpdir, 'out2.txt'))
+        stats = self.run_study()
+        self.assertEqual((stats['tasks'], stats['cached']), (0, 2))
+        with open(os.path.join(self.tmpdir, 'out2.txt')) as fd:
+            self.assertEqual(fd.read(), 'abc')
+        with open(os.path.join(self.tmpdir, 'copy-1.out')) as fd:
+            self.assertEqual(fd.read().strip(), '2')
+
+    def test_infileChangeInvalidates(self):
+        self.run_study()
+        with open(self.infile, 'w') as fd:
+            fd.write('abcd')
+        stats = self.run_study()
+        self.assertEqual((stats['tasks'], stats['cached']), (2, 0))
+
+    def test_lruEviction(self):
+        self.run_study()
+        with ResultCache(self.cachedir, max_size=0) as cache:
+            self.assertEqual(len(cache), 2)
+            cache.evict()
+            self.assertEqual(len(cache), 0)
+
+    def test_orphanedObjectsIndexed(self):
+        self.run_study()
+        with ResultCache(self.cachedir) as cache:
+            size = cache.size
+            cache._db.execute('DELETE FROM results')
+        stats = self.run_study()
+        self.assertEqual((stats['tasks'], stats['cached']), (2, 0))
+        with ResultCache(self.cachedir) as cache:
+            self.assertEqual((len(cache), cache.size), (2, size))
+        stats = self.run_study()
+        self.assertEqual((stats['tasks'], stats['cached']), (0, 2))
+
+
+if __name__ == '__main__':
+    unittest.main()
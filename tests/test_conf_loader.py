@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+
+
+import os
+import time
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+from papas.papas import PaPaS
+from parsers import loader
+from parsers.loader import (ConfCache, detect_format, parse_conf,
+                            parse_detected, load_file)
+
+
+class TestConfLoader(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.conf = os.path.join(self.tmpdir, 'app.yml')
+        with open(self.conf, 'w') as fd:
+            fd.write('hello:\n    command: echo ${cmdargs:x}\n'
+                     '    cmdargs:\n        x: [1, 2]\n')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_detectFormat(self):
+        self.assertEqual(detect_format('{"a": 1}'), 'json')
+        self.assertEqual(detect_format('\n  [1, 2]'), 'json')
+        self.assertEqual(detect_format('# comment\n[hello]\nx: 1'), 'ini')
+        text = '; comment\n[hello]\nx: 1'
+        self.assertEqual(detect_format(text), 'ini')
+        self.assertEqual(parse_conf(text, 'ini'), {'hello': {'x': 1}})
+        self.assertEqual(detect_format('hello:\n  x: 1'), 'yaml')
+
+    def test_parse(self):
+        expected = {'hello': {'command': 'echo ${cmdargs:x}',
+                              'cmdargs': {'x': [1, 2]}}}
+        self.assertEqual(load_file(self.conf), expected)
+        self.assertEqual(parse_conf('{"a": [1, 2]}', 'json'), {'a': [1, 2]})
+        with self.assertRaises(ValueError):
+            parse_conf('', 'xml')
+
+    def test_parseDetected(self):
+        self.assertEqual(parse_detected('{"a": [1, 2]}'), {'a': [1, 2]})
+        # YAML flow style also starts with '{' or '['
+        text = '{hello: {command: echo hi}}'
+        self.assertEqual(parse_detected(text),
+                         {'hello': {'command': 'echo hi'}})
+        self.assertEqual(parse_detected('[a, 1]'), ['a', 1])
+        pp = PaPaS(app=text)
+        self.assertEqual([t.command for t in pp.tasks()], ['echo hi'])
+
+    def test_cache(self):
+        cache = ConfCache(os.path.join(self.tmpdir, 'cache'))
+        data = cache.load(self.conf)
+        self.assertEqual(cache.misses, 1)
+
+        # Second load is a hit, even without re-parsing
+        parse = loader.parse_conf
+        loader.parse_conf = None
+        try:
+            self.assertEqual(ConfCache(cache.directory).load(self.conf), data)
+        finally:
+            loader.parse_conf = parse
+
+        # Changed content is re-parsed, even with same mtime and size
+        st = os.stat(self.conf)
+        with open(self.conf, 'r+') as fd:
+            fd.write(fd.read().replace('[1, 2]', '[3, 4]'))
+        os.utime(self.conf, ns=(st.st_atime_ns, st.st_mtime_ns))
+        self.assertEqual(cache.load(self.conf)['hello']['cmdargs']['x'],
+                         [3, 4])
+        self.assertEqual(cache.misses, 2)
+
+        # Touched file with same content is a hit
+        old = time.time() - 60
+        os.utime(self.conf, (old, old))
+        cache.load(self.conf)
+        cache.load(self.conf)
+        self.assertEqual((cache.hits, cache.misses), (2, 2))
+
+    def test_cacheResolvedStudy(self):
+        cachedir = os.path.join(self.tmpdir, 'cache')
+        pp = PaPaS(conf_cache=cachedir, app=self.conf)
+        commands = [t.command for t in pp.tasks()]
+        self.assertEqual(commands, ['echo 1', 'echo 2'])
+
+        # Unchanged file is neither validated nor resolved again
+        with mock.patch.object(PaPaS, 'validate_app',
+                               side_effect=AssertionError), \
+                mock.patch.object(PaPaS, 'interpolate',
+                                  side_effect=AssertionError):
+            pp = PaPaS(conf_cache=cachedir, app=self.conf)
+        self.assertEqual([t.command for t in pp.tasks()], commands)
+
+        with open(self.conf, 'a') as fd:
+            fd.write('    environ:\n        N: 1\n')
+        pp = PaPaS(conf_cache=cachedir, app=self.conf)
+        self.assertEqual(pp.study['hello']['environ'], {'N': 1})
+
+    def test_cacheFormats(self):
+        cachedir = os.path.join(self.tmpdir, 'cache')
+        for mp in [loader.msgpack, None]:
+            with mock.patch.object(loader, 'msgpack', mp):
+                cache = ConfCache(cachedir)
+                cache.clear()
+                data = cache.load(self.conf)
+                cache = ConfCache(cachedir)
+                self.assertEqual(cache.load(self.conf), data)
+                self.assertEqual((cache.hits, cache.misses), (1, 0))
+
+        # Entries that are not in a cache format (e.g., pickles) are
+        # ignored, not loaded
+        efn = cache._entry_file(self.conf)
+        with open(efn, 'wb') as fd:
+            fd.write(b'\x80\x04K\x01.')
+        cache = ConfCache(cachedir)
+        with self.assertLogs(loader.logger, 'WARNING'):
+            self.assertEqual(cache.load(self.conf), data)
+        self.assertEqual(cache.misses, 1)
+
+    def test_cacheInheritedAxes(self):
+        conf = os.path.join(self.tmpdir, 'spec.yml')
+        with open(conf, 'w') as fd:
+            fd.write('hello:\n    command: echo ${cmdargs:x}\n'
+                     '    cmdargs:\n        x: [1, 2]\n'
+                     'hello2:\n    command: echo ${cmdargs:y}\n'
+                     '    cmdargs:\n        y: ${hello:cmdargs:x}\n'
+                     '    after: hello\n')
+        cachedir = os.path.join(self.tmpdir, 'cache')
+        pp = PaPaS(conf_cache=cachedir, app=conf)
+        with mock.patch.object(PaPaS, 'interpolate',
+                               side_effect=AssertionError):
+            cached = PaPaS(conf_cache=cachedir, app=conf)
+        self.assertIn('hello2', pp.inherited)
+        self.assertEqual(cached.inherited, pp.inherited)
+        self.assertEqual(list(cached.resolve_dependencies().instance_edges()),
+                         list(pp.resolve_dependencies().instance_edges()))
+
+
+if __name__ == '__main__':
+    unittest.main()
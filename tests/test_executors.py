@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+from papas.task import PTask
+from papas.scheduler import Scheduler
+from papas.executors.local import LocalExecutor
+from papas.executors.asyncio_executor import AsyncioExecutor
+
+
+def make_ptask(name='echo', n=4):
+    conf = {
+        'program': sys.executable,
+        'cmdargs': {'x': list(range(n))},
+        'environ': {'PAPAS_TEST': 'on'},
+        'command': '${program} -c "import os; '
+                   'print(${cmdargs:x}, os.environ[\'PAPAS_TEST\'])"'
+    }
+    return PTask(name=name, conf=conf)
+
+
+class TestLocalExecutor(unittest.TestCase):
+
+    def setUp(self):
+        self.outdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.outdir)
+
+    def test_run(self):
+        pt = make_ptask()
+        done = []
+        with LocalExecutor(workers=2, outdir=self.outdir) as ex:
+            stats = ex.run(pt, callback=lambda t, rc: done.append(rc))
+        self.assertEqual(stats['tasks'], 4)
+        self.assertEqual(stats['failed'], 0)
+        self.assertEqual(done, [0] * 4)
+        with open(os.path.join(self.outdir, 'echo-3.out')) as fd:
+            self.assertEqual(fd.read().strip(), '3 on')
+
+    def test_failedLaunch(self):
+        pt = PTask(name='bad', conf={'command': 'papas-no-such-program'})
+        with LocalExecutor(workers=1, outdir=self.outdir) as ex:
+            stats = ex.run(pt)
+        self.assertEqual(stats['failed'], 1)
+
+    def test_badQuoting(self):
+        # Unbalanced quote fails only its task, not the whole run
+        pt = PTask(name='bad', conf={'cmdargs': {'q': ['"', '']},
+                                     'command': 'true ${cmdargs:q}'})
+        for engine in [LocalExecutor, AsyncioExecutor]:
+            done = []
+            with engine(workers=2, outdir=self.outdir) as ex:
+                stats = ex.run(pt, callback=lambda t, rc: done.append(rc))
+            self.assertEqual((stats['tasks'], stats['failed']), (2, 1))
+            self.assertEqual(sorted(done), [0, 127])
+
+
+class TestAsyncioExecutor(unittest.TestCase):
+
+    def setUp(self):
+        self.outdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.outdir)
+
+    def test_run(self):
+        pt = make_ptask(n=8)
+        with AsyncioExecutor(workers=3, outdir=self.outdir) as ex:
+            stats = ex.run(pt)
+        self.assertEqual(stats['tasks'], 8)
+        self.assertEqual(stats['failed'], 0)
+        with open(os.path.join(self.outdir, 'echo-5.out')) as fd:
+            self.assertEqual(fd.read().strip(), '5 on')
+
+    def test_submitWait(self):
+        pt = make_ptask(n=2)
+        with AsyncioExecutor(workers=2, outdir=self.outdir) as ex:
+            for t in pt:
+                ex.submit(t)
+            done = []
+            while ex.running:
+                done += ex.wait()
+        self.assertEqual(sorted(rc for _, rc in done), [0, 0])
+
+    def test_timeout(self):
+        cmd = sys.executable + ' -c "import time; time.sleep(10)"'
+        pt = PTask(name='slow', conf={'command': cmd})
+        with AsyncioExecutor(workers=1, outdir=self.outdir,
+                             timeout=0.2) as ex:
+            rcs = []
+            ex.run(pt, callback=lambda t, rc: rcs.append(rc))
+        self.assertEqual(rcs, [AsyncioExecutor.TIMEOUT_RETURNCODE])
+
+    def test_taskException(self):
+        # A task raising is counted as failed, other tasks still run
+        pt = make_ptask(n=3)
+        prepare = AsyncioExecutor.prepare
+
+        def failing(ex, task):
+            if task.index == 1:
+                raise RuntimeError('unexpected')
+            return prepare(ex, task)
+
+        with mock.patch.object(AsyncioExecutor, 'prepare', failing):
+            with AsyncioExecutor(workers=2, outdir=self.outdir) as ex:
+                stats = ex.run(pt)
+            self.assertEqual((stats['tasks'], stats['failed']), (3, 1))
+            with AsyncioExecutor(workers=2, outdir=self.outdir) as ex:
+                stats = Scheduler({pt.name: pt}).run(ex)
+            self.assertEqual((stats['tasks'], stats['failed']), (3, 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
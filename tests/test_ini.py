@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+
+
+import unittest
+from parsers.INIParser import MyParser, parse_ini
+from parsers.loader import load_file
+from utils.exceptions import ParseError
+
+
+class TestINIParser(unittest.TestCase):
+
+    def test_structure(self):
+        data = parse_ini('''
+# comment
+; comment
+[hello]
+name: Hello world
+cmdargs:
+    xparam: 10
+            20
+    yparam:
+        0.5
+    zparam: ${hello:program}
+environ:
+    OMP_NUM_THREADS: 4
+after:
+    first
+infiles:
+    a.txt
+    b.txt
+command: ${program} --x ${cmdargs:xparam}
+empty:
+''')
+        self.assertEqual(data, {'hello': {
+            'name': 'Hello world',
+            'cmdargs': {'xparam': [10, 20], 'yparam': [0.5],
+                        'zparam': '${hello:program}'},
+            'environ': {'OMP_NUM_THREADS': 4},
+            'after': ['first'],
+            'infiles': ['a.txt', 'b.txt'],
+            'command': '${program} --x ${cmdargs:xparam}',
+            'empty': None
+        }})
+
+    def test_sameAsJSON(self):
+        ini = load_file('papas/tasks_conf/INI_conf/helloWorld.ini')
+        json = load_file('papas/tasks_conf/JSON_conf/helloWorld.json')
+        for task in json:
+            self.assertEqual(ini[task], json[task])
+        self.assertEqual(MyParser().load(
+            'papas/tasks_conf/INI_conf/helloWorld.ini'), ini)
+
+    def test_samples(self):
+        for name in ['helloWorld', 'matlab', 'NetLogo']:
+            ini = load_file('papas/tasks_conf/INI_conf/%s.ini' % name)
+            self.assertTrue(len(ini) > 0, name)
+
+    def test_errors(self):
+        for text, lineno in [('x: 1', 1),
+                             ('[a]\nx = 1', 2),
+                             ('[a]\n  x: 1', 2),
+                             ('[a]\nx: 1\nx: 2', 3),
+                             ('[a]\n[a]', 2),
+                             ('[a]\nx:\n    a: 1\n  b: 2', 4)]:
+            with self.assertRaises(ParseError) as cm:
+                parse_ini(text, 'test.ini')
+            self.assertEqual(cm.exception.lineno, lineno, text)
+            self.assertTrue(cm.exception.message.startswith(
+                'test.ini:%d: ' % lineno))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+
+
+import os
+import unittest
+from papas.parsers.interpolation import (Template, TemplateCache,
+                                         Interpolator, Resolver)
+from task import PTask
+from scheduler import Scheduler
+from parsers.loader import load_file
+from utils.exceptions import InterpolationError
+
+
+CONF_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..',
+                        'papas', 'tasks_conf')
+
+
+class TestTemplate(unittest.TestCase):
+
+    def test_compile(self):
+        t = Template('${program} --xparam ${cmdargs:xparam} $$HOME')
+        self.assertEqual(t.refs, [('program',), ('cmdargs', 'xparam')])
+        self.assertEqual(t.literals, ['', ' --xparam ', ' $HOME'])
+
+    def test_substitute(self):
+        t = Template('a${x}b${y:z}c')
+        s = t.substitute({('x',): 1, ('y', 'z'): 'Z'})
+        self.assertEqual(s, 'a1bZc')
+
+    def test_badSyntax(self):
+        for text in ['$x', '${}', '${a:b:c:d}', 'abc ${x']:
+            with self.assertRaises(InterpolationError):
+                Template(text)
+
+    def test_cache(self):
+        cache = TemplateCache()
+        self.assertIs(cache['${x}'], cache['${x}'])
+
+
+class TestInterpolator(unittest.TestCase):
+
+    def setUp(self):
+        self.study = {
+            'hello': {
+                'program': 'helloWorld.py',
+                'cmdargs': {'xparam': 10},
+                'command': '${program} --xparam ${cmdargs:xparam}'
+            },
+            'hello2': {
+                'program': '${hello:program}',
+                'command': '${program} ${hello:cmdargs:xparam}'
+            }
+        }
+        self.interp = Interpolator(study=self.study)
+
+    def test_intraTask(self):
+        conf = self.study['hello']
+        s = self.interp.interpolate(conf['command'], conf, 'hello')
+        self.assertEqual(s, 'helloWorld.py --xparam 10')
+
+    def test_interTask(self):
+        conf = self.study['hello2']
+        s = self.interp.interpolate(conf['command'], conf, 'hello2')
+        self.assertEqual(s, 'helloWorld.py 10')
+
+    def test_missingReference(self):
+        with self.assertRaises(InterpolationError):
+            self.interp.interpolate('${nothere}', {}, 'hello')
+
+    def test_depthExceeded(self):
+        conf = {'a': '${b}', 'b': '${a}'}
+        with self.assertRaises(InterpolationError):
+            self.interp.interpolate('${a}', conf, 'loop')
+
+
+class TestResolver(unittest.TestCase):
+
+    def setUp(self):
+        self.study = {
+            'hello': {
+                'program': 'helloWorld.py',
+                'opts': '--xparam ${cmdargs:xparam} --home $${HOME}',
+                'cmdargs': {'xparam': [10, '${program}']},
+                'environ': {'N': ['${cmdargs:xparam}', 2]},
+                'command': '${program} ${opts}'
+            },
+            'hello2': {
+                'program': '${hello:program}',
+                'infiles': ['${hello:program}.in'],
+                'command': '${program} ${hello:opts} ${hello:command}'
+            }
+        }
+
+    def render(self, study):
+        interp = Interpolator(study=study)
+        return [(t.command, t.environ, t.infiles) for name, conf in
+                study.items()
+                for t in PTask(name=name, conf=conf, interpolator=interp)]
+
+    def test_parametricSlots(self):
+        study = Resolver(self.study).resolve()
+        self.assertEqual(study['hello']['command'],
+                         'helloWorld.py --xparam ${cmdargs:xparam} '
+                         '--home $${HOME}')
+        self.assertEqual(study['hello']['cmdargs']['xparam'],
+                         [10, 'helloWorld.py'])
+        self.assertEqual(study['hello2']['command'],
+                         "helloWorld.py --xparam [10, '$${program}'] "
+                         "--home $${HOME} helloWorld.py --xparam "
+                         "[10, '$${program}'] --home $${HOME}")
+        # Raw study is not modified
+        self.assertEqual(self.study['hello']['command'], '${program} ${opts}')
+
+    def test_sameAsInterpolator(self):
+        self.assertEqual(self.render(Resolver(self.study).resolve()),
+                         self.render(self.study))
+
+    def test_cycle(self):
+        self.study['hello']['program'] = '${hello2:command}'
+        with self.assertRaises(InterpolationError) as cm:
+            Resolver(self.study).resolve()
+        path = cm.exception.path
+        self.assertEqual(path[0], path[-1])
+        self.assertIn('hello:program', path)
+        self.assertIn('hello2:command', path)
+
+    def test_missingReference(self):
+        self.study['hello2']['infiles'].append('${hello:nothere}')
+        with self.assertRaises(InterpolationError):
+            Resolver(self.study).resolve()
+
+
+class TestInheritedAxes(unittest.TestCase):
+    """Spec example, hello2 has the same execution model as hello"""
+
+    def build(self, fn):
+        data = load_file(os.path.join(CONF_DIR, fn))
+        study = {k: data[k] for k in ['hello', 'hello2']}
+        resolver = Resolver(study, PTask._param_keys)
+        study = resolver.resolve()
+        interp = Interpolator(study=study)
+        return {k: PTask(name=k, conf=v, interpolator=interp,
+                         inherited=resolver.inherited.get(k, {}))
+                for k, v in study.items()}
+
+    def test_specExample(self):
+        for fn in ['YAML_conf/helloWorld.yml', 'INI_conf/helloWorld.ini']:
+            pts = self.build(fn)
+            program = pts['hello'].conf['program']
+            self.assertEqual(len(pts['hello']), 2)
+            self.assertEqual(len(pts['hello2']), 2 * 3)
+            self.assertEqual([t.command for t in pts['hello2']][::3],
+                             [program + ' --xparam 10',
+                              program + ' --xparam 30'])
+            self.assertEqual(pts['hello2'].inherited,
+                             {('cmdargs', 'xparam'):
+                              ('hello', 'cmdargs', 'xparam')})
+
+    def test_sharedWithPrerequisite(self):
+        sched = Scheduler(self.build('YAML_conf/helloWorld.yml'))
+        edges = list(sched.instance_edges())
+        # each hello2 instance waits only on the hello instance with the
+        # same xparam
+        self.assertEqual(len(edges), 6)
+        self.assertIn((('hello', 1), ('hello2', 3)), edges)
+
+    def test_ownAxisNotInherited(self):
+        study = {'a': {'cmdargs': {'x': [1, 2], 'y': '${cmdargs:x}'},
+                       'command': '${cmdargs:y}'}}
+        resolver = Resolver(study)
+        pt = PTask(name='a', conf=resolver.resolve()['a'])
+        self.assertEqual(len(pt), 2)
+        self.assertEqual(resolver.inherited, {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+from papas.task import PTask
+from papas.journal import Journal
+from papas.scheduler import Scheduler
+from papas.executors.local import LocalExecutor
+from papas.executors.asyncio_executor import AsyncioExecutor
+
+
+class TestJournal(unittest.TestCase):
+
+    def setUp(self):
+        self.outdir = tempfile.mkdtemp()
+        self.fn = os.path.join(self.outdir, 'study.journal')
+        # x == 2 fails
+        cmd = sys.executable + ' -c "import sys; sys.exit(${cmdargs:x} == 2)"'
+        self.pt = PTask(name='t', conf={'cmdargs': {'x': [0, 1, 2, 3]},
+                                        'command': cmd})
+
+    def tearDown(self):
+        shutil.rmtree(self.outdir)
+
+    def test_taskKey(self):
+        self.assertEqual(self.pt[1].key, self.pt[1].key)
+        self.assertNotEqual(self.pt[1].key, self.pt[2].key)
+
+    def test_record(self):
+        with Journal(self.fn) as j:
+            j.record(self.pt[0], 0)
+            j.record(self.pt[2], 1)
+            self.assertTrue(j.completed(self.pt[0]))
+            self.assertFalse(j.completed(self.pt[2]))
+            self.assertFalse(j.completed(self.pt[3]))
+            self.assertEqual(len(j), 2)
+
+    def test_durations(self):
+        for engine in [LocalExecutor, AsyncioExecutor]:
+            if os.path.exists(self.fn):
+                os.remove(self.fn)
+            with engine(workers=2, outdir=self.outdir,
+                        journal=self.fn) as ex:
+                ex.run(self.pt)
+            with Journal(self.fn) as j:
+                durations = j.durations()
+            self.assertEqual(list(durations), ['t'])
+            self.assertGreater(durations['t'], 0.)
+
+    def test_resume(self):
+        for engine in [LocalExecutor, AsyncioExecutor]:
+            if os.path.exists(self.fn):
+                os.remove(self.fn)
+            with engine(workers=2, outdir=self.outdir,
+                        journal=self.fn) as ex:
+                stats = ex.run(self.pt)
+            self.assertEqual((stats['tasks'], stats['failed']), (4, 1))
+
+            with engine(workers=2, outdir=self.outdir, journal=self.fn,
+                        resume=True) as ex:
+                stats = ex.run(self.pt)
+            self.assertEqual((stats['tasks'], stats['resumed']), (1, 3))
+
+    def test_resumeWithScheduler(self):
+        with LocalExecutor(workers=2, outdir=self.outdir,
+                           journal=self.fn) as ex:
+            Scheduler({'t': self.pt}).run(ex)
+        with LocalExecutor(workers=2, outdir=self.outdir, journal=self.fn,
+                           resume=True) as ex:
+            stats = Scheduler({'t': self.pt}).run(ex)
+        self.assertEqual((stats['tasks'], stats['resumed']), (1, 3))
+
+
+if __name__ == '__main__':
+    unittest.main()
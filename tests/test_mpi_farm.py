@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+
+
+import os
+import sys
+import shutil
+import tempfile
+import subprocess
+import unittest
+from papas.task import PTask
+from papas.journal import Journal
+from papas.taskfile import dump_tasks
+
+try:
+    import mpi4py  # noqa: F401
+    has_mpi = shutil.which('mpirun') is not None
+except ImportError:
+    has_mpi = False
+
+
+@unittest.skipUnless(has_mpi, 'requires mpi4py and mpirun')
+class TestMPIFarm(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        cmd = sys.executable + ' -c "print(${cmdargs:x})"'
+        pt = PTask(name='farm', conf={'cmdargs': {'x': list(range(20))},
+                                      'command': cmd})
+        self.tasks = os.path.join(self.tmpdir, 'farm.tasks')
+        dump_tasks(pt, self.tasks)
+        self.farm = os.path.join(os.path.dirname(__file__), '..', 'papas',
+                                 'mpi_farm.py')
+        self.env = dict(os.environ, OMPI_ALLOW_RUN_AS_ROOT='1',
+                        OMPI_ALLOW_RUN_AS_ROOT_CONFIRM='1',
+                        OMPI_MCA_rmaps_base_oversubscribe='1')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_farm(self):
+        journal = os.path.join(self.tmpdir, 'farm.journal')
+        subprocess.check_call(['mpirun', '-n', '4', sys.executable,
+                               self.farm, '-f', self.tasks, '-o', self.tmpdir,
+                               '-j', journal],
+                              cwd=self.tmpdir, env=self.env,
+                              stdout=subprocess.DEVNULL,
+                              stderr=subprocess.DEVNULL, timeout=120)
+        outs = [f for f in os.listdir(self.tmpdir) if f.endswith('.out')]
+        self.assertEqual(len(outs), 20)
+        with open(os.path.join(self.tmpdir, 'farm-19.out')) as fd:
+            self.assertEqual(fd.read().strip(), '19')
+        with Journal(journal) as j:
+            self.assertEqual(len(j), 20)
+
+
+if __name__ == '__main__':
+    unittest.main()
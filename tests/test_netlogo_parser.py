@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+
+
+import os
+import json
+import sys
+import shutil
+import tempfile
+import unittest
+import importlib.util
+
+
+examples_dir = os.path.join(os.path.dirname(__file__), '..', 'papas',
+                            'examples')
+spec = importlib.util.spec_from_file_location(
+    'netlogo_output_parser',
+    os.path.join(examples_dir, 'NetLogo', 'netlogo_output_parser.py'))
+parser = importlib.util.module_from_spec(spec)
+sys.modules[spec.name] = parser  # functions are pickled by process pools
+spec.loader.exec_module(parser)
+
+fire_csv = os.path.join(examples_dir, 'Fire', 'outputs', 'Fire.csv')
+fire_ordered_csv = os.path.join(examples_dir, 'Fire', 'outputs',
+                                'Fire_ordered.csv')
+
+
+class TestNetLogoParser(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.outfile = os.path.join(self.tmpdir, 'out.csv')
+        with open(fire_ordered_csv) as fd:
+            self.expected = fd.read()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def assertOrdered(self):
+        with open(self.outfile) as fd:
+            self.assertEqual(fd.read(), self.expected)
+
+    def test_inMemory(self):
+        parser.processNetLogoCSV(fire_csv, self.outfile)
+        self.assertOrdered()
+
+    def test_externalSort(self):
+        for chunksize in [1, 4, 29, 30]:
+            parser.processNetLogoCSV(fire_csv, self.outfile,
+                                     chunksize=chunksize, tmpdir=self.tmpdir)
+            self.assertOrdered()
+            # temporary runs are removed
+            self.assertEqual(os.listdir(self.tmpdir), ['out.csv'])
+
+    def test_multipleFiles(self):
+        # One file per data section, as written by each task
+        with open(fire_csv) as fd:
+            lines = fd.readlines()
+        starts = [i for i, line in enumerate(lines)
+                  if line.startswith('"BehaviorSpace results')] + [len(lines)]
+        infiles = []
+        for i, (a, b) in enumerate(zip(starts[:-1], starts[1:])):
+            infiles.append(os.path.join(self.tmpdir, 'Fire-%d.csv' % i))
+            with open(infiles[-1], 'w') as fd:
+                fd.writelines(lines[a:b])
+        self.assertGreater(len(infiles), 1)
+
+        parser.processNetLogoCSVFiles(infiles, self.outfile, processes=2,
+                                      tmpdir=self.tmpdir)
+        self.assertOrdered()
+        # temporary shards are removed
+        self.assertEqual(len(os.listdir(self.tmpdir)), len(infiles) + 1)
+
+    def test_memoryMapped(self):
+        info = parser.newNetLogoInfo()
+        sections = parser.findNetLogoSections(fire_csv, info)
+        self.assertEqual(len(sections), 2)
+        self.assertEqual(info['num_data_cols'], 5)
+
+        parser.processNetLogoCSVSections(fire_csv, self.outfile, processes=2,
+                                         tmpdir=self.tmpdir)
+        self.assertOrdered()
+        self.assertEqual(os.listdir(self.tmpdir), ['out.csv'])
+
+    def test_incrementalUpdate(self):
+        infile = os.path.join(self.tmpdir, 'Fire.csv')
+        with open(fire_csv, 'rb') as fd:
+            data = fd.read()
+        # Appends end at headers, within data sections, and mid-line
+        for end in [100, 500, 900, len(data) // 2, len(data)]:
+            with open(infile, 'wb') as fd:
+                fd.write(data[:end])
+            parser.updateNetLogoCSV(infile, self.outfile)
+        self.assertOrdered()
+        with open(self.outfile + '.state') as fd:
+            self.assertEqual(json.load(fd)['info']['offset'], len(data))
+
+        # Unchanged input keeps output
+        parser.updateNetLogoCSV(infile, self.outfile)
+        self.assertOrdered()
+
+    def test_interruptedUpdate(self):
+        infile = os.path.join(self.tmpdir, 'Fire.csv')
+        with open(fire_csv, 'rb') as fd:
+            data = fd.read()
+        with open(infile, 'wb') as fd:
+            fd.write(data[:len(data) // 2])
+        parser.updateNetLogoCSV(infile, self.outfile)
+        with open(self.outfile + '.state') as fd:
+            state = fd.read()
+        with open(infile, 'wb') as fd:
+            fd.write(data)
+        parser.updateNetLogoCSV(infile, self.outfile)
+
+        # Crash after output and keys were replaced, before the state
+        with open(self.outfile + '.state', 'w') as fd:
+            fd.write(state)
+        parser.updateNetLogoCSV(infile, self.outfile)
+        self.assertOrdered()
+
+    @unittest.skipIf(parser.np is None, 'NumPy is not available')
+    def test_numpy(self):
+        for block in [1, 7, 65536]:
+            parser.processNetLogoCSVNumPy(fire_csv, self.outfile, block=block)
+            self.assertOrdered()
+
+    @unittest.skipIf(parser.np is None, 'NumPy is not available')
+    def test_binaryColumns(self):
+        np = parser.np
+        bindir = os.path.join(self.tmpdir, 'columns')
+        parser.processNetLogoCSV(fire_csv, self.outfile, bindir=bindir)
+        self.assertOrdered()
+
+        with open(os.path.join(bindir, 'metadata.json')) as fd:
+            metadata = json.load(fd)
+        self.assertEqual(metadata['rows'], 30)
+        self.assertEqual(metadata['run_number_column'], '[run number]')
+        self.assertEqual([(t['first_run'], t['last_run'])
+                          for t in metadata['tasks']], [(1, 15), (16, 30)])
+        dtypes = {c['name']: c['dtype'] for c in metadata['columns']}
+        self.assertEqual(dtypes['[step]'], np.dtype(np.int64).str)
+        self.assertEqual(dtypes['density'], np.dtype(np.float64).str)
+
+        runs = np.load(os.path.join(bindir, 'run_number.npy'),
+                       mmap_mode='r')
+        task = np.load(os.path.join(bindir, 'task.npy'), mmap_mode='r')
+        self.assertTrue(np.array_equal(task, (runs > 15).astype(np.int32)))
+
+        # Same columns from NumPy path, external sort, merged sections,
+        # and in small blocks
+        spooldir = os.path.join(self.tmpdir, 'spool')
+        os.mkdir(spooldir)
+        bindir2 = os.path.join(self.tmpdir, 'columns2')
+        for run in [
+                lambda: parser.processNetLogoCSVNumPy(
+                    fire_csv, self.outfile, bindir=bindir2),
+                lambda: parser.processNetLogoCSV(
+                    fire_csv, self.outfile, chunksize=7, tmpdir=spooldir,
+                    bindir=bindir2),
+                lambda: parser.processNetLogoCSVSections(
+                    fire_csv, self.outfile, processes=2, tmpdir=spooldir,
+                    bindir=bindir2)]:
+            shutil.rmtree(bindir2, ignore_errors=True)
+            run()
+            self.assertEqual(os.listdir(spooldir), [])
+            for c in metadata['columns']:
+                self.assertTrue(np.array_equal(
+                    np.load(os.path.join(bindir, c['file'])),
+                    np.load(os.path.join(bindir2, c['file']))))
+
+        data = np.loadtxt(self.outfile, delimiter=',',
+                          skiprows=len(metadata['header']) + 1)
+        info = parser.newNetLogoInfo()
+        list(parser.readNetLogoCSV(fire_csv, info))
+        parser.writeNetLogoColumns(bindir2, data, info, block=4)
+        for c in metadata['columns']:
+            self.assertTrue(np.array_equal(
+                np.load(os.path.join(bindir, c['file'])),
+                np.load(os.path.join(bindir2, c['file']))))
+
+    @unittest.skipIf(parser.np is None, 'NumPy is not available')
+    def test_columnFileCollisions(self):
+        np = parser.np
+        info = parser.newNetLogoInfo()
+        info['header_data'] = [('a b', 'a-b', 'task', '[run number]')]
+        info['run_number_col'] = 3
+        info['sections'] = [['in.csv', 1, 2]]
+        data = np.array([[1., 2., 3., 1.], [4., 5., 6., 2.]])
+        bindir = os.path.join(self.tmpdir, 'columns')
+        parser.writeNetLogoColumns(bindir, data, info)
+
+        with open(os.path.join(bindir, 'columns.json')) as fd:
+            files = json.load(fd)
+        self.assertEqual(files, {'a b': 'a_b.npy', 'a-b': 'a_b_2.npy',
+                                 'task': 'task_2.npy',
+                                 '[run number]': 'run_number.npy'})
+        for i, name in enumerate(info['header_data'][-1]):
+            self.assertTrue(np.array_equal(
+                np.load(os.path.join(bindir, files[name])), data[:, i]))
+        self.assertTrue(np.array_equal(
+            np.load(os.path.join(bindir, 'task.npy')), [0, 0]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+
+
+import sys
+import shutil
+import tempfile
+import unittest
+from papas.task import PTask
+from papas.scheduler import Scheduler
+from papas.executors.local import LocalExecutor
+from papas.papas import PaPaS
+from utils.exceptions import DependencyError
+
+
+class FakeExecutor(object):
+    """Executor that finishes one task per wait(), in submission order"""
+
+    def __init__(self, workers=2, fail=()):
+        self.workers = workers
+        self.fail = fail
+        self.queue = []
+        self.order = []
+
+    @property
+    def running(self):
+        return len(self.queue)
+
+    def reset_stats(self):
+        pass
+
+    def submit(self, task):
+        self.queue.append(task)
+
+    def wait(self):
+        task = self.queue.pop(0)
+        self.order.append((task.name, task.index))
+        return [(task, 1 if (task.name, task.index) in self.fail else 0)]
+
+    def report(self):
+        return {}
+
+
+def make_study():
+    return {
+        'a': PTask(name='a', conf={'cmdargs': {'x': [1, 2]},
+                                   'command': 'a'}),
+        'b': PTask(name='b', conf={'cmdargs': {'x': [1, 2]},
+                                   'environ': {'N': [1, 2, 3]},
+                                   'command': 'b', 'after': ['a']}),
+        'c': PTask(name='c', conf={'command': 'c', 'after': ['b']})
+    }
+
+
+class TestScheduler(unittest.TestCase):
+
+    def test_unknownDependency(self):
+        pts = {'a': PTask(name='a', conf={'after': ['z']})}
+        with self.assertRaises(DependencyError):
+            Scheduler(pts)
+
+    def test_cycle(self):
+        pts = {
+            'a': PTask(name='a', conf={'after': ['c']}),
+            'b': PTask(name='b', conf={'after': ['a']}),
+            'c': PTask(name='c', conf={'after': ['b']})
+        }
+        with self.assertRaises(DependencyError) as cm:
+            Scheduler(pts)
+        self.assertEqual(len(cm.exception.path), 4)
+
+    def test_perInstanceRelease(self):
+        ex = FakeExecutor(workers=1)
+        Scheduler(make_study()).run(ex)
+        # b instances with x=1 are released right after a-0 finishes
+        self.assertEqual(ex.order[:2], [('a', 0), ('b', 0)])
+        self.assertEqual(len(ex.order), 2 + 6 + 1)
+        self.assertEqual(ex.order[-1], ('c', 0))
+
+    def test_failureSkipsDependents(self):
+        ex = FakeExecutor(workers=4, fail={('a', 1)})
+        stats = Scheduler(make_study()).run(ex)
+        self.assertEqual(stats['skipped'], 3 + 1)
+        self.assertNotIn(('c', 0), ex.order)
+
+    def test_instanceEdges(self):
+        sched = Scheduler(make_study())
+        self.assertEqual(len(list(sched.instances())), 2 + 6 + 1)
+        edges = list(sched.instance_edges())
+        self.assertEqual(len(edges), 6 + 6)
+        self.assertIn((('a', 1), ('b', 3)), edges)
+        self.assertNotIn((('a', 0), ('b', 3)), edges)
+        self.assertIn((('b', 5), ('c', 0)), edges)
+
+    def test_priorityDispatch(self):
+        pts = {
+            'short': PTask(name='short', conf={'cmdargs': {'x': [1, 2]}}),
+            'long': PTask(name='long', conf={'duration': 5}),
+            'tail': PTask(name='tail', conf={'after': ['long'],
+                                             'duration': 5})
+        }
+        ex = FakeExecutor(workers=1)
+        sched = Scheduler(pts, durations={'short': 1.})
+        sched.run(ex)
+        self.assertEqual(ex.order, [('long', 0), ('tail', 0),
+                                    ('short', 0), ('short', 1)])
+
+        # without durations, tasks are dispatched as they become ready
+        ex = FakeExecutor(workers=1)
+        Scheduler(pts).run(ex)
+        self.assertEqual(ex.order[0], ('short', 0))
+
+    def test_criticalPath(self):
+        sched = Scheduler(make_study(), durations={'a': 2., 'b': 3.})
+        path, length = sched.critical_path()
+        self.assertEqual(path, ['a', 'b', 'c'])
+        # c has no duration, it counts as the mean of known durations
+        self.assertEqual(length, 2. + 3. + 2.5)
+        report = sched.predict(workers=2)
+        self.assertEqual(report['work'], 2 * 2. + 6 * 3. + 2.5)
+        self.assertEqual(report['makespan_lower_bound'], report['work'] / 2)
+        self.assertIsNone(Scheduler(make_study()).critical_path())
+
+    def test_runLocal(self):
+        outdir = tempfile.mkdtemp()
+        cmd = sys.executable + ' -c pass'
+        pts = {
+            'a': PTask(name='a', conf={'command': cmd}),
+            'b': PTask(name='b', conf={'command': cmd, 'after': 'a'})
+        }
+        try:
+            with LocalExecutor(workers=2, outdir=outdir) as ex:
+                stats = Scheduler(pts).run(ex)
+        finally:
+            shutil.rmtree(outdir)
+        self.assertEqual(stats['tasks'], 2)
+
+    def test_runReportsPlan(self):
+        outdir = tempfile.mkdtemp()
+        cmd = sys.executable + ' -c pass'
+        pp = PaPaS(app={'a': {'command': cmd, 'duration': 2},
+                        'b': {'command': cmd, 'duration': 3, 'after': 'a'}})
+        try:
+            stats = pp.run(workers=2, outdir=outdir)
+        finally:
+            shutil.rmtree(outdir)
+        self.assertEqual(stats['plan']['critical_path'], ['a', 'b'])
+        self.assertEqual(stats['plan']['makespan_lower_bound'], 5.)
+
+
+if __name__ == '__main__':
+    unittest.main()
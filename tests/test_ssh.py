@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+
+
+import os
+import sys
+import stat
+import shutil
+import tempfile
+import unittest
+from papas.task import PTask
+from papas.executors.ssh import SSHExecutor
+
+
+# Stand-in for ssh, records host and runs remote command locally
+fake_ssh = '''#!/bin/sh
+while [ $# -gt 0 ]; do
+    case "$1" in
+        -o|-O) shift 2 ;;
+        -*) shift ;;
+        *) break ;;
+    esac
+done
+host="$1"
+shift
+echo "$host" >> "$FAKE_SSH_LOG"
+if [ $# -gt 0 ]; then
+    exec sh -c "$*"
+fi
+'''
+
+
+class TestSSHExecutor(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.ssh = os.path.join(self.tmpdir, 'ssh')
+        with open(self.ssh, 'w') as fd:
+            fd.write(fake_ssh)
+        os.chmod(self.ssh, stat.S_IRWXU)
+        self.log = os.path.join(self.tmpdir, 'ssh.log')
+        os.environ['FAKE_SSH_LOG'] = self.log
+
+    def tearDown(self):
+        del os.environ['FAKE_SSH_LOG']
+        shutil.rmtree(self.tmpdir)
+
+    def test_remoteCommand(self):
+        with SSHExecutor(hosts=['h1'], ssh=self.ssh, remote_dir='/a b',
+                         outdir=self.tmpdir) as ex:
+            pt = PTask(name='t', conf={'environ': {'N': 2},
+                                       'command': 'echo hi'})
+            cmd = ex.remote_command(pt[0])
+        self.assertEqual(cmd, "cd '/a b' && env N=2 echo hi")
+
+    def test_run(self):
+        cmd = sys.executable + ' -c "import os; print(os.environ[\'N\'])"'
+        pt = PTask(name='t', conf={'cmdargs': {'x': list(range(12))},
+                                   'environ': {'N': '${cmdargs:x}'},
+                                   'command': cmd})
+        hosts = {'h1': 2, 'h2': 3}
+        with SSHExecutor(hosts=hosts, ssh=self.ssh, remote_dir=self.tmpdir,
+                         outdir=self.tmpdir) as ex:
+            self.assertEqual(ex.workers, 5)
+            stats = ex.run(pt)
+        self.assertEqual((stats['tasks'], stats['failed']), (12, 0))
+        with open(os.path.join(self.tmpdir, 't-7.out')) as fd:
+            self.assertEqual(fd.read().strip(), '7')
+        with open(self.log) as fd:
+            used = fd.read().split()
+        # connect + 12 tasks + exit
+        self.assertEqual(len(used), 2 + 12 + 2)
+        self.assertEqual(set(used), set(hosts))
+
+    def test_unreachableHost(self):
+        # 'down' fails to connect, its slots must not take tasks
+        with open(self.ssh, 'w') as fd:
+            fd.write(fake_ssh.replace('host="$1"\n', 'host="$1"\n'
+                                      '[ "$host" = down ] && exit 255\n'))
+        pt = PTask(name='t', conf={'cmdargs': {'x': list(range(6))},
+                                   'command': 'true'})
+        with SSHExecutor(hosts={'down': 4, 'h1': 1}, ssh=self.ssh,
+                         remote_dir=self.tmpdir, outdir=self.tmpdir) as ex:
+            self.assertEqual(ex.hosts, {'h1': 1})
+            self.assertEqual(ex.workers, 1)
+            stats = ex.run(pt)
+        self.assertEqual((stats['tasks'], stats['failed']), (6, 0))
+
+        with self.assertRaises(ConnectionError):
+            SSHExecutor(hosts=['down'], ssh=self.ssh, outdir=self.tmpdir)
+
+
+if __name__ == '__main__':
+    unittest.main()
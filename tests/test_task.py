@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+
+
+import unittest
+from papas.task import PTask
+from papas.parsers.interpolation import Interpolator, TemplateCache
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+class TestPTaskExpansion(unittest.TestCase):
+
+    def setUp(self):
+        self.conf = {
+            'program': 'helloWorld.py',
+            'cmdargs': {'xparam': [10, 20, 30]},
+            'environ': {'OMP_NUM_THREADS': [2, 4]},
+            'command': '${program} --xparam ${cmdargs:xparam}'
+        }
+        self.pt = PTask(name='hello', conf=self.conf)
+
+    def test_len(self):
+        self.assertEqual(len(self.pt), 6)
+
+    def test_iterationMatchesIndexing(self):
+        for i, t in enumerate(self.pt):
+            self.assertEqual(t.index, i)
+            self.assertEqual(t.conf, self.pt[i].conf)
+
+    def test_mixedRadixDecoding(self):
+        t = self.pt[3]
+        self.assertEqual(t.conf['cmdargs']['xparam'], 20)
+        self.assertEqual(t.conf['environ']['OMP_NUM_THREADS'], 4)
+        self.assertEqual(self.pt[-1].conf['cmdargs']['xparam'], 30)
+        with self.assertRaises(IndexError):
+            self.pt[6]
+        with self.assertRaises(TypeError):
+            self.pt['1']
+
+    @unittest.skipIf(np is None, 'NumPy is not available')
+    def test_numpyIndex(self):
+        self.assertEqual(self.pt[np.int64(3)].conf, self.pt[3].conf)
+        self.assertEqual(self.pt[np.int32(-1)].index, 5)
+
+    def test_slicing(self):
+        idx = [t.index for t in self.pt[1:6:2]]
+        self.assertEqual(idx, [1, 3, 5])
+
+    def test_confNotModified(self):
+        list(self.pt)
+        self.assertEqual(self.conf['cmdargs']['xparam'], [10, 20, 30])
+
+    def test_renderedCommand(self):
+        t = self.pt[3]
+        self.assertEqual(t.command, 'helloWorld.py --xparam 20')
+        self.assertEqual(t.environ, {'OMP_NUM_THREADS': '4'})
+
+    def test_largeSpaceIsLazy(self):
+        conf = {'cmdargs': {'p' + str(i): list(range(10)) for i in range(7)}}
+        pt = PTask(name='big', conf=conf)
+        self.assertEqual(len(pt), 10 ** 7)
+        self.assertEqual(pt[10 ** 7 - 1].conf['cmdargs']['p0'], 9)
+        self.assertEqual(next(iter(pt)).conf['cmdargs']['p6'], 0)
+
+    def test_templatesNotGrown(self):
+        templates = TemplateCache()
+        conf = {'environ': {'SEED': list(range(1000))},
+                'command': 'run ${environ:SEED}'}
+        pt = PTask(name='seeds', conf=conf,
+                   interpolator=Interpolator(templates=templates))
+        self.assertEqual(pt[999].environ, {'SEED': '999'})
+        list(pt)
+        self.assertEqual(len(templates), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
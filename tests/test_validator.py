@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+
+
+import os
+import sys
+import tempfile
+import unittest
+import subprocess
+from parsers.validator import ConfValidator
+from parsers.loader import load_file
+
+
+class TestConfValidator(unittest.TestCase):
+
+    def setUp(self):
+        self.validator = ConfValidator()
+        self.study = {
+            'hello': {
+                'program': 'hello.py',
+                'cmdargs': {'x': [1, 2]},
+                'command': '${program} --x ${cmdargs:x}'
+            },
+            'hello2': {
+                'cmdargs': {'x': '${hello:cmdargs:x}'},
+                'environ': {'N': [2, 4]},
+                'command': '${hello:program} --x ${cmdargs:x}',
+                'after': ['hello']
+            }
+        }
+
+    def test_valid(self):
+        self.assertEqual(self.validator.validate(self.study), [])
+        # Tasks in a list are named by position
+        errors = self.validator.validate(list(self.study.values()))
+        self.assertIn(('1:after[0]', 'unknown task hello'), errors)
+
+    def test_allErrors(self):
+        self.study['hello']['cmdargs']['y'] = {'a': 1}
+        self.study['hello']['environ'] = ['N=1']
+        self.study['hello2']['cmdargs'] = {'x': []}
+        self.study['hello2']['command'] = '${program} ${hello:cmdargs:z} $x'
+        self.study['hello2']['after'] = ['hello', 'hello4']
+        del self.study['hello']['command']
+        self.study['hello3'] = 'echo'
+
+        errors = self.validator.validate(self.study)
+        self.assertEqual(sorted(errors), sorted([
+            ('hello', "missing required name 'command'"),
+            ('hello:cmdargs:y', 'values nest at most two levels'),
+            ('hello:environ', 'expected dict, found list'),
+            ('hello2:cmdargs:x', 'empty list of values'),
+            ('hello2:command', "'$' must be followed by '$' or '{', "
+                               "found: '$x'"),
+            ('hello2:after[1]', 'unknown task hello4'),
+            ('hello3', 'expected dict, found str')
+        ]))
+
+        self.study['hello2']['command'] = '${program} ${hello:cmdargs:z}'
+        errors = self.validator.validate(self.study)
+        self.assertIn(('hello2:command', 'unresolved reference ${program}'),
+                      errors)
+        self.assertIn(('hello2:command',
+                       'unresolved reference ${hello:cmdargs:z}'), errors)
+
+    def test_papas(self):
+        self.assertEqual(self.validator.validate_papas(
+            {'file_extensions': {'py': 'python', 'bin': None},
+             'program_executable': ['bin']}), [])
+        self.assertEqual(self.validator.validate_papas(
+            {'file_extensions': {'py': ['python']}}),
+            [('file_extensions:py', 'expected str, found list')])
+
+    def test_samples(self):
+        for fn in ['YAML_conf/helloWorld.yml', 'JSON_conf/helloWorld.json',
+                   'INI_conf/helloWorld.ini']:
+            data = load_file(os.path.join('papas', 'tasks_conf', fn))
+            self.assertEqual(self.validator.validate(data), [], fn)
+
+    def test_mainExitsOnErrors(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.yml') as fd:
+            fd.write('hello:\n    program: hello.py\n')
+            fd.flush()
+            proc = subprocess.run([sys.executable,
+                                   os.path.join('papas', 'main.py'),
+                                   '-a', fd.name],
+                                  stdout=subprocess.DEVNULL,
+                                  stderr=subprocess.DEVNULL)
+        self.assertEqual(proc.returncode, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
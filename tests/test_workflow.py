@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+
+
+import os
+import json
+import tempfile
+import unittest
+import unittest.mock
+from task import PTask
+from scheduler import Scheduler
+
+try:
+    from graphs.workflow import WorkflowGraph, msgpack
+except ImportError:
+    WorkflowGraph = msgpack = None
+
+
+@unittest.skipIf(WorkflowGraph is None, 'graphviz is not installed')
+class TestWorkflowGraph(unittest.TestCase):
+
+    def test_nodes_edges(self):
+        wf = WorkflowGraph(name='wf')
+        wf.nodes = ['a', ('b', {'color': 'red'}), 'a']
+        wf.edges = [('a', 'b'), (('b', 'c'), {'label': 'x'}), ('a', 'b')]
+        self.assertEqual(wf.nodes, ['a', 'b', 'c'])
+        self.assertEqual(wf.edges, [('a', 'b'), ('b', 'c')])
+        self.assertEqual(wf.source, 'digraph wf {\n\ta\n\tb [color=red]\n'
+                         '\ta -> b\n\tc\n\tb -> c [label=x]\n}\n')
+
+    def test_update_in_place(self):
+        wf = WorkflowGraph(name='wf')
+        wf.edges = [('a', 'b'), ('b', 'c')]
+        wf.nodes = ('b', {'color': 'red'})
+        wf.edges = (('a', 'b'), {'label': 'x'})
+        self.assertEqual(len(wf.body), 5)
+        self.assertEqual(wf.body[1], '\tb [color=red]\n')
+        self.assertEqual(wf.body[2], '\ta -> b [label=x]\n')
+        self.assertEqual(wf.edge_attributes('a', 'b'), {'label': 'x'})
+
+    def test_invalid(self):
+        wf = WorkflowGraph()
+        wf.nodes = ['', 3]
+        wf.edges = [('a',), ('a', 3)]
+        self.assertEqual(wf.nodes, [])
+        self.assertEqual(wf.edges, [])
+
+    def test_json(self):
+        wf = WorkflowGraph(name='wf')
+        wf.edges = [(('a', 'b'), {'label': 'x'}), ('b', 'c')]
+        with tempfile.TemporaryDirectory() as tmp:
+            fn = os.path.join(tmp, 'wf.json')
+            wf.json_save(fn)
+            wf2 = WorkflowGraph.json_load(fn)
+        self.assertEqual(wf2.nodes, wf.nodes)
+        self.assertEqual(wf2.edges, wf.edges)
+        self.assertEqual(wf2.edge_attributes('a', 'b'), {'label': 'x'})
+
+    def test_binary(self):
+        wf = WorkflowGraph(name='wf')
+        wf.add_nodes_from(['a', 'b'], color='red')
+        wf.add_edges_from([('a', 'b'), ('b', 'c')])
+        wf.edges = (('b', 'c'), {'label': 'x'})
+        with tempfile.TemporaryDirectory() as tmp:
+            fn = os.path.join(tmp, 'wf.wf')
+            wf.bin_save(fn)
+            wf2 = WorkflowGraph.bin_load(fn)
+        self.assertEqual(wf2.source, wf.source)
+        self.assertEqual(wf2.nodes, wf.nodes)
+        self.assertEqual(wf2.edge_attributes('b', 'c'), {'label': 'x'})
+        # loaded graphs can still be updated in place
+        wf2.nodes = ('c', {'shape': 'box'})
+        self.assertEqual(wf2.body[2], '\tc [shape=box]\n')
+
+    def test_round_trip_source(self):
+        wf = WorkflowGraph(name='wf')
+        wf.edges = [('a', 'b'), (('b', 'c'), {'label': 'x'})]
+        wf.attr('node', shape='box')
+        wf.add_nodes_from(['d', 'e'], color='red')
+        wf.add_edges_from([('e', 'a'), ('c', 'f')])
+        with wf.subgraph(name='cluster_0') as sub:
+            sub.node('g')
+        wf.nodes = ('a', {'color': 'blue'})
+        wf.edges = (('c', 'f'), {'style': 'dashed'})
+        with tempfile.TemporaryDirectory() as tmp:
+            fn = os.path.join(tmp, 'wf')
+            for save, load in [(wf.json_save, WorkflowGraph.json_load),
+                               (wf.bin_save, WorkflowGraph.bin_load)]:
+                save(fn)
+                wf2 = load(fn)
+                self.assertEqual(wf2.source, wf.source)
+                # positions of lines are kept for updates in place
+                wf2.edges = (('a', 'b'), {'label': 'y'})
+                wf.edges = (('a', 'b'), {'label': 'y'})
+                self.assertEqual(wf2.source, wf.source)
+
+    @unittest.skipIf(msgpack is None, 'msgpack is not installed')
+    def test_binary_json_fallback(self):
+        wf = WorkflowGraph(name='wf')
+        wf.edges = [('a', 'b')]
+        with tempfile.TemporaryDirectory() as tmp:
+            fn = os.path.join(tmp, 'wf.wf')
+            with unittest.mock.patch('graphs.workflow.msgpack', None):
+                wf.bin_save(fn)
+            with open(fn, 'rb') as fd:
+                self.assertEqual(fd.read(9)[-1:], b'J')
+            self.assertEqual(WorkflowGraph.bin_load(fn).source, wf.source)
+
+    def test_json_legacy(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            fn = os.path.join(tmp, 'wf.json')
+            with open(fn, 'w') as fd:
+                json.dump({'name': 'wf', '_nodes': ['a', ['b', {}]],
+                           '_edges': [['a', 'b']]}, fd)
+            wf = WorkflowGraph.json_load(fn)
+        self.assertEqual(wf.edges, [('a', 'b')])
+
+    def test_clear(self):
+        wf = WorkflowGraph()
+        wf.edges = [('a', 'b')]
+        wf.clear()
+        wf.edges = [('a', 'b')]
+        self.assertEqual(wf.nodes, ['a', 'b'])
+        self.assertEqual(len(wf.body), 3)
+
+    def test_bulk(self):
+        wf = WorkflowGraph(name='wf')
+        self.assertEqual(wf.add_nodes_from(['a', 'b', 'a'], color='red'), 2)
+        self.assertEqual(wf.add_edges_from([('a', 'b'), ['b', 'c']]), 2)
+        self.assertEqual(wf.add_edges_from([('a', 'b')], label='x'), 0)
+        self.assertEqual(wf.source, 'digraph wf {\n\ta [color=red]\n'
+                         '\tb [color=red]\n\tc\n\ta -> b [label=x]\n'
+                         '\tb -> c\n}\n')
+
+    def test_bulk_invalid(self):
+        wf = WorkflowGraph()
+        self.assertEqual(wf.add_nodes_from(['a', 3]), 0)
+        self.assertEqual(wf.add_edges_from([('a', 'b'), ('a',)]), 0)
+        self.assertEqual(wf.body, [])
+
+    def test_tasks(self):
+        pts = {
+            'a': PTask(name='a', conf={'cmdargs': {'x': [1, 2]}}),
+            'b': PTask(name='b', conf={'cmdargs': {'x': [1, 2]},
+                                       'after': ['a']})
+        }
+        wf = WorkflowGraph()
+        wf.add_tasks_from(Scheduler(pts))
+        self.assertEqual(wf.nodes, ['a-0', 'a-1', 'b-0', 'b-1'])
+        self.assertEqual(wf.edges, [('a-0', 'b-0'), ('a-1', 'b-1')])
+
+    def test_summary(self):
+        pts = {
+            'a': PTask(name='a', conf={'cmdargs': {'x': [1, 2],
+                                                   'y': [1, 2, 3]}}),
+            'b': PTask(name='b', conf={'cmdargs': {'x': [1, 2]},
+                                       'after': ['a']})
+        }
+        sched = Scheduler(pts)
+        sched.complete(sched.next_ready(), 0)
+        wf = WorkflowGraph(name='wf')
+        wf.add_summary_from(sched)
+        self.assertEqual(wf.nodes, ['a', 'b'])
+        self.assertEqual(wf.edge_attributes('a', 'b'), {'label': 'x'})
+        attrs = wf.node_attributes('a')
+        self.assertEqual(attrs['label'],
+                         'a\\n6 tasks\\n1 done, 0 failed, 0 skipped')
+        self.assertEqual(attrs['fillcolor'],
+                         WorkflowGraph._status_colors['partial'])
+        self.assertEqual(wf.node_attributes('b'), {'label': 'b\\n2 tasks'})
+
+    def test_drill_down(self):
+        pts = {
+            'a': PTask(name='a', conf={'cmdargs': {'x': [1, 2, 3]}}),
+            'b': PTask(name='b', conf={'after': ['a']})
+        }
+        wf = WorkflowGraph()
+        wf.add_task_subgraph_from(Scheduler(pts), 'a', limit=2)
+        self.assertEqual(wf.nodes, ['a-0', 'a-1', 'a-more', 'b'])
+        self.assertEqual(wf.node_attributes('a-1'), {'label': 'x=2'})
+        self.assertEqual(len(wf.edges), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()